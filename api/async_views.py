@@ -0,0 +1,210 @@
+# api/async_views.py
+import logging
+from asgiref.sync import sync_to_async
+from core.application.field_selection import (
+    GOOGLE_DORK_FIELDS, NMAP_HOST_FIELDS, ORCHESTRATION_FIELDS, WHOIS_FIELDS, FieldSelection, fields_from_request,
+    select_fields, select_nmap_fields
+)
+from core.application.orchestration_service import (
+    OrchestrationService, format_dns_results_structured, format_nmap_results_structured
+)
+from core.application.report_rendering import RENDERERS, ScanReport
+from core.application.use_cases import GoogleDorkUseCase, DnsScanUseCase, WhoisScanUseCase, NmapScanUseCase
+from chat.services.async_api import AsyncJSONView, json_response
+from chat.services.fast_json import encode_models
+from chat.services.chat_sessions import create_session_from_scan, get_chat_session_store
+from .serializers import (
+    BatchScanRequestSerializer, GoogleDorkQuerySerializer, DnsScanRequestSerializer, WhoisScanRequestSerializer,
+    NmapScanRequestSerializer, OrchestrationOptionsSerializer, boolean_flag
+)
+from .job_queue import enqueue_batch, job_params
+from .orchestration_views import batch_accepted
+from .scan_history import get_scan_history, record_scan, scanner_response
+from .views import load_api_keys, scanner_cache_headers
+
+logger = logging.getLogger(__name__)
+
+# Versiones asíncronas de las vistas de api/views.py y api/orchestration_views.py, para ASGI.
+# Mientras esperan a la red o a Nmap no ocupan un hilo, así un proceso atiende muchos escaneos a la vez.
+
+
+class AsyncBaseOrchestrationView(AsyncJSONView):
+    scenario_name = None
+
+    async def post(self, request, *args, **kwargs):
+        data, error_response = self.parse_body(request)
+        if error_response:
+            return error_response
+        if not self.scenario_name:
+            logger.error("Escenario no definido en la vista de orquestación.")
+            return json_response({"error": "Error interno del servidor: Escenario no configurado."}, status=500)
+
+        url_dominio_recibido = data.get('url_dominio')
+        options = OrchestrationOptionsSerializer(data=data)
+        if not options.is_valid():
+            return json_response(options.errors, status=400)
+        custom_gquery = options.validated_data.get('gquery') or None
+        dork_packs = options.validated_data.get('dork_packs')
+        dork_max_results = options.validated_data['dork_max_results']
+        try:
+            start_session = boolean_flag(data, 'start_session')
+            incremental = boolean_flag(data, 'incremental')
+        except ValueError as e:
+            return json_response({"error": str(e)}, status=400)
+        report_format = data.get('report_format')
+        if report_format is not None and report_format not in RENDERERS:
+            return json_response({"error": f"'report_format' debe ser uno de: {', '.join(RENDERERS)}."}, status=400)
+        try:
+            fields = fields_from_request(data, ORCHESTRATION_FIELDS)
+        except ValueError as e:
+            return json_response({"error": str(e)}, status=400)
+
+        if not url_dominio_recibido:
+            return json_response({"error": "El parámetro 'url_dominio' es requerido en el cuerpo de la solicitud."}, status=400)
+
+        logger.info(f"API async: Recibida solicitud para escaneo '{self.scenario_name}' en objetivo: {url_dominio_recibido}")
+        try:
+            results = await OrchestrationService(scan_history=get_scan_history()).run_scan_async(
+                url_dominio=url_dominio_recibido,
+                scenario=self.scenario_name,
+                custom_gquery=custom_gquery,
+                dork_packs=dork_packs,
+                dork_max_results=dork_max_results,
+                fields=fields,
+                incremental=incremental,
+                trim=False
+            )
+            # Al historial va la respuesta completa; al cliente, solo lo que pidió en 'fields'
+            await sync_to_async(record_scan)(results)
+            results = FieldSelection(fields).trim_response(results)
+            if start_session:
+                session = await sync_to_async(create_session_from_scan)(get_chat_session_store(), results)
+                results["chat_session_id"] = session.session_id
+            if report_format:
+                results["report"] = ScanReport.from_response(results).render(report_format)
+            return json_response(results)
+        except Exception as e:
+            logger.exception(f"Error inesperado en la API de orquestación async ({self.scenario_name}) para objetivo {url_dominio_recibido}: {e}")
+            return json_response({"error": f"Ocurrió un error inesperado durante el escaneo: {str(e)}"}, status=500)
+
+
+class AsyncConsultaCompletaView(AsyncBaseOrchestrationView):
+    scenario_name = 'complete'
+
+
+class AsyncConsultaBasicaView(AsyncBaseOrchestrationView):
+    scenario_name = 'basic'
+
+
+class AsyncConsultaLoteView(AsyncJSONView):
+    async def post(self, request):
+        data, error_response = self.parse_body(request)
+        if error_response:
+            return error_response
+        serializer = BatchScanRequestSerializer(data=data)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+        try:
+            fields = fields_from_request(data, ORCHESTRATION_FIELDS)
+        except ValueError as e:
+            return json_response({"error": str(e)}, status=400)
+        params = serializer.validated_data
+        logger.info(f"API async: Recibida solicitud de lote '{params['scenario']}' con {len(params['domains'])} dominios")
+        # Como ConsultaLoteView: se encola para los workers y se responde 202 con los trabajos
+        batch_id, jobs = await sync_to_async(enqueue_batch)(params['domains'], params['scenario'], job_params(params, fields))
+        return json_response(batch_accepted(batch_id, jobs), status=202)
+
+
+class AsyncGoogleDorkView(AsyncJSONView):
+    async def post(self, request):
+        data, error_response = self.parse_body(request)
+        if error_response:
+            return error_response
+        serializer = GoogleDorkQuerySerializer(data=data)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+        try:
+            fields = fields_from_request(data, GOOGLE_DORK_FIELDS)
+        except ValueError as e:
+            return json_response({"error": str(e)}, status=400)
+        api_key, search_engine_id, _ = load_api_keys()
+        if not (api_key and search_engine_id):
+            return json_response({"error": "API Key o Search Engine ID no configurados."}, status=500)
+
+        use_case = GoogleDorkUseCase()
+        query = serializer.validated_data.get('query')
+        if query:
+            results = await use_case.execute_async(query)
+            if not results:
+                return json_response({"message": "No se encontraron resultados para la búsqueda."}, status=204)
+            return json_response([select_fields(result.to_dict(), fields) for result in results])
+
+        validated = serializer.validated_data
+        try:
+            outcome = await use_case.execute_pack_async(validated['domain'], validated.get('packs'), validated['max_results'])
+        except ValueError as e:
+            return json_response({"error": str(e)}, status=400)
+        if not outcome or not outcome["results"]:
+            return json_response({"message": "No se encontraron resultados para la búsqueda."}, status=204)
+        return json_response({
+            "packs": outcome["packs"],
+            "per_query": outcome["per_query"],
+            "failed_queries": outcome["failed_queries"],
+            "results": [select_fields(result.to_dict(), fields) for result in outcome["results"]],
+        })
+
+
+class AsyncDnsScanView(AsyncJSONView):
+    async def post(self, request):
+        data, error_response = self.parse_body(request)
+        if error_response:
+            return error_response
+        serializer = DnsScanRequestSerializer(data=data)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+        domain = serializer.validated_data['domain']
+        results = await DnsScanUseCase().execute_async(domain, serializer.validated_data.get('record_types'),
+                                                       serializer.validated_data['fresh'])
+        await sync_to_async(record_scan)(scanner_response(domain, "dns", format_dns_results_structured(results)))
+        return json_response([{"type": record_type, "value": values} for record_type, values in results.items()],
+                             headers=scanner_cache_headers(results))
+
+
+class AsyncWhoisScanView(AsyncJSONView):
+    async def post(self, request):
+        data, error_response = self.parse_body(request)
+        if error_response:
+            return error_response
+        serializer = WhoisScanRequestSerializer(data=data)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+        try:
+            fields = fields_from_request(data, WHOIS_FIELDS)
+        except ValueError as e:
+            return json_response({"error": str(e)}, status=400)
+        domain = serializer.validated_data['domain']
+        result = await WhoisScanUseCase().execute_async(domain, serializer.validated_data['fresh'])
+        await sync_to_async(record_scan)(scanner_response(domain, "whois", result.to_dict()))
+        return json_response(select_fields(result.to_dict(), fields))
+
+
+class AsyncNmapScanView(AsyncJSONView):
+    async def post(self, request):
+        data, error_response = self.parse_body(request)
+        if error_response:
+            return error_response
+        serializer = NmapScanRequestSerializer(data=data)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+        try:
+            fields = fields_from_request(data, NMAP_HOST_FIELDS)
+        except ValueError as e:
+            return json_response({"error": str(e)}, status=400)
+        # Sin 'service' entre los campos pedidos Nmap se ejecuta sin detección de servicios (-A)
+        targets = serializer.validated_data['targets']
+        results = await NmapScanUseCase().execute_async(targets, service_detection=fields is None or "service" in fields,
+                                                        fresh=serializer.validated_data['fresh'])
+        await sync_to_async(record_scan)(scanner_response(",".join(targets), "nmap", format_nmap_results_structured(results)))
+        if fields is None:
+            return json_response(encode_models(results))
+        return json_response([select_nmap_fields(host, fields) for host in format_nmap_results_structured(results)])
@@ -0,0 +1,100 @@
+# api/history_views.py
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from core.application.report_rendering import RENDERERS, ScanReport
+from .scan_history import SEARCHABLE_RECORD_TYPES, get_scan_history
+
+MAX_HISTORY_LIMIT = 500
+
+
+def _int_param(request, name: str, default=None):
+    value = request.query_params.get(name)
+    if value in (None, ""):
+        return default
+    return int(value)
+
+
+def _limit_param(request, default: int) -> int:
+    return max(1, min(_int_param(request, 'limit', default), MAX_HISTORY_LIMIT))
+
+
+class ScanHistoryListView(APIView):
+    def get(self, request):
+        # Escaneos guardados, del más reciente al más antiguo; ?domain= filtra por dominio
+        try:
+            limit = _limit_param(request, 50)
+        except ValueError:
+            return Response({"error": "El parámetro 'limit' debe ser un entero."}, status=status.HTTP_400_BAD_REQUEST)
+        scans = get_scan_history().list_scans(request.query_params.get('domain'), limit)
+        return Response({"scans": scans}, status=status.HTTP_200_OK)
+
+
+class ScanHistoryDetailView(APIView):
+    def get(self, request, scan_id: int = None, scan_uid=None):
+        # Un escaneo guardado con el mismo formato que la consulta original (sin volver a escanear),
+        # por 'scan_id' o por 'scan_uid' (el que devuelven las consultas con escritura diferida)
+        history = get_scan_history()
+        scan = history.get_scan(scan_id) if scan_uid is None else history.get_scan_by_uid(scan_uid)
+        if scan is None:
+            return Response({"error": "Escaneo no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+        report_format = request.query_params.get('report_format')
+        if report_format:
+            if report_format not in RENDERERS:
+                return Response(
+                    {"error": f"'report_format' debe ser uno de: {', '.join(RENDERERS)}."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            scan["report"] = ScanReport.from_response(scan).render(report_format)
+        return Response(scan, status=status.HTTP_200_OK)
+
+
+class ScanPortHistoryView(APIView):
+    def get(self, request):
+        # Puertos vistos en escaneos anteriores: ?ip=, ?port= y ?state= (al menos ip o port)
+        try:
+            port = _int_param(request, 'port')
+            limit = _limit_param(request, 200)
+        except ValueError:
+            return Response({"error": "Los parámetros 'port' y 'limit' deben ser enteros."}, status=status.HTTP_400_BAD_REQUEST)
+        ip = request.query_params.get('ip')
+        if not ip and port is None:
+            return Response({"error": "Indique 'ip' o 'port'."}, status=status.HTTP_400_BAD_REQUEST)
+        ports = get_scan_history().find_ports(ip=ip, port=port, state=request.query_params.get('state'), limit=limit)
+        return Response({"ports": ports}, status=status.HTTP_200_OK)
+
+
+class PortSearchView(APIView):
+    def get(self, request):
+        # "Qué activos exponen el puerto X / el servicio Y": ?port=, ?service=, ?product=, ?version=, ?state= (open por defecto)
+        try:
+            port = _int_param(request, 'port')
+            limit = _limit_param(request, 200)
+        except ValueError:
+            return Response({"error": "Los parámetros 'port' y 'limit' deben ser enteros."}, status=status.HTTP_400_BAD_REQUEST)
+        params = request.query_params
+        if port is None and not (params.get('service') or params.get('product')):
+            return Response({"error": "Indique 'port', 'service' o 'product'."}, status=status.HTTP_400_BAD_REQUEST)
+        assets = get_scan_history().search_ports(
+            port=port, state=params.get('state', 'open'), service=params.get('service'),
+            product=params.get('product'), version=params.get('version'), limit=limit
+        )
+        return Response({"assets": assets}, status=status.HTTP_200_OK)
+
+
+class RecordSearchView(APIView):
+    def get(self, request):
+        # "Qué dominios tienen el NS/MX/A... X": ?type=NS&value=ns1.example.com (&source=dns|whois)
+        record_type = (request.query_params.get('type') or '').upper()
+        value = request.query_params.get('value')
+        if record_type not in SEARCHABLE_RECORD_TYPES or not value:
+            return Response(
+                {"error": f"Indique 'value' y 'type' (uno de: {', '.join(SEARCHABLE_RECORD_TYPES)})."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = _limit_param(request, 200)
+        except ValueError:
+            return Response({"error": "El parámetro 'limit' debe ser un entero."}, status=status.HTTP_400_BAD_REQUEST)
+        domains = get_scan_history().search_records(record_type, value, request.query_params.get('source'), limit)
+        return Response({"domains": domains}, status=status.HTTP_200_OK)
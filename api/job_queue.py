@@ -0,0 +1,179 @@
+# api/job_queue.py
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ScanJob
+
+logger = logging.getLogger(__name__)
+
+JOB_LEASE_SECONDS = int(os.getenv('SCAN_JOB_LEASE_SECONDS', '120'))
+JOB_RETRY_BASE_SECONDS = int(os.getenv('SCAN_JOB_RETRY_BASE_SECONDS', '30'))
+JOB_MAX_ATTEMPTS = int(os.getenv('SCAN_JOB_MAX_ATTEMPTS', '3'))
+# Candidatos que lee cada intento de reclamar en SQLite (sin SKIP LOCKED)
+CLAIM_CANDIDATES = 10
+# Trabajos de un mismo lote que un worker reclama juntos (comparten el plan de Nmap de run_batch)
+BATCH_CLAIM_SIZE = int(os.getenv('SCAN_JOB_BATCH_CLAIM_SIZE', '50'))
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def job_params(data: Dict[str, Any], fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """ScanJob.params a partir de los datos validados de una petición (gquery, dork_packs, incremental...)."""
+    params = {"incremental": data.get('incremental', False)}
+    if data.get('gquery'):
+        params["custom_gquery"] = data['gquery']
+    for key in ("dork_packs", "dork_max_results"):
+        if key in data:
+            params[key] = data[key]
+    if fields is not None:
+        params["fields"] = sorted(fields)
+    return params
+
+
+def enqueue_scan(domain: str, scenario: str = "basic", params: Optional[Dict[str, Any]] = None,
+                 priority: int = 0, max_attempts: Optional[int] = None) -> ScanJob:
+    """Encola un escaneo; 'params' son los argumentos opcionales de OrchestrationService.run_scan."""
+    return ScanJob.objects.create(
+        domain=domain, scenario=scenario, params=params or {}, priority=priority,
+        max_attempts=max_attempts or JOB_MAX_ATTEMPTS, available_at=timezone.now(),
+    )
+
+
+def enqueue_batch(domains: List[str], scenario: str = "basic", params: Optional[Dict[str, Any]] = None,
+                  priority: int = 0) -> Tuple[str, List[ScanJob]]:
+    """
+    Encola un trabajo por dominio con el mismo 'batch' en params: el worker que reclama uno se lleva
+    también los demás del lote que sigan en cola y los escanea juntos (run_batch, con un plan de Nmap
+    común). Retorna el id del lote y los trabajos.
+    """
+    batch_id = uuid.uuid4().hex
+    with transaction.atomic():
+        jobs = [enqueue_scan(domain, scenario, {**(params or {}), "batch": batch_id}, priority) for domain in domains]
+    return batch_id, jobs
+
+
+def _claimable(now):
+    return (ScanJob.objects.filter(status=ScanJob.QUEUED, available_at__lte=now)
+            .order_by("-priority", "available_at"))
+
+
+def claim_job(worker_id: str) -> Optional[ScanJob]:
+    """
+    Reclama el siguiente trabajo disponible para 'worker_id' con una concesión de JOB_LEASE_SECONDS.
+    En PostgreSQL usa SELECT ... FOR UPDATE SKIP LOCKED (los workers no se esperan entre sí); en
+    SQLite, que no lo admite, un UPDATE condicional sobre el estado (solo un worker lo consigue).
+    """
+    now = timezone.now()
+    claim = {
+        "status": ScanJob.RUNNING, "worker_id": worker_id, "attempts": F("attempts") + 1,
+        "started_at": now, "heartbeat_at": now, "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+    }
+    claimed_id = None
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            locked = _claimable(now).select_for_update(skip_locked=True).only("pk").first()
+            if locked is not None:
+                ScanJob.objects.filter(pk=locked.pk).update(**claim)
+                claimed_id = locked.pk
+    else:
+        for candidate_id in _claimable(now).values_list("pk", flat=True)[:CLAIM_CANDIDATES]:
+            if ScanJob.objects.filter(pk=candidate_id, status=ScanJob.QUEUED).update(**claim) == 1:
+                claimed_id = candidate_id
+                break
+    if claimed_id is None:
+        return None
+    job = ScanJob.objects.get(pk=claimed_id)
+    logger.info(f"Worker {worker_id}: trabajo #{job.pk} ({job.domain}) reclamado, intento {job.attempts}/{job.max_attempts}.")
+    return job
+
+
+def claim_batch_siblings(job: ScanJob, worker_id: str, limit: int = BATCH_CLAIM_SIZE) -> List[ScanJob]:
+    """Reclama para 'worker_id' los demás trabajos en cola del lote de 'job' (como máximo 'limit')."""
+    batch_id = job.params.get("batch")
+    if not batch_id or limit <= 0:
+        return []
+    now = timezone.now()
+    claim = {
+        "status": ScanJob.RUNNING, "worker_id": worker_id, "attempts": F("attempts") + 1,
+        "started_at": now, "heartbeat_at": now, "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+    }
+    candidates = (_claimable(now).filter(params__batch=batch_id, scenario=job.scenario)
+                  .exclude(pk=job.pk).values_list("pk", flat=True)[:limit])
+    # UPDATE condicional por trabajo, como en SQLite: si otro worker se adelanta, ese trabajo se queda fuera
+    claimed_ids = [pk for pk in candidates if ScanJob.objects.filter(pk=pk, status=ScanJob.QUEUED).update(**claim) == 1]
+    if claimed_ids:
+        logger.info(f"Worker {worker_id}: {len(claimed_ids)} trabajos más del lote {batch_id} reclamados.")
+    return list(ScanJob.objects.filter(pk__in=claimed_ids).order_by("pk"))
+
+
+def heartbeat(job: ScanJob, worker_id: str) -> bool:
+    """Renueva la concesión; False si el trabajo ya no pertenece a este worker (caducó y lo tomó otro)."""
+    now = timezone.now()
+    return ScanJob.objects.filter(pk=job.pk, status=ScanJob.RUNNING, worker_id=worker_id).update(
+        heartbeat_at=now, lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS)) == 1
+
+
+def complete_job(job: ScanJob, worker_id: str, scan_id: Optional[int]) -> bool:
+    return ScanJob.objects.filter(pk=job.pk, status=ScanJob.RUNNING, worker_id=worker_id).update(
+        status=ScanJob.DONE, scan_id=scan_id, finished_at=timezone.now(), lease_expires_at=None, last_error="") == 1
+
+
+def _retry_or_fail(attempts: int, max_attempts: int, now) -> Dict[str, Any]:
+    if attempts >= max_attempts:
+        return {"status": ScanJob.FAILED, "finished_at": now, "lease_expires_at": None}
+    # Espera exponencial entre reintentos: 30 s, 60 s, 120 s...
+    delay = JOB_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1)
+    return {"status": ScanJob.QUEUED, "available_at": now + timedelta(seconds=delay), "worker_id": "", "lease_expires_at": None}
+
+
+def fail_job(job: ScanJob, worker_id: str, error: str) -> bool:
+    """Registra el error y vuelve a encolar el trabajo (con espera) o lo marca como fallido si agotó los intentos."""
+    job.refresh_from_db(fields=["attempts", "max_attempts"])
+    return ScanJob.objects.filter(pk=job.pk, status=ScanJob.RUNNING, worker_id=worker_id).update(
+        last_error=error[:2000], **_retry_or_fail(job.attempts, job.max_attempts, timezone.now())) == 1
+
+
+def requeue_orphans() -> int:
+    """Recupera los trabajos cuyo worker dejó de latir (concesión caducada): se reintentan o se dan por fallidos."""
+    now = timezone.now()
+    recovered = 0
+    orphans: List[ScanJob] = list(ScanJob.objects.filter(status=ScanJob.RUNNING, lease_expires_at__lt=now)
+                                  .only("pk", "attempts", "max_attempts", "worker_id"))
+    for job in orphans:
+        recovered += ScanJob.objects.filter(
+            pk=job.pk, status=ScanJob.RUNNING, worker_id=job.worker_id, lease_expires_at__lt=now
+        ).update(last_error=f"Concesión caducada (worker {job.worker_id} sin latidos).",
+                 **_retry_or_fail(job.attempts, job.max_attempts, now))
+    if recovered:
+        logger.warning(f"{recovered} trabajos huérfanos recuperados (concesión caducada).")
+    return recovered
+
+
+def job_dict(job: ScanJob) -> Dict[str, Any]:
+    return {
+        "id": job.pk,
+        "domain": job.domain,
+        "scenario": job.scenario,
+        "status": job.status,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "worker_id": job.worker_id or None,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "scan_id": job.scan_id,
+        "batch": job.params.get("batch"),
+        "last_error": job.last_error or None,
+    }
@@ -0,0 +1,38 @@
+# api/job_views.py
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from core.application.field_selection import ORCHESTRATION_FIELDS, fields_from_request
+from .job_queue import enqueue_scan, job_dict, job_params
+from .models import ScanJob
+from .serializers import ScanJobRequestSerializer
+
+
+class ScanJobListView(APIView):
+    def get(self, request):
+        # Trabajos más recientes; ?status=queued|running|done|failed
+        jobs = ScanJob.objects.order_by("-created_at")
+        if request.query_params.get('status'):
+            jobs = jobs.filter(status=request.query_params['status'])
+        return Response({"jobs": [job_dict(job) for job in jobs[:100]]}, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        # Encola un escaneo para los workers (comando scan_worker); el resultado queda en /api/historial/<scan_id>/
+        serializer = ScanJobRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fields = fields_from_request(request.data, ORCHESTRATION_FIELDS)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        job = enqueue_scan(data['url_dominio'], data['scenario'], job_params(data, fields), priority=data['priority'])
+        return Response(job_dict(job), status=status.HTTP_202_ACCEPTED)
+
+
+class ScanJobDetailView(APIView):
+    def get(self, request, job_id: int):
+        job = ScanJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return Response({"error": "Trabajo no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job_dict(job), status=status.HTTP_200_OK)
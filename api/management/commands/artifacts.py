@@ -0,0 +1,49 @@
+# api/management/commands/artifacts.py
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.infrastructure.archive.artifact_archive import ArtifactNotFound, get_artifact_archive
+from core.infrastructure.scanner.nmap_scan import NmapScanner
+
+
+class Command(BaseCommand):
+    help = ("Consulta el archivo de artefactos en bruto (XML de Nmap, transcripciones de DeepSeek): "
+            "listar, mostrar, re-parsear un XML de Nmap, reconstruir el índice o aplicar la retención.")
+
+    def add_arguments(self, parser):
+        actions = parser.add_mutually_exclusive_group(required=True)
+        actions.add_argument('--list', action='store_true', help="Lista los artefactos más recientes (filtros: --kind, --key, --limit).")
+        actions.add_argument('--show', metavar='ID', help="Escribe el contenido original de un artefacto.")
+        actions.add_argument('--reparse', metavar='ID', help="Vuelve a parsear un XML de Nmap archivado.")
+        actions.add_argument('--rebuild-index', action='store_true', help="Reconstruye el índice desde los segmentos.")
+        actions.add_argument('--stats', action='store_true', help="Tamaño y ratio de compresión por tipo.")
+        actions.add_argument('--prune', action='store_true',
+                             help="Aplica ya la retención (ARTIFACT_RETENTION_DAYS, ARTIFACT_MAX_BYTES).")
+        parser.add_argument('--kind', help="Tipo de artefacto (nmap_xml, deepseek_transcript).")
+        parser.add_argument('--key', help="Clave del artefacto (objetivo de Nmap, modelo de DeepSeek).")
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        archive = get_artifact_archive()
+        try:
+            if options['show']:
+                self.stdout.write(archive.get(options['show']).decode("utf-8", errors="replace"))
+            elif options['reparse']:
+                host = NmapScanner().parse_archived_xml(options['reparse'])
+                self.stdout.write(host.model_dump_json(indent=2))
+            elif options['rebuild_index']:
+                self.stdout.write(f"{archive.rebuild_index()} artefactos indexados.")
+            elif options['stats']:
+                self.stdout.write(json.dumps(archive.stats(), indent=2))
+            elif options['prune']:
+                removed = archive.prune()
+                self.stdout.write(f"{len(removed)} segmentos borrados." + (f" ({', '.join(removed)})" if removed else ""))
+            else:
+                for entry in archive.find(options['kind'], options['key'], limit=options['limit']):
+                    created_at = datetime.fromtimestamp(entry["created_at"]).isoformat(timespec="seconds")
+                    self.stdout.write(f"{entry['id']}  {created_at}  {entry['kind']:<20} {entry['key']:<30} "
+                                      f"{entry['raw_length']} -> {entry['length']} bytes")
+        except (ArtifactNotFound, KeyError) as e:
+            raise CommandError(f"Artefacto no encontrado: {e}")
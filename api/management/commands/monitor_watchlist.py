@@ -0,0 +1,48 @@
+# api/management/commands/monitor_watchlist.py
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.monitoring import WatchlistScheduler, add_to_watchlist
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ("Vuelve a escanear periódicamente (modo incremental) los dominios de la lista de vigilancia, "
+            "repartiendo los escaneos en el tiempo.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Escanea los activos vencidos y termina.")
+        parser.add_argument('--poll', type=float, default=60.0,
+                            help="Espera máxima (segundos) entre comprobaciones de la lista.")
+        parser.add_argument('--max-scans', type=int, default=None, help="Máximo de escaneos por ronda.")
+        parser.add_argument('--enqueue', action='store_true',
+                            help="Encola los escaneos para los workers (scan_worker) en lugar de ejecutarlos.")
+        parser.add_argument('--add', metavar='DOMINIO', help="Añade un dominio a la lista y termina.")
+        parser.add_argument('--scenario', choices=['basic', 'complete'], default='basic')
+        parser.add_argument('--interval', type=int, default=24 * 3600, help="Intervalo de re-escaneo en segundos (con --add).")
+        parser.add_argument('--criticality', type=int, choices=range(1, 6), default=3, help="Criticidad 1-5 (con --add).")
+
+    def handle(self, *args, **options):
+        if options['add']:
+            asset = add_to_watchlist(options['add'], options['scenario'], options['interval'], options['criticality'])
+            self.stdout.write(f"En vigilancia: {asset}. Primera ejecución: {asset.next_run_at:%Y-%m-%d %H:%M:%S}.")
+            return
+
+        scheduler = WatchlistScheduler(enqueue=options['enqueue'])
+        if options['once']:
+            scanned = scheduler.run_pending(options['max_scans'])
+            self.stdout.write(f"{scanned} activos escaneados.")
+            return
+
+        self.stdout.write("Monitor de la lista de vigilancia iniciado (Ctrl+C para salir).")
+        try:
+            while True:
+                scanned = scheduler.run_pending(options['max_scans'])
+                if scanned:
+                    logger.info(f"Monitor: {scanned} activos escaneados en esta ronda.")
+                time.sleep(scheduler.seconds_until_next(options['poll']))
+        except KeyboardInterrupt:
+            self.stdout.write("Monitor detenido.")
@@ -0,0 +1,38 @@
+# api/management/commands/scan_worker.py
+import threading
+
+from django.core.management.base import BaseCommand
+
+from api.scan_worker import ScanWorker
+
+
+class Command(BaseCommand):
+    help = ("Worker de la cola de escaneos (ScanJob). Se pueden arrancar tantos como se quiera, "
+            "en uno o varios nodos que compartan la base de datos.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help="Escaneos simultáneos en este proceso (hilos).")
+        parser.add_argument('--poll', type=float, default=5.0, help="Espera (segundos) cuando la cola está vacía.")
+        parser.add_argument('--once', action='store_true', help="Procesa los trabajos disponibles y termina.")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        results = []
+
+        def work():
+            results.append(ScanWorker().run(stop, options['poll'], exit_when_idle=options['once']))
+
+        threads = [threading.Thread(target=work, name=f"scan-worker-{i}") for i in range(max(1, options['concurrency']))]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"{len(threads)} workers de escaneo iniciados (Ctrl+C para salir).")
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1.0)
+        except KeyboardInterrupt:
+            self.stdout.write("Deteniendo: se terminan los escaneos en curso...")
+            stop.set()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(f"{sum(results)} trabajos procesados.")
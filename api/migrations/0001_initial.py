@@ -0,0 +1,69 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Scan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=255)),
+                ('scenario', models.CharField(max_length=32)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('risk_score', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('local_analysis', models.JSONField(blank=True, null=True)),
+                ('deepseek_analysis', models.TextField(blank=True, null=True)),
+                ('deepseek_analysis_cached', models.BooleanField(default=False)),
+                ('execution_errors', models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [
+                    models.Index(fields=['domain', '-created_at'], name='api_scan_domain_created_idx'),
+                    models.Index(fields=['-created_at'], name='api_scan_created_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScanResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scanner', models.CharField(max_length=32)),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='api.scan')),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(fields=('scan', 'scanner'), name='api_scanresult_scan_scanner_uniq'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScanPort',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip', models.CharField(max_length=255)),
+                ('port', models.PositiveIntegerField()),
+                ('protocol', models.CharField(max_length=8)),
+                ('state', models.CharField(max_length=32)),
+                ('service_name', models.CharField(blank=True, default='', max_length=64)),
+                ('product', models.CharField(blank=True, default='', max_length=255)),
+                ('version', models.CharField(blank=True, default='', max_length=255)),
+                ('extrainfo', models.CharField(blank=True, default='', max_length=255)),
+                ('scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ports', to='api.scan')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['ip'], name='api_scanport_ip_idx'),
+                    models.Index(fields=['port', 'state'], name='api_scanport_port_state_idx'),
+                ],
+            },
+        ),
+    ]
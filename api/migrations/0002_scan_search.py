@@ -0,0 +1,35 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scanport',
+            index=models.Index(fields=['product', 'version'], name='api_scanport_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scanport',
+            index=models.Index(fields=['service_name'], name='api_scanport_service_idx'),
+        ),
+        migrations.CreateModel(
+            name='ScanRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=8)),
+                ('record_type', models.CharField(max_length=16)),
+                ('value', models.CharField(max_length=255)),
+                ('scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='records', to='api.scan')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['record_type', 'value'], name='api_scanrecord_type_value_idx'),
+                ],
+            },
+        ),
+    ]
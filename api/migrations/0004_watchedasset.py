@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_scanresult_reused_from'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchedAsset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=255, unique=True)),
+                ('scenario', models.CharField(default='basic', max_length=32)),
+                ('interval_seconds', models.PositiveIntegerField(default=86400)),
+                ('criticality', models.PositiveSmallIntegerField(default=3)),
+                ('enabled', models.BooleanField(default=True)),
+                ('next_run_at', models.DateTimeField()),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_scan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.scan')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['enabled', 'next_run_at'], name='api_watched_due_idx'),
+                ],
+            },
+        ),
+    ]
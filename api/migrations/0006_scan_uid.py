@@ -0,0 +1,32 @@
+import uuid
+
+from django.db import migrations, models
+
+
+def fill_scan_uids(apps, schema_editor):
+    Scan = apps.get_model('api', 'Scan')
+    for scan in Scan.objects.filter(uid__isnull=True).only('pk'):
+        scan.uid = uuid.uuid4()
+        scan.save(update_fields=['uid'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_scanjob'),
+    ]
+
+    operations = [
+        # En tres pasos para que los escaneos existentes reciban un uid distinto cada uno
+        migrations.AddField(
+            model_name='scan',
+            name='uid',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_scan_uids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='scan',
+            name='uid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
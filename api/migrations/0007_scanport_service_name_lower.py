@@ -0,0 +1,19 @@
+from django.db import migrations
+from django.db.models.functions import Lower
+
+
+def lowercase_service_names(apps, schema_editor):
+    # search_ports busca el servicio en minúsculas; los puertos guardados antes se normalizan igual
+    ScanPort = apps.get_model('api', 'ScanPort')
+    ScanPort.objects.exclude(service_name='').update(service_name=Lower('service_name'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_scan_uid'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_service_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,210 @@
+# api/models.py
+import uuid
+
+from django.db import models
+
+
+class Scan(models.Model):
+    """
+    Un escaneo guardado: una orquestación (escenario 'complete'/'basic') o un escáner individual
+    (escenario 'dns', 'nmap' o 'whois'). Los resultados de cada escáner están en ScanResult y los
+    puertos de Nmap, desnormalizados para poder buscarlos, en ScanPort.
+    """
+    # Identificador conocido antes de guardar: las respuestas lo incluyen aunque la escritura sea diferida
+    uid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    domain = models.CharField(max_length=255)
+    scenario = models.CharField(max_length=32)
+    created_at = models.DateTimeField(auto_now_add=True)
+    risk_score = models.PositiveSmallIntegerField(null=True, blank=True)
+    local_analysis = models.JSONField(null=True, blank=True)
+    deepseek_analysis = models.TextField(null=True, blank=True)
+    deepseek_analysis_cached = models.BooleanField(default=False)
+    execution_errors = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["domain", "-created_at"], name="api_scan_domain_created_idx"),
+            models.Index(fields=["-created_at"], name="api_scan_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.domain} ({self.scenario}, {self.created_at:%Y-%m-%d %H:%M})"
+
+
+class ScanResult(models.Model):
+    """Resultado estructurado de un escáner dentro de un escaneo (mismo formato que 'scan_results')."""
+    scan = models.ForeignKey(Scan, on_delete=models.CASCADE, related_name="results")
+    scanner = models.CharField(max_length=32)
+    data = models.JSONField(null=True, blank=True)
+    # Escaneo incremental: el resultado se reutilizó de este escaneo anterior (no es una observación nueva)
+    reused_from = models.ForeignKey(Scan, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scan", "scanner"], name="api_scanresult_scan_scanner_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.scanner} #{self.scan_id}"
+
+
+class ScanPort(models.Model):
+    """Puerto detectado por Nmap en un escaneo, con su servicio (si se ejecutó la detección de servicios)."""
+    scan = models.ForeignKey(Scan, on_delete=models.CASCADE, related_name="ports")
+    ip = models.CharField(max_length=255)
+    port = models.PositiveIntegerField()
+    protocol = models.CharField(max_length=8)
+    state = models.CharField(max_length=32)
+    service_name = models.CharField(max_length=64, blank=True, default="")
+    product = models.CharField(max_length=255, blank=True, default="")
+    version = models.CharField(max_length=255, blank=True, default="")
+    extrainfo = models.CharField(max_length=255, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["ip"], name="api_scanport_ip_idx"),
+            models.Index(fields=["port", "state"], name="api_scanport_port_state_idx"),
+            models.Index(fields=["product", "version"], name="api_scanport_product_idx"),
+            models.Index(fields=["service_name"], name="api_scanport_service_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.ip}:{self.port}/{self.protocol} ({self.state})"
+
+
+class ScanRecord(models.Model):
+    """
+    Registro DNS (A, AAAA, CNAME, MX, NS) o dato WHOIS (NS, REGISTRAR, EMAIL) de un escaneo,
+    normalizado en minúsculas para las búsquedas transversales ("dominios cuyo NS es X").
+    """
+    scan = models.ForeignKey(Scan, on_delete=models.CASCADE, related_name="records")
+    source = models.CharField(max_length=8)
+    record_type = models.CharField(max_length=16)
+    value = models.CharField(max_length=255)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["record_type", "value"], name="api_scanrecord_type_value_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.record_type} {self.value} ({self.source} #{self.scan_id})"
+
+
+class WatchedAsset(models.Model):
+    """
+    Dominio de la lista de vigilancia: el comando monitor_watchlist lo vuelve a escanear (en modo
+    incremental) cada 'interval_seconds', con prioridad según lo atrasado que va y su criticidad.
+    """
+    domain = models.CharField(max_length=255, unique=True)
+    scenario = models.CharField(max_length=32, default="basic")
+    interval_seconds = models.PositiveIntegerField(default=24 * 3600)
+    criticality = models.PositiveSmallIntegerField(default=3)  # 1 (baja) a 5 (crítica)
+    enabled = models.BooleanField(default=True)
+    next_run_at = models.DateTimeField()
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_scan = models.ForeignKey(Scan, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["enabled", "next_run_at"], name="api_watched_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.domain} (cada {self.interval_seconds} s, criticidad {self.criticality})"
+
+
+class ScanJob(models.Model):
+    """
+    Escaneo encolado para los workers (comando scan_worker). Un worker lo reclama con una concesión
+    ('lease') que renueva con latidos; si deja de latir, la concesión caduca y el trabajo se reintenta.
+    """
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+    STATUS_CHOICES = [(QUEUED, "En cola"), (RUNNING, "En ejecución"), (DONE, "Terminado"), (FAILED, "Fallido")]
+
+    domain = models.CharField(max_length=255)
+    scenario = models.CharField(max_length=32, default="basic")
+    params = models.JSONField(default=dict, blank=True)  # gquery, dork_packs, dork_max_results, fields, incremental
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    available_at = models.DateTimeField()
+    worker_id = models.CharField(max_length=128, blank=True, default="")
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    scan = models.ForeignKey(Scan, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="api_scanjob_claim_idx"),
+            models.Index(fields=["status", "lease_expires_at"], name="api_scanjob_lease_idx"),
+        ]
+
+    def __str__(self):
+        return f"Trabajo #{self.pk} {self.domain} ({self.status})"
+
+
+class DeepSeekBatchJob(models.Model):
+    """
+    Lote de prompts para DeepSeek (POST deepseek/lote/): se procesa en segundo plano y el cliente
+    consulta su estado y resultados por el id. 'completed' avanza a medida que termina cada prompt.
+    """
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+    STATUS_CHOICES = [(QUEUED, "En cola"), (RUNNING, "En ejecución"), (DONE, "Terminado"), (FAILED, "Fallido")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    prompts = models.JSONField(default=list)
+    requests_per_minute = models.FloatField(null=True, blank=True)  # Límites efectivos (None = sin límite)
+    tokens_per_minute = models.FloatField(null=True, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    completed = models.PositiveIntegerField(default=0)
+    results = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Lote DeepSeek {self.pk} ({self.status}, {self.completed}/{len(self.prompts)})"
+
+
+class ChatConversation(models.Model):
+    """
+    Sesión de chat (chat.services.chat_sessions): 'context' encabeza cada petición y los turnos están en
+    ChatMessage. 'version' aumenta con cada turno guardado; un turno calculado sobre una versión anterior
+    (otra petición respondió antes) se rechaza en vez de intercalarse.
+    """
+    id = models.CharField(max_length=32, primary_key=True)
+    context = models.TextField(null=True, blank=True)
+    metadata = models.JSONField(default=dict, blank=True)
+    version = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(db_index=True)  # Caducidad por inactividad (CHAT_SESSION_TTL)
+
+    def __str__(self):
+        return f"Sesión de chat {self.pk} (v{self.version})"
+
+
+class ChatMessage(models.Model):
+    conversation = models.ForeignKey(ChatConversation, on_delete=models.CASCADE, related_name="messages")
+    position = models.PositiveIntegerField()
+    role = models.CharField(max_length=16)  # user | assistant
+    content = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["conversation", "position"], name="api_chatmessage_position_uniq"),
+        ]
+        ordering = ["position"]
+
+    def __str__(self):
+        return f"{self.conversation_id}#{self.position} ({self.role})"
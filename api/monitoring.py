@@ -0,0 +1,147 @@
+# api/monitoring.py
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from django.utils import timezone
+
+from core.application.orchestration_service import OrchestrationService
+from .job_queue import enqueue_scan
+from .models import WatchedAsset
+from .scan_history import get_scan_history, record_scan
+
+logger = logging.getLogger(__name__)
+
+MONITOR_JITTER_RATIO = float(os.getenv('MONITOR_JITTER_RATIO', '0.1'))
+MONITOR_SCANS_PER_MINUTE = float(os.getenv('MONITOR_SCANS_PER_MINUTE', '6'))
+MONITOR_RETRY_SECONDS = int(os.getenv('MONITOR_RETRY_SECONDS', '900'))
+# Mientras un activo se escanea su próxima ejecución se aplaza este tiempo (otro monitor no lo toma)
+MONITOR_CLAIM_SECONDS = int(os.getenv('MONITOR_CLAIM_SECONDS', '1800'))
+
+
+def jittered(seconds: float, ratio: float = MONITOR_JITTER_RATIO) -> timedelta:
+    """Intervalo con una variación aleatoria de ±ratio, para que los activos no coincidan siempre."""
+    return timedelta(seconds=max(1.0, seconds * (1 + random.uniform(-ratio, ratio))))
+
+
+def initial_run_at(interval_seconds: int, now: Optional[datetime] = None) -> datetime:
+    """Primera ejecución de un activo nuevo: repartida al azar dentro de su primer intervalo."""
+    now = now or timezone.now()
+    return now + timedelta(seconds=random.uniform(0, min(interval_seconds, 3600)))
+
+
+def priority(asset: WatchedAsset, now: datetime) -> float:
+    """Prioridad de un activo vencido: retraso relativo a su intervalo, ponderado por la criticidad."""
+    overdue = max(0.0, (now - asset.next_run_at).total_seconds())
+    return (1 + overdue / max(asset.interval_seconds, 1)) * asset.criticality
+
+
+class RateLimiter:
+    """Separa el inicio de los escaneos al menos 60 / per_minute segundos."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.min_gap = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.clock = clock
+        self.sleep = sleep
+        self._last_start: Optional[float] = None
+
+    def wait(self) -> None:
+        if self._last_start is not None:
+            remaining = self._last_start + self.min_gap - self.clock()
+            if remaining > 0:
+                self.sleep(remaining)
+        self._last_start = self.clock()
+
+
+class WatchlistScheduler:
+    """
+    Escanea los activos vencidos de la lista de vigilancia, de mayor a menor prioridad, a un ritmo
+    máximo (RateLimiter) y en modo incremental. Tras cada escaneo la próxima ejecución se programa
+    a un intervalo con jitter; tras un error, a MONITOR_RETRY_SECONDS. Con 'enqueue' no escanea:
+    encola los trabajos para los workers (comando scan_worker), con la criticidad como prioridad.
+    """
+
+    def __init__(self, service: Optional[OrchestrationService] = None, rate_limiter: Optional[RateLimiter] = None,
+                 batch_size: int = 50, enqueue: bool = False):
+        self.enqueue = enqueue
+        self.service = service or (None if enqueue else OrchestrationService(scan_history=get_scan_history()))
+        self.rate_limiter = rate_limiter or RateLimiter(MONITOR_SCANS_PER_MINUTE)
+        self.batch_size = batch_size
+
+    def due_assets(self, now: Optional[datetime] = None) -> List[WatchedAsset]:
+        now = now or timezone.now()
+        assets = list(WatchedAsset.objects.filter(enabled=True, next_run_at__lte=now)
+                      .order_by("next_run_at")[:self.batch_size])  # índice (enabled, next_run_at)
+        return sorted(assets, key=lambda asset: priority(asset, now), reverse=True)
+
+    @staticmethod
+    def claim(asset: WatchedAsset, now: datetime) -> bool:
+        """Aplaza el activo de forma atómica; False si otro monitor ya lo tomó."""
+        claimed_until = now + timedelta(seconds=MONITOR_CLAIM_SECONDS)
+        updated = WatchedAsset.objects.filter(pk=asset.pk, next_run_at=asset.next_run_at).update(next_run_at=claimed_until)
+        return updated == 1
+
+    def enqueue_asset(self, asset: WatchedAsset) -> None:
+        now = timezone.now()
+        job = enqueue_scan(asset.domain, asset.scenario, {"incremental": True}, priority=asset.criticality)
+        logger.info(f"Monitor: {asset.domain} encolado (trabajo #{job.pk}).")
+        WatchedAsset.objects.filter(pk=asset.pk).update(last_run_at=now, next_run_at=now + jittered(asset.interval_seconds))
+
+    def run_asset(self, asset: WatchedAsset) -> None:
+        if self.enqueue:
+            self.enqueue_asset(asset)
+            return
+        started = timezone.now()
+        try:
+            response = self.service.run_scan(url_dominio=asset.domain, scenario=asset.scenario, incremental=True)
+        except Exception as e:
+            logger.exception(f"Monitor: error al escanear {asset.domain}: {e}")
+            WatchedAsset.objects.filter(pk=asset.pk).update(
+                last_run_at=started, last_error=str(e)[:2000],
+                next_run_at=timezone.now() + jittered(min(asset.interval_seconds, MONITOR_RETRY_SECONDS)),
+            )
+            return
+        scan_id = record_scan(response, defer=False)  # Fuera de la petición: se necesita el id
+        changes = (response.get("incremental") or {}).get("diff")
+        logger.info(f"Monitor: {asset.domain} escaneado" + (f"; cambios en {', '.join(changes)}." if changes else " sin cambios."))
+        WatchedAsset.objects.filter(pk=asset.pk).update(
+            last_run_at=started, last_scan_id=scan_id, last_error="",
+            next_run_at=started + jittered(asset.interval_seconds),
+        )
+
+    def run_pending(self, max_scans: Optional[int] = None) -> int:
+        """Escanea los activos vencidos (como mucho max_scans) y retorna cuántos se escanearon."""
+        scanned = 0
+        for asset in self.due_assets():
+            if max_scans is not None and scanned >= max_scans:
+                break
+            self.rate_limiter.wait()
+            if not self.claim(asset, timezone.now()):
+                continue
+            self.run_asset(asset)
+            scanned += 1
+        return scanned
+
+    def seconds_until_next(self, default: float) -> float:
+        next_run_at = (WatchedAsset.objects.filter(enabled=True).order_by("next_run_at")
+                       .values_list("next_run_at", flat=True).first())
+        if next_run_at is None:
+            return default
+        return max(0.0, min(default, (next_run_at - timezone.now()).total_seconds()))
+
+
+def add_to_watchlist(domain: str, scenario: str = "basic", interval_seconds: int = 24 * 3600,
+                     criticality: int = 3) -> WatchedAsset:
+    """Añade (o actualiza) un dominio en la lista de vigilancia."""
+    asset, created = WatchedAsset.objects.get_or_create(
+        domain=domain.strip().lower(),
+        defaults={"scenario": scenario, "interval_seconds": interval_seconds, "criticality": criticality,
+                  "next_run_at": initial_run_at(interval_seconds)},
+    )
+    if not created:
+        asset.scenario, asset.interval_seconds, asset.criticality, asset.enabled = scenario, interval_seconds, criticality, True
+        asset.save(update_fields=["scenario", "interval_seconds", "criticality", "enabled"])
+    return asset
@@ -3,12 +3,39 @@ import logging
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.settings import api_settings
 from core.application.orchestration_service import OrchestrationService
+from core.application.field_selection import ORCHESTRATION_FIELDS, FieldSelection, fields_from_request
+from core.application.report_rendering import RENDERERS, ScanReport
+from chat.services.chat_sessions import create_session_from_scan, get_chat_session_store
+from chat.services.sse import EventStreamRenderer, sse_response, wants_stream
+from .job_queue import enqueue_batch, job_dict, job_params
+from .scan_history import get_scan_history, record_scan
+from .serializers import BatchScanRequestSerializer, OrchestrationOptionsSerializer, boolean_flag
 
 logger = logging.getLogger(__name__)
 
+def with_chat_session(events):
+    """Añade 'chat_session_id' al evento 'done' de un escaneo en streaming."""
+    for event, data in events:
+        if event == "done":
+            data["chat_session_id"] = create_session_from_scan(get_chat_session_store(), data).session_id
+        yield event, data
+
+def with_scan_history(events, selection: FieldSelection):
+    """
+    Guarda el escaneo completo en el historial al llegar el evento 'done' (de run_scan_stream con
+    trim=False) y lo emite recortado según 'fields', con 'scan_uid'.
+    """
+    for event, data in events:
+        if event == "done":
+            record_scan(data)
+            data = selection.trim_response(data)
+        yield event, data
+
 class BaseOrchestrationView(APIView):
     scenario_name = None 
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
 
     def post(self, request, *args, **kwargs):
         if not self.scenario_name:
@@ -20,7 +47,31 @@ class BaseOrchestrationView(APIView):
 
         # CAMBIO: 'target' renombrado a 'url_dominio'
         url_dominio_recibido = request.data.get('url_dominio')
-        custom_gquery = request.data.get('gquery', None) 
+        options = OrchestrationOptionsSerializer(data=request.data)
+        if not options.is_valid():
+            return Response(options.errors, status=status.HTTP_400_BAD_REQUEST)
+        custom_gquery = options.validated_data.get('gquery') or None
+        dork_packs = options.validated_data.get('dork_packs')
+        dork_max_results = options.validated_data['dork_max_results']
+        # Con 'start_session' la respuesta incluye 'chat_session_id' para hacer preguntas de seguimiento
+        try:
+            start_session = boolean_flag(request.data, 'start_session')
+            # Con 'incremental' solo se vuelven a escanear las etapas cuyo último resultado ha caducado
+            incremental = boolean_flag(request.data, 'incremental')
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # 'report_format' ("text" o "markdown") añade el informe renderizado en 'report'
+        report_format = request.data.get('report_format')
+        if report_format is not None and report_format not in RENDERERS:
+            return Response(
+                {"error": f"'report_format' debe ser uno de: {', '.join(RENDERERS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # 'fields' (o 'include') limita qué escáneres se ejecutan y qué se devuelve, p. ej. ["nmap.ports"]
+        try:
+            fields = fields_from_request(request.data, ORCHESTRATION_FIELDS)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         if not url_dominio_recibido:
             return Response(
@@ -30,14 +81,40 @@ class BaseOrchestrationView(APIView):
 
         logger.info(f"API: Recibida solicitud para escaneo '{self.scenario_name}' en objetivo: {url_dominio_recibido}")
         try:
-            service = OrchestrationService()
+            service = OrchestrationService(scan_history=get_scan_history())
+            if wants_stream(request):
+                # Eventos SSE: resultados de los escáneres en cuanto terminan y el análisis token a token
+                events = service.run_scan_stream(
+                    url_dominio=url_dominio_recibido,
+                    scenario=self.scenario_name,
+                    custom_gquery=custom_gquery,
+                    dork_packs=dork_packs,
+                    dork_max_results=dork_max_results,
+                    fields=fields,
+                    incremental=incremental,
+                    trim=False
+                )
+                events = with_scan_history(events, FieldSelection(fields))
+                return sse_response(with_chat_session(events) if start_session else events)
             # CAMBIO: Pasar 'url_dominio'
             results = service.run_scan(
                 url_dominio=url_dominio_recibido, 
                 scenario=self.scenario_name, 
-                custom_gquery=custom_gquery
+                custom_gquery=custom_gquery,
+                dork_packs=dork_packs,
+                dork_max_results=dork_max_results,
+                fields=fields,
+                incremental=incremental,
+                trim=False
             )
-            
+            # Al historial va la respuesta completa; al cliente, solo lo que pidió en 'fields'
+            record_scan(results)
+            results = FieldSelection(fields).trim_response(results)
+            if start_session:
+                results["chat_session_id"] = create_session_from_scan(get_chat_session_store(), results).session_id
+            if report_format:
+                results["report"] = ScanReport.from_response(results).render(report_format)
+
             return Response(results, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -51,4 +128,24 @@ class ConsultaCompletaView(BaseOrchestrationView):
     scenario_name = 'complete'
 
 class ConsultaBasicaView(BaseOrchestrationView):
-    scenario_name = 'basic'
\ No newline at end of file
+    scenario_name = 'basic'
+
+def batch_accepted(batch_id, jobs) -> dict:
+    """Respuesta 202 de un lote encolado: el estado de cada dominio se sigue en /api/trabajos/<id>/."""
+    return {"batch": batch_id, "jobs": [job_dict(job) for job in jobs]}
+
+class ConsultaLoteView(APIView):
+    def post(self, request):
+        # Varios dominios con un plan de Nmap común: las IPs compartidas (CDN, hosting) se escanean una sola vez.
+        # El lote se encola (un ScanJob por dominio) y lo ejecutan los workers (comando scan_worker).
+        serializer = BatchScanRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fields = fields_from_request(request.data, ORCHESTRATION_FIELDS)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        logger.info(f"API: Recibida solicitud de lote '{data['scenario']}' con {len(data['domains'])} dominios")
+        batch_id, jobs = enqueue_batch(data['domains'], data['scenario'], job_params(data, fields))
+        return Response(batch_accepted(batch_id, jobs), status=status.HTTP_202_ACCEPTED)
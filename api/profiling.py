@@ -0,0 +1,285 @@
+# api/profiling.py
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from typing import Any, Dict, List, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import reverse
+from rest_framework.permissions import BasePermission
+
+logger = logging.getLogger(__name__)
+
+# Perfilado por petición: desactivado, el middleware ni siquiera entra en la cadena de Django
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+# Sin token, solo los usuarios staff (sesión del admin) pueden perfilar y usar los endpoints de diagnóstico
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/request_profiles')
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '50'))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "profile"
+TOKEN_HEADER = "X-Profiling-Token"
+SORT_KEYS = {key.value for key in pstats.SortKey}
+SNAPSHOT_GROUPS = ("lineno", "filename", "traceback")
+
+
+def _has_token(request) -> bool:
+    token = request.headers.get(TOKEN_HEADER, "")
+    return bool(PROFILING_TOKEN) and hmac.compare_digest(token, PROFILING_TOKEN)
+
+
+def _is_staff(request) -> bool:
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_active and user.is_staff)
+
+
+class HasProfilingToken(BasePermission):
+    """Acceso con la cabecera X-Profiling-Token (si PROFILING_TOKEN está configurado)."""
+
+    def has_permission(self, request, view):
+        return _has_token(request)
+
+
+class ProfileStore:
+    """
+    Perfiles guardados en disco: '<id>.prof' (formato de pstats, se abre con snakeviz o pstats) y
+    '<id>.json' con los datos de la petición. Se conservan los 'max_files' más recientes.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_files: int = PROFILE_MAX_FILES):
+        self.root = root or PROFILE_DIR
+        self.max_files = max_files
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        return os.path.join(self.root, f"{uuid.UUID(str(profile_id)).hex}.{extension}")
+
+    def save(self, profile: cProfile.Profile, meta: Dict[str, Any]) -> str:
+        os.makedirs(self.root, exist_ok=True)
+        profile_id = uuid.uuid4().hex
+        profile.dump_stats(self._path(profile_id, "prof"))
+        with open(self._path(profile_id, "json"), "w", encoding="utf-8") as f:
+            json.dump({"id": profile_id, **meta}, f)
+        self._prune()
+        return profile_id
+
+    def _prune(self) -> None:
+        profiles = sorted((entry for entry in os.scandir(self.root) if entry.name.endswith(".prof")),
+                          key=lambda entry: entry.stat().st_mtime)
+        for entry in profiles[:max(0, len(profiles) - self.max_files)]:
+            for extension in ("prof", "json"):
+                try:
+                    os.remove(self._path(entry.name[:-5], extension))
+                except (OSError, ValueError):
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.root):
+            return []
+        profiles = []
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(".json"):
+                try:
+                    with open(entry.path, encoding="utf-8") as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(profiles, key=lambda meta: meta.get("created_at", 0), reverse=True)
+
+    def profile_path(self, profile_id: str) -> Optional[str]:
+        path = self._path(profile_id, "prof")
+        return path if os.path.exists(path) else None
+
+    def text_report(self, profile_id: str, sort: str = "cumulative", limit: int = 50) -> Optional[str]:
+        path = self.profile_path(profile_id)
+        if path is None:
+            return None
+        stream = io.StringIO()
+        pstats.Stats(path, stream=stream).strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+_profile_store: Optional[ProfileStore] = None
+_profile_store_lock = threading.Lock()
+# cProfile mide el hilo que lo activa y, desde Python 3.12, solo admite un perfilador activo a la vez
+_profiling_lock = threading.Lock()
+
+
+def get_profile_store() -> ProfileStore:
+    global _profile_store
+    if _profile_store is None:
+        with _profile_store_lock:
+            if _profile_store is None:
+                _profile_store = ProfileStore()
+    return _profile_store
+
+
+class RequestProfilingMiddleware:
+    """
+    Perfil de CPU (cProfile) de una petición concreta, pedido con la cabecera 'X-Profile: 1' o con
+    '?profile=1' por un usuario staff o con X-Profiling-Token. La respuesta lleva X-Profile-Id y
+    X-Profile-Url para descargar el perfil.
+
+    Con PROFILING_ENABLED desactivado se lanza MiddlewareNotUsed y Django lo quita de la cadena: sin
+    coste en las peticiones. Limitaciones: se mide solo el hilo de la petición (no los pools de
+    run_batch ni sync_to_async), en ASGI se cuela lo que otras corrutinas ejecuten en el mismo bucle,
+    y de las respuestas en streaming solo se mide hasta que la vista devuelve la respuesta. Si ya
+    hay un perfil en curso, la petición se atiende sin perfilar (X-Profile-Skipped).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not PROFILING_ENABLED:
+            raise MiddlewareNotUsed("Perfilado por petición desactivado (PROFILING_ENABLED).")
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _requested(request) -> bool:
+        return request.headers.get(PROFILE_HEADER) == "1" or request.GET.get(PROFILE_QUERY_PARAM) == "1"
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self._requested(request) or not (_has_token(request) or _is_staff(request)):
+            return self.get_response(request)
+        if not _profiling_lock.acquire(blocking=False):
+            response = self.get_response(request)
+            response["X-Profile-Skipped"] = "busy"
+            return response
+        try:
+            profile = cProfile.Profile()
+            started = time.perf_counter()
+            profile.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.disable()
+            elapsed = time.perf_counter() - started
+        finally:
+            _profiling_lock.release()
+        return self._store(request, response, profile, elapsed)
+
+    async def __acall__(self, request):
+        if not self._requested(request) or not (_has_token(request) or await sync_to_async(_is_staff)(request)):
+            return await self.get_response(request)
+        if not _profiling_lock.acquire(blocking=False):
+            response = await self.get_response(request)
+            response["X-Profile-Skipped"] = "busy"
+            return response
+        try:
+            profile = cProfile.Profile()
+            started = time.perf_counter()
+            profile.enable()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profile.disable()
+            elapsed = time.perf_counter() - started
+        finally:
+            _profiling_lock.release()
+        return await sync_to_async(self._store)(request, response, profile, elapsed)
+
+    @staticmethod
+    def _store(request, response, profile: cProfile.Profile, elapsed: float):
+        meta = {"method": request.method, "path": request.path, "status": response.status_code,
+                "duration_ms": round(elapsed * 1000, 2), "created_at": time.time()}
+        try:
+            profile_id = get_profile_store().save(profile, meta)
+        except OSError as e:
+            logger.error(f"No se pudo guardar el perfil de {request.method} {request.path}: {e}")
+            response["X-Profile-Skipped"] = "error"
+            return response
+        logger.info(f"Perfil {profile_id}: {request.method} {request.path} ({meta['duration_ms']} ms)")
+        response["X-Profile-Id"] = profile_id
+        response["X-Profile-Url"] = reverse('api-profile-detail', args=[profile_id])
+        return response
+
+
+# --- Memoria ---
+_last_snapshot: Optional[tracemalloc.Snapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def start_tracing(frames: int = 1) -> None:
+    """Empieza a trazar las asignaciones (o arranca el proceso con PYTHONTRACEMALLOC=<frames>)."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        logger.info(f"tracemalloc activado ({frames} frames por traza).")
+
+
+def stop_tracing() -> None:
+    global _last_snapshot
+    with _snapshot_lock:
+        _last_snapshot = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        logger.info("tracemalloc desactivado.")
+
+
+def _allocation(stat) -> Dict[str, Any]:
+    frames = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+    entry = {"location": frames[0] if frames else None, "size_bytes": stat.size, "count": stat.count}
+    if len(frames) > 1:
+        entry["traceback"] = frames
+    if hasattr(stat, "size_diff"):
+        entry["size_diff_bytes"] = stat.size_diff
+        entry["count_diff"] = stat.count_diff
+    return entry
+
+
+def memory_snapshot(limit: int = 25, group_by: str = "lineno", compare: bool = False) -> Dict[str, Any]:
+    """
+    Asignaciones que más memoria ocupan según tracemalloc, agrupadas por línea, fichero o traza.
+    Con 'compare', la diferencia respecto a la instantánea anterior (para ver qué crece).
+    """
+    global _last_snapshot
+    if not tracemalloc.is_tracing():
+        return {"tracing": False, "allocations": []}
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+    with _snapshot_lock:
+        previous, _last_snapshot = _last_snapshot, snapshot
+    if compare and previous is not None:
+        stats = snapshot.compare_to(previous, group_by)
+    else:
+        stats = snapshot.statistics(group_by)
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "traceback_limit": tracemalloc.get_traceback_limit(),
+        "traced_current_bytes": current,
+        "traced_peak_bytes": peak,
+        "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+        "compared_to_previous": compare and previous is not None,
+        "allocations": [_allocation(stat) for stat in stats[:limit]],
+    }
+
+
+def internal_cache_sizes() -> Dict[str, Any]:
+    """Tamaño de las estructuras en memoria del proceso: cachés, buffer de escritura y mmaps."""
+    from core.infrastructure.archive.artifact_archive import get_artifact_archive
+    from core.infrastructure.cache.tiered_cache import caches_memory_usage
+    from .scan_history import get_write_buffer
+
+    return {
+        "tiered_caches": caches_memory_usage(),
+        "scan_write_buffer": get_write_buffer().stats(),
+        "artifact_archive_maps": get_artifact_archive().mapped_segments(),
+    }
@@ -0,0 +1,76 @@
+# api/profiling_views.py
+from django.http import FileResponse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from .profiling import (
+    SNAPSHOT_GROUPS, SORT_KEYS, HasProfilingToken, get_profile_store, internal_cache_sizes, memory_snapshot,
+    start_tracing, stop_tracing
+)
+from .serializers import MemoryTracingRequestSerializer
+
+MAX_REPORT_LIMIT = 200
+
+
+class DiagnosticsView(APIView):
+    # Solo staff (sesión del admin) o quien envíe X-Profiling-Token
+    permission_classes = [IsAdminUser | HasProfilingToken]
+
+
+class ProfileListView(DiagnosticsView):
+    def get(self, request):
+        # Perfiles guardados por RequestProfilingMiddleware, del más reciente al más antiguo
+        return Response({"profiles": get_profile_store().list()}, status=status.HTTP_200_OK)
+
+
+class ProfileDetailView(DiagnosticsView):
+    def get(self, request, profile_id):
+        # El fichero .prof para snakeviz/pstats; con ?format=text, el informe de pstats (?sort=, ?limit=)
+        store = get_profile_store()
+        path = store.profile_path(profile_id)
+        if path is None:
+            return Response({"error": "Perfil no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+        if request.query_params.get('format') != 'text':
+            return FileResponse(open(path, 'rb'), as_attachment=True, filename=f"{profile_id.hex}.prof",
+                                content_type='application/octet-stream')
+        sort = request.query_params.get('sort', 'cumulative')
+        if sort not in SORT_KEYS:
+            return Response({"error": f"'sort' debe ser uno de: {', '.join(sorted(SORT_KEYS))}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 50)), MAX_REPORT_LIMIT))
+        except ValueError:
+            return Response({"error": "El parámetro 'limit' debe ser un entero."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"id": profile_id.hex, "report": store.text_report(profile_id, sort, limit)},
+                        status=status.HTTP_200_OK)
+
+
+class MemorySnapshotView(DiagnosticsView):
+    def get(self, request):
+        # Asignaciones de tracemalloc (?limit=, ?group_by=lineno|filename|traceback, ?compare=1 respecto a
+        # la instantánea anterior) y tamaño de las cachés internas del proceso que atiende la petición
+        group_by = request.query_params.get('group_by', 'lineno')
+        if group_by not in SNAPSHOT_GROUPS:
+            return Response({"error": f"'group_by' debe ser uno de: {', '.join(SNAPSHOT_GROUPS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 25)), MAX_REPORT_LIMIT))
+        except ValueError:
+            return Response({"error": "El parámetro 'limit' debe ser un entero."}, status=status.HTTP_400_BAD_REQUEST)
+        compare = request.query_params.get('compare') in ('1', 'true')
+        return Response({
+            "memory": memory_snapshot(limit, group_by, compare),
+            "caches": internal_cache_sizes(),
+        }, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        # Activa o desactiva tracemalloc en este proceso ({"action": "start", "frames": N} / {"action": "stop"})
+        serializer = MemoryTracingRequestSerializer(data=request.data)
+        if serializer.is_valid():
+            if serializer.validated_data['action'] == 'start':
+                start_tracing(serializer.validated_data['frames'])
+            else:
+                stop_tracing()
+            return Response({"tracing": serializer.validated_data['action'] == 'start'}, status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,303 @@
+# api/scan_history.py
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Max
+
+from core.domain.ports import ScanHistoryPort
+from .models import Scan, ScanPort, ScanRecord, ScanResult
+from .write_behind import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+SCAN_HISTORY_ENABLED = os.getenv('SCAN_HISTORY_ENABLED', 'true').lower() in ("1", "true", "yes")
+SCAN_WRITE_BEHIND = os.getenv('SCAN_WRITE_BEHIND', 'true').lower() in ("1", "true", "yes")
+BULK_BATCH_SIZE = 500
+# Claves de la respuesta de run_scan que se guardan
+HISTORY_KEYS = ("url_dominio", "scenario", "scan_results", "local_analysis", "deepseek_analysis",
+                "deepseek_analysis_cached", "execution_errors", "incremental", "scan_uid")
+
+# Registros que se indexan para las búsquedas transversales (TXT y SOA no: largos y poco útiles como pivote)
+SEARCHABLE_DNS_TYPES = ("A", "AAAA", "CNAME", "MX", "NS")
+# Campo WHOIS -> tipo de registro en ScanRecord
+SEARCHABLE_WHOIS_FIELDS = {"name_servers": "NS", "registrar": "REGISTRAR", "emails": "EMAIL"}
+SEARCHABLE_RECORD_TYPES = tuple(dict.fromkeys(SEARCHABLE_DNS_TYPES + tuple(SEARCHABLE_WHOIS_FIELDS.values())))
+
+
+def normalize_record_value(record_type: str, value: Any) -> str:
+    """Forma canónica de un valor buscable: minúsculas, sin punto final y, en MX, sin la prioridad."""
+    value = str(value).strip().lower()
+    if record_type == "MX":
+        value = value.split()[-1] if value else value
+    return value.rstrip(".")[:255]
+
+
+def _as_port_number(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class DjangoScanHistory(ScanHistoryPort):
+    """
+    Historial de escaneos en la base de datos de Django. Cada escaneo es una fila de Scan más
+    sus resultados (ScanResult), puertos (ScanPort) y registros buscables (ScanRecord), insertados
+    con bulk_create en una transacción.
+    """
+
+    def save_scan(self, response: Dict[str, Any]) -> int:
+        return self.save_scans([response])[0]
+
+    @staticmethod
+    def _scan_row(response: Dict[str, Any]) -> Scan:
+        local_analysis = response.get("local_analysis")
+        scan = Scan(
+            domain=str(response["url_dominio"])[:255],
+            scenario=str(response["scenario"])[:32],
+            risk_score=(local_analysis or {}).get("risk_score"),
+            local_analysis=local_analysis,
+            deepseek_analysis=response.get("deepseek_analysis"),
+            deepseek_analysis_cached=bool(response.get("deepseek_analysis_cached")),
+            execution_errors=list(response.get("execution_errors") or []),
+        )
+        if response.get("scan_uid"):
+            scan.uid = response["scan_uid"]  # Asignado antes de guardar (WriteBehindBuffer)
+        return scan
+
+    def save_scans(self, responses: List[Dict[str, Any]]) -> List[int]:
+        """
+        Guarda varios escaneos en una transacción con un bulk_create por tabla (no uno por escaneo)
+        y retorna sus identificadores en el mismo orden.
+        """
+        scans = [self._scan_row(response) for response in responses]
+        results, ports, records = [], [], []
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                Scan.objects.bulk_create(scans)
+            else:  # Sin RETURNING no se conocerían las claves primarias para las filas hijas
+                for scan in scans:
+                    scan.save()
+            for scan, response in zip(scans, responses):
+                scan_results = response.get("scan_results") or {}
+                # Etapas reutilizadas por el modo incremental: se enlazan a su escaneo original en lugar de
+                # contar como observaciones nuevas (ni renuevan su vigencia ni duplican puertos y registros)
+                reused = {stage: info["scan_id"] for stage, info in ((response.get("incremental") or {}).get("reused") or {}).items()}
+                results.extend(ScanResult(scan=scan, scanner=scanner, data=data, reused_from_id=reused.get(scanner))
+                               for scanner, data in scan_results.items())
+                observed = {stage: data for stage, data in scan_results.items() if stage not in reused}
+                ports.extend(self._port_rows(scan, observed.get("nmap")))
+                records.extend(self._record_rows(scan, observed.get("dns"), observed.get("whois")))
+            ScanResult.objects.bulk_create(results, batch_size=BULK_BATCH_SIZE)
+            ScanPort.objects.bulk_create(ports, batch_size=BULK_BATCH_SIZE)
+            ScanRecord.objects.bulk_create(records, batch_size=BULK_BATCH_SIZE)
+        return [scan.pk for scan in scans]
+
+    @staticmethod
+    def _record_rows(scan: Scan, dns_result: Optional[Dict], whois_result: Optional[Dict]) -> List[ScanRecord]:
+        values = set()
+        for record_type in SEARCHABLE_DNS_TYPES:
+            for record in ((dns_result or {}).get("details") or {}).get(record_type) or []:
+                values.add(("dns", record_type, normalize_record_value(record_type, record)))
+        if whois_result and not whois_result.get("error"):
+            for field, record_type in SEARCHABLE_WHOIS_FIELDS.items():
+                field_values = whois_result.get(field)
+                for value in field_values if isinstance(field_values, list) else [field_values]:
+                    if value:
+                        values.add(("whois", record_type, normalize_record_value(record_type, value)))
+        return [ScanRecord(scan=scan, source=source, record_type=record_type, value=value)
+                for source, record_type, value in sorted(values) if value]
+
+    @staticmethod
+    def _port_rows(scan: Scan, nmap_result: Optional[Iterable[Dict]]) -> List[ScanPort]:
+        rows = []
+        for host in nmap_result or []:
+            if "ip" not in host:
+                continue
+            for port in host.get("ports") or []:
+                number = _as_port_number(port.get("port"))
+                if number is None:
+                    continue
+                service = port.get("service") or {}
+                rows.append(ScanPort(
+                    scan=scan, ip=str(host["ip"])[:255], port=number,
+                    protocol=str(port.get("protocol") or "")[:8], state=str(port.get("state") or "")[:32],
+                    service_name=(service.get("name") or "").lower()[:64], product=(service.get("product") or "")[:255],
+                    version=(service.get("version") or "")[:255], extrainfo=(service.get("extrainfo") or "")[:255],
+                ))
+        return rows
+
+    def get_scan(self, scan_id: int) -> Optional[Dict[str, Any]]:
+        return self._scan_dict(Scan.objects.filter(pk=scan_id).first())
+
+    def get_scan_by_uid(self, scan_uid: str) -> Optional[Dict[str, Any]]:
+        return self._scan_dict(Scan.objects.filter(uid=scan_uid).first())
+
+    @staticmethod
+    def _scan_dict(scan: Optional[Scan]) -> Optional[Dict[str, Any]]:
+        if scan is None:
+            return None
+        return {
+            "scan_id": scan.pk,
+            "scan_uid": str(scan.uid),
+            "url_dominio": scan.domain,
+            "scenario": scan.scenario,
+            "created_at": scan.created_at.isoformat(),
+            "scan_results": dict(scan.results.values_list("scanner", "data")),
+            "local_analysis": scan.local_analysis,
+            "deepseek_analysis": scan.deepseek_analysis,
+            "deepseek_analysis_cached": scan.deepseek_analysis_cached,
+            "execution_errors": scan.execution_errors,
+        }
+
+    def latest_results(self, domain: str, stages: List[str]) -> Dict[str, Dict[str, Any]]:
+        latest = {}
+        for stage in stages:
+            row = (ScanResult.objects.filter(scan__domain=domain, scanner=stage, reused_from__isnull=True)
+                   .order_by("-scan__created_at").values("data", "scan_id", "scan__created_at").first())
+            if row is not None:
+                latest[stage] = {"data": row["data"], "scan_id": row["scan_id"], "created_at": row["scan__created_at"]}
+        return latest
+
+    def list_scans(self, domain: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        scans = Scan.objects.all()
+        if domain:
+            scans = scans.filter(domain=domain)  # índice (domain, created_at)
+        return [
+            {**row, "created_at": row["created_at"].isoformat()}
+            for row in scans.order_by("-created_at").values("id", "domain", "scenario", "created_at", "risk_score")[:limit]
+        ]
+
+    def find_ports(self, ip: Optional[str] = None, port: Optional[int] = None, state: Optional[str] = None,
+                   limit: int = 200) -> List[Dict[str, Any]]:
+        """Puertos vistos en escaneos anteriores, por IP y/o número de puerto (del más reciente al más antiguo)."""
+        ports = ScanPort.objects.all()
+        if ip:
+            ports = ports.filter(ip=ip)
+        if port is not None:
+            ports = ports.filter(port=port)
+        if state:
+            ports = ports.filter(state=state)
+        rows = ports.order_by("-scan__created_at").values(
+            "scan_id", "scan__domain", "scan__created_at", "ip", "port", "protocol", "state",
+            "service_name", "product", "version",
+        )[:limit]
+        return [
+            {
+                "scan_id": row.pop("scan_id"),
+                "domain": row.pop("scan__domain"),
+                "created_at": row.pop("scan__created_at").isoformat(),
+                **row,
+            }
+            for row in rows
+        ]
+
+    # --- Búsquedas transversales sobre todo el historial ---
+    def search_ports(self, port: Optional[int] = None, state: Optional[str] = "open", service: Optional[str] = None,
+                     product: Optional[str] = None, version: Optional[str] = None, limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Activos (dominio, IP, puerto, servicio) que cumplen los filtros, con la última vez que se
+        vieron. Cada filtro usa un índice de ScanPort: (port, state), service_name o (product, version).
+        El servicio se guarda en minúsculas y se busca sin distinguir mayúsculas; producto y versión
+        se comparan tal como los informa Nmap.
+        """
+        ports = ScanPort.objects.all()
+        if port is not None:
+            ports = ports.filter(port=port)
+        if state:
+            ports = ports.filter(state=state)
+        if service:
+            ports = ports.filter(service_name=service.lower())
+        if product:
+            ports = ports.filter(product=product)
+        if version:
+            ports = ports.filter(version=version)
+        rows = (
+            ports.values("scan__domain", "ip", "port", "protocol", "state", "service_name", "product", "version")
+            .annotate(last_seen=Max("scan__created_at"), last_scan_id=Max("scan_id"))
+            .order_by("-last_seen")[:limit]
+        )
+        return [
+            {
+                "domain": row.pop("scan__domain"),
+                "scan_id": row.pop("last_scan_id"),
+                "last_seen": row.pop("last_seen").isoformat(),
+                **row,
+            }
+            for row in rows
+        ]
+
+    def search_records(self, record_type: str, value: str, source: Optional[str] = None,
+                       limit: int = 200) -> List[Dict[str, Any]]:
+        """Dominios con un registro DNS/WHOIS dado (índice (record_type, value)), con la última vez que se vio."""
+        records = ScanRecord.objects.filter(record_type=record_type.upper(),
+                                            value=normalize_record_value(record_type.upper(), value))
+        if source:
+            records = records.filter(source=source)
+        rows = (
+            records.values("scan__domain", "source", "record_type", "value")
+            .annotate(last_seen=Max("scan__created_at"), last_scan_id=Max("scan_id"))
+            .order_by("-last_seen")[:limit]
+        )
+        return [
+            {
+                "domain": row.pop("scan__domain"),
+                "scan_id": row.pop("last_scan_id"),
+                "last_seen": row.pop("last_seen").isoformat(),
+                **row,
+            }
+            for row in rows
+        ]
+
+
+_scan_history: Optional[DjangoScanHistory] = None
+_write_buffer: Optional[WriteBehindBuffer] = None
+_write_buffer_lock = threading.Lock()
+
+
+def get_scan_history() -> DjangoScanHistory:
+    global _scan_history
+    if _scan_history is None:
+        _scan_history = DjangoScanHistory()
+    return _scan_history
+
+
+def get_write_buffer() -> WriteBehindBuffer:
+    global _write_buffer
+    with _write_buffer_lock:
+        if _write_buffer is None:
+            _write_buffer = WriteBehindBuffer(get_scan_history())
+        return _write_buffer
+
+
+def scanner_response(domain: str, scanner: str, data: Any) -> Dict[str, Any]:
+    """Respuesta con el formato de run_scan para el resultado de un escáner individual."""
+    return {"url_dominio": domain, "scenario": scanner, "scan_results": {scanner: data}, "execution_errors": []}
+
+
+def record_scan(response: Dict[str, Any], defer: Optional[bool] = None) -> Optional[int]:
+    """
+    Guarda un escaneo en el historial y añade 'scan_uid' a la respuesta. Con escritura diferida
+    (SCAN_WRITE_BEHIND, por defecto) solo se encola en el WriteBehindBuffer y la respuesta no espera a
+    la base de datos; con defer=False se guarda ya y se añade también 'scan_id'. Un fallo de la base
+    de datos se registra en el log pero no hace fallar la petición (el escaneo ya se hizo).
+    """
+    if not SCAN_HISTORY_ENABLED:
+        return None
+    response["scan_uid"] = str(uuid.uuid4())
+    # Copia de lo que se guarda: la vista puede seguir añadiendo claves a la respuesta
+    snapshot = {key: response.get(key) for key in HISTORY_KEYS}
+    if SCAN_WRITE_BEHIND if defer is None else defer:
+        get_write_buffer().submit(snapshot)
+        return None
+    try:
+        scan_id = get_scan_history().save_scan(snapshot)
+    except DatabaseError as e:
+        logger.error(f"No se pudo guardar el escaneo de {response.get('url_dominio')} en el historial: {e}")
+        return None
+    response["scan_id"] = scan_id
+    return scan_id
@@ -0,0 +1,114 @@
+# api/scan_worker.py
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.db import DatabaseError, connection
+
+from core.application.orchestration_service import OrchestrationService
+from .job_queue import (
+    JOB_LEASE_SECONDS, claim_batch_siblings, claim_job, complete_job, default_worker_id, fail_job, heartbeat,
+    requeue_orphans
+)
+from .models import ScanJob
+from .scan_history import get_scan_history, record_scan
+
+logger = logging.getLogger(__name__)
+
+# Latido cada tercio de la concesión: se toleran dos latidos perdidos antes de que caduque
+HEARTBEAT_SECONDS = float(os.getenv('SCAN_JOB_HEARTBEAT_SECONDS', str(JOB_LEASE_SECONDS / 3)))
+ORPHAN_CHECK_SECONDS = float(os.getenv('SCAN_JOB_ORPHAN_CHECK_SECONDS', '60'))
+
+
+def run_scan_kwargs(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Argumentos de OrchestrationService.run_scan a partir de ScanJob.params (JSON)."""
+    kwargs = {key: params[key] for key in ("custom_gquery", "dork_packs", "dork_max_results", "incremental") if key in params}
+    if params.get("fields"):
+        kwargs["fields"] = frozenset(params["fields"])
+    return kwargs
+
+
+class ScanWorker:
+    """
+    Worker de la cola de escaneos: reclama trabajos (ScanJob), los ejecuta con OrchestrationService
+    mientras un hilo renueva la concesión y guarda el resultado en el historial. Los trabajos de un
+    mismo lote (enqueue_batch) que siguen en cola se reclaman y escanean juntos con run_batch. También
+    recupera periódicamente los trabajos de workers caídos.
+    """
+
+    def __init__(self, worker_id: Optional[str] = None, service: Optional[OrchestrationService] = None):
+        self.worker_id = worker_id or default_worker_id()
+        self.service = service or OrchestrationService(scan_history=get_scan_history())
+
+    def _heartbeat_loop(self, jobs: List[ScanJob], stop: threading.Event, lost: threading.Event) -> None:
+        alive = list(jobs)
+        try:
+            while alive and not stop.wait(HEARTBEAT_SECONDS):
+                for job in list(alive):
+                    try:
+                        if not heartbeat(job, self.worker_id):
+                            logger.warning(f"Worker {self.worker_id}: concesión del trabajo #{job.pk} perdida.")
+                            lost.set()
+                            alive.remove(job)
+                    except DatabaseError as e:
+                        logger.error(f"Worker {self.worker_id}: no se pudo renovar la concesión del trabajo #{job.pk}: {e}")
+        finally:
+            connection.close()  # Conexión propia de este hilo
+
+    def _scan(self, jobs: List[ScanJob]) -> List[Dict[str, Any]]:
+        # Solo se guarda en el historial: la respuesta completa, aunque el trabajo limite 'fields'
+        kwargs = run_scan_kwargs(jobs[0].params)
+        if len(jobs) == 1:
+            return [self.service.run_scan(url_dominio=jobs[0].domain, scenario=jobs[0].scenario, trim=False, **kwargs)]
+        # Trabajos del mismo lote (mismos params): plan de Nmap común y análisis de DeepSeek en bloque
+        batch = self.service.run_batch(domains=[job.domain for job in jobs], scenario=jobs[0].scenario,
+                                       trim=False, **kwargs)
+        return batch["results"]
+
+    def run_job(self, job: ScanJob) -> int:
+        """Ejecuta 'job' (y los trabajos de su lote que sigan en cola); retorna cuántos trabajos procesó."""
+        jobs = [job] + claim_batch_siblings(job, self.worker_id)
+        stop, lost = threading.Event(), threading.Event()
+        beat = threading.Thread(target=self._heartbeat_loop, args=(jobs, stop, lost), daemon=True,
+                                name=f"heartbeat-{job.pk}")
+        beat.start()
+        try:
+            responses = self._scan(jobs)
+        except Exception as e:
+            logger.exception(f"Worker {self.worker_id}: error en el trabajo #{job.pk} ({job.domain})"
+                             f"{f' y {len(jobs) - 1} más de su lote' if len(jobs) > 1 else ''}: {e}")
+            stop.set()
+            beat.join()
+            for failed in jobs:
+                fail_job(failed, self.worker_id, str(e))
+            return len(jobs)
+        stop.set()
+        beat.join()
+        for done, response in zip(jobs, responses):
+            scan_id = record_scan(response, defer=False)  # El trabajo guarda el id del escaneo
+            if not complete_job(done, self.worker_id, scan_id):
+                # La concesión caducó durante el escaneo y el trabajo se reencoló: el resultado queda en el historial
+                logger.warning(f"Worker {self.worker_id}: el trabajo #{done.pk} ya no le pertenece; escaneo #{scan_id} guardado igualmente.")
+        return len(jobs)
+
+    def run(self, stop: threading.Event, poll_seconds: float = 5.0, exit_when_idle: bool = False) -> int:
+        """Procesa trabajos hasta que 'stop' se activa (o hasta vaciar la cola con exit_when_idle)."""
+        processed = 0
+        next_orphan_check = 0.0
+        try:
+            while not stop.is_set():
+                if time.monotonic() >= next_orphan_check:
+                    requeue_orphans()
+                    next_orphan_check = time.monotonic() + ORPHAN_CHECK_SECONDS
+                job = claim_job(self.worker_id)
+                if job is None:
+                    if exit_when_idle:
+                        break
+                    stop.wait(poll_seconds)
+                    continue
+                processed += self.run_job(job)
+        finally:
+            connection.close()
+        return processed
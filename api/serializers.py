@@ -1,7 +1,21 @@
 # security_api/api/serializers.py
 from rest_framework import serializers
+from core.application.batch_planner import normalize_domains
+from core.infrastructure.scanner.google_dorks import DORK_PACKS
 # from core.domain.entities import GoogleDorkResult, DnsRecord, WhoisInfo, NmapHost, NmapPort # Comentado si no se usan directamente
 
+
+def boolean_flag(data, name: str, default: bool = False) -> bool:
+    """Parámetro booleano con el mismo criterio que BooleanField ("false", "0"... son False). Lanza ValueError si no lo es."""
+    value = data.get(name)
+    if value is None:
+        return default
+    try:
+        return serializers.BooleanField().to_internal_value(value)
+    except serializers.ValidationError:
+        raise ValueError(f"El parámetro '{name}' debe ser booleano.")
+
+
 class GoogleDorkResultSerializer(serializers.Serializer):
     title = serializers.CharField()
     link = serializers.URLField()
@@ -52,15 +66,80 @@ class NmapHostSerializer(serializers.Serializer): # Serializador DRF
 
 # --- Serializadores para los Requests ---
 
+def dork_packs_field(**kwargs) -> serializers.ListField:
+    # Lista de nombres de paquetes conocidos (una cadena suelta no se acepta: se recorrería letra a letra)
+    return serializers.ListField(child=serializers.ChoiceField(choices=list(DORK_PACKS)), **kwargs)
+
+class OrchestrationOptionsSerializer(serializers.Serializer):
+    # Opciones de Google Dorks de /consulta_completa/ y /consulta_basica/ (el resto se lee en la vista)
+    gquery = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    dork_packs = dork_packs_field(required=False, allow_null=True)
+    dork_max_results = serializers.IntegerField(required=False, min_value=1, max_value=100, default=10)
+
 class GoogleDorkQuerySerializer(serializers.Serializer):
-    query = serializers.CharField(required=True)
+    # Se usa 'query' para una consulta suelta, o 'domain' (+ 'packs' opcional) para paquetes de dorks
+    query = serializers.CharField(required=False)
+    domain = serializers.CharField(required=False)
+    packs = dork_packs_field(required=False)
+    max_results = serializers.IntegerField(required=False, min_value=1, max_value=100, default=10)
+
+    def validate(self, attrs):
+        if not attrs.get('query') and not attrs.get('domain'):
+            raise serializers.ValidationError("Se requiere 'query' o 'domain'.")
+        return attrs
+
+# 'fresh' (o su alias 'no_cache'): consulta el escáner sin usar la caché de escáneres
+def fresh_field():
+    return serializers.BooleanField(required=False, default=False)
 
-class DnsScanRequestSerializer(serializers.Serializer):
+class ScannerRequestSerializer(serializers.Serializer):
+    fresh = fresh_field()
+    no_cache = fresh_field()
+
+    def validate(self, attrs):
+        no_cache = attrs.pop('no_cache', False)
+        attrs['fresh'] = attrs.get('fresh', False) or no_cache
+        return attrs
+
+class DnsScanRequestSerializer(ScannerRequestSerializer):
     domain = serializers.CharField(required=True)
     record_types = serializers.ListField(child=serializers.CharField(), required=False)
 
-class WhoisScanRequestSerializer(serializers.Serializer):
+class WhoisScanRequestSerializer(ScannerRequestSerializer):
     domain = serializers.CharField(required=True)
 
-class NmapScanRequestSerializer(serializers.Serializer):
-    targets = serializers.ListField(child=serializers.CharField(), required=True)
\ No newline at end of file
+class NmapScanRequestSerializer(ScannerRequestSerializer):
+    targets = serializers.ListField(child=serializers.CharField(), required=True)
+
+class WatchedAssetRequestSerializer(serializers.Serializer):
+    domain = serializers.CharField(required=True, max_length=255)
+    scenario = serializers.ChoiceField(choices=['basic', 'complete'], required=False, default='basic')
+    interval_seconds = serializers.IntegerField(required=False, min_value=300, default=24 * 3600)
+    criticality = serializers.IntegerField(required=False, min_value=1, max_value=5, default=3)
+
+class ScanJobRequestSerializer(serializers.Serializer):
+    url_dominio = serializers.CharField(required=True, max_length=255)
+    scenario = serializers.ChoiceField(choices=['basic', 'complete'], required=False, default='basic')
+    gquery = serializers.CharField(required=False)
+    dork_packs = dork_packs_field(required=False)
+    dork_max_results = serializers.IntegerField(required=False, min_value=1, max_value=100)
+    incremental = serializers.BooleanField(required=False, default=False)
+    priority = serializers.IntegerField(required=False, min_value=-100, max_value=100, default=0)
+
+class BatchScanRequestSerializer(serializers.Serializer):
+    domains = serializers.ListField(child=serializers.CharField(max_length=255), required=True, allow_empty=False)
+    scenario = serializers.ChoiceField(choices=['basic', 'complete'], required=False, default='basic')
+    gquery = serializers.CharField(required=False)
+    dork_packs = dork_packs_field(required=False)
+    dork_max_results = serializers.IntegerField(required=False, min_value=1, max_value=100, default=10)
+    incremental = serializers.BooleanField(required=False, default=False)
+
+    def validate_domains(self, value):
+        try:
+            return normalize_domains(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+class MemoryTracingRequestSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=['start', 'stop'], required=True)
+    frames = serializers.IntegerField(required=False, min_value=1, max_value=50, default=1)
@@ -1,21 +1,71 @@
 # api/urls.py
 from django.urls import path
 # Vistas existentes para escaneos individuales
-from .views import GoogleDorkView, DnsScanView, WhoisScanView, NmapScanView # Asumo que estas están en api/views.py
+from .views import GoogleDorkView, GoogleDorkStatsView, CacheStatsView, UpstreamStatusView, DnsScanView, WhoisScanView, NmapScanView # Asumo que estas están en api/views.py
 
 # Importa tus nuevas vistas de orquestación
-from .orchestration_views import ConsultaCompletaView, ConsultaBasicaView # Si las pusiste en api/orchestration_views.py
+from .orchestration_views import ConsultaCompletaView, ConsultaBasicaView, ConsultaLoteView # Si las pusiste en api/orchestration_views.py
+from .job_views import ScanJobListView, ScanJobDetailView
+from .watchlist_views import WatchlistView, WatchedAssetDetailView
+from .history_views import ScanHistoryListView, ScanHistoryDetailView, ScanPortHistoryView, PortSearchView, RecordSearchView
+from .profiling_views import ProfileListView, ProfileDetailView, MemorySnapshotView
+from chat.views.viewChatSession import ChatSessionListView, ChatSessionDetailView, ChatSessionMessageView
+from .async_views import (
+    AsyncConsultaCompletaView, AsyncConsultaBasicaView, AsyncConsultaLoteView,
+    AsyncGoogleDorkView, AsyncDnsScanView, AsyncWhoisScanView, AsyncNmapScanView
+)
 
 urlpatterns = [
     # Rutas existentes para escaneos individuales
     path('google-dorks/', GoogleDorkView.as_view(), name='google_dorks'),
+    path('google-dorks/stats/', GoogleDorkStatsView.as_view(), name='google_dorks_stats'),
     path('dns-scan/', DnsScanView.as_view(), name='dns_scan'),
     path('whois-scan/', WhoisScanView.as_view(), name='whois_scan'),
     path('nmap-scan/', NmapScanView.as_view(), name='nmap_scan'),
+    path('upstreams/', UpstreamStatusView.as_view(), name='upstreams_status'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache_stats'),
 
     # NUEVAS RUTAS para los servicios de orquestación
     # Estas rutas resultarán en /api/consulta_completa/ y /api/consulta_basica/
     # debido al prefijo 'api/' en tu urls.py principal del proyecto.
     path('consulta_completa/', ConsultaCompletaView.as_view(), name='api-consulta-completa'),
     path('consulta_basica/', ConsultaBasicaView.as_view(), name='api-consulta-basica'),
+    # Lote de dominios (se encola, 202): el worker escanea cada IP compartida con Nmap una sola vez
+    path('consulta_lote/', ConsultaLoteView.as_view(), name='api-consulta-lote'),
+
+    # Historial de escaneos guardados (consultas anteriores sin volver a escanear)
+    path('historial/', ScanHistoryListView.as_view(), name='api-scan-history'),
+    path('historial/puertos/', ScanPortHistoryView.as_view(), name='api-scan-history-ports'),
+    path('historial/<int:scan_id>/', ScanHistoryDetailView.as_view(), name='api-scan-history-detail'),
+    path('historial/<uuid:scan_uid>/', ScanHistoryDetailView.as_view(), name='api-scan-history-detail-uid'),
+    # Búsquedas transversales sobre todo el historial
+    path('buscar/puertos/', PortSearchView.as_view(), name='api-search-ports'),
+    path('buscar/registros/', RecordSearchView.as_view(), name='api-search-records'),
+
+    # Cola de escaneos para los workers (comando scan_worker)
+    path('trabajos/', ScanJobListView.as_view(), name='api-scan-jobs'),
+    path('trabajos/<int:job_id>/', ScanJobDetailView.as_view(), name='api-scan-job-detail'),
+
+    # Lista de vigilancia (re-escaneo periódico con el comando monitor_watchlist)
+    path('vigilancia/', WatchlistView.as_view(), name='api-watchlist'),
+    path('vigilancia/<int:asset_id>/', WatchedAssetDetailView.as_view(), name='api-watchlist-detail'),
+
+    # Sesiones de chat (también las abiertas con 'start_session' en una consulta), guardadas en la base de datos
+    path('chat/sesiones/', ChatSessionListView.as_view(), name='api-chat-sessions'),
+    path('chat/sesiones/<str:session_id>/', ChatSessionDetailView.as_view(), name='api-chat-session-detail'),
+    path('chat/sesiones/<str:session_id>/mensajes/', ChatSessionMessageView.as_view(), name='api-chat-session-messages'),
+
+    # Diagnóstico (solo staff o X-Profiling-Token): perfiles de CPU por petición y memoria del proceso
+    path('diagnostico/perfiles/', ProfileListView.as_view(), name='api-profiles'),
+    path('diagnostico/perfiles/<uuid:profile_id>/', ProfileDetailView.as_view(), name='api-profile-detail'),
+    path('diagnostico/memoria/', MemorySnapshotView.as_view(), name='api-memory-snapshot'),
+
+    # Versiones asíncronas (servir con ASGI): /api/async/...
+    path('async/consulta_completa/', AsyncConsultaCompletaView.as_view(), name='api-async-consulta-completa'),
+    path('async/consulta_basica/', AsyncConsultaBasicaView.as_view(), name='api-async-consulta-basica'),
+    path('async/consulta_lote/', AsyncConsultaLoteView.as_view(), name='api-async-consulta-lote'),
+    path('async/google-dorks/', AsyncGoogleDorkView.as_view(), name='async_google_dorks'),
+    path('async/dns-scan/', AsyncDnsScanView.as_view(), name='async_dns_scan'),
+    path('async/whois-scan/', AsyncWhoisScanView.as_view(), name='async_whois_scan'),
+    path('async/nmap-scan/', AsyncNmapScanView.as_view(), name='async_nmap_scan'),
 ]
\ No newline at end of file
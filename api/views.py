@@ -5,12 +5,19 @@ from rest_framework.response import Response
 from rest_framework import status
 from dotenv import load_dotenv
 from .serializers import (
-    GoogleDorkQuerySerializer, GoogleDorkResultSerializer,
-    DnsScanRequestSerializer, DnsRecordSerializer,
-    WhoisScanRequestSerializer, WhoisInfoSerializer,
-    NmapScanRequestSerializer, NmapHostSerializer
+    GoogleDorkQuerySerializer, DnsScanRequestSerializer, WhoisScanRequestSerializer, NmapScanRequestSerializer
 )
+from core.application.field_selection import (
+    GOOGLE_DORK_FIELDS, NMAP_HOST_FIELDS, WHOIS_FIELDS, fields_from_request, select_fields, select_nmap_fields
+)
+from core.application.analysis_cache import get_analysis_cache
+from core.application.orchestration_service import format_dns_results_structured, format_nmap_results_structured
 from core.application.use_cases import GoogleDorkUseCase, DnsScanUseCase, WhoisScanUseCase, NmapScanUseCase
+from core.infrastructure.adapter.scanner_adapter import SCANNER_CACHE_TTLS, scanner_cache
+from core.infrastructure.cache.google_cse_cache import get_google_cse_cache
+from core.infrastructure.http.resilience import breakers_snapshot
+from chat.services.fast_json import encode_models
+from .scan_history import record_scan, scanner_response
 
 def load_api_keys():
     load_dotenv()
@@ -19,24 +26,70 @@ def load_api_keys():
     shodan_api_key = os.getenv("SHODAN_API_KEY") # Asegúrate de tener esta variable en .env
     return api_key, search_engine_id, shodan_api_key
 
+def scanner_cache_headers(records) -> dict:
+    """La respuesta DNS es una lista: su procedencia (caché de escáneres o consulta nueva) va en cabeceras."""
+    headers = {"X-Scanner-Cache": "hit" if getattr(records, "cached", False) else "miss"}
+    if getattr(records, "scanned_at", None):
+        headers["X-Scanned-At"] = records.scanned_at
+    return headers
+
 class GoogleDorkView(APIView):
     def post(self, request):
         serializer = GoogleDorkQuerySerializer(data=request.data)
         if serializer.is_valid():
-            query = serializer.validated_data['query']
+            query = serializer.validated_data.get('query')
+            try:
+                fields = fields_from_request(request.data, GOOGLE_DORK_FIELDS)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
             api_key, search_engine_id, _ = load_api_keys()
             if api_key and search_engine_id:
                 use_case = GoogleDorkUseCase()
+                if not query:
+                    return self._pack_search(use_case, serializer.validated_data, fields)
                 results = use_case.execute(query)
                 if results:
-                    result_serializer = GoogleDorkResultSerializer(results, many=True)
-                    return Response(result_serializer.data, status=status.HTTP_200_OK)
+                    return Response([select_fields(result.to_dict(), fields) for result in results], status=status.HTTP_200_OK)
                 else:
                     return Response({"message": "No se encontraron resultados para la búsqueda."}, status=status.HTTP_204_NO_CONTENT)
             else:
                 return Response({"error": "API Key o Search Engine ID no configurados."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _pack_search(self, use_case, data, fields=None):
+        try:
+            outcome = use_case.execute_pack(data['domain'], data.get('packs'), data['max_results'])
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not outcome or not outcome["results"]:
+            return Response({"message": "No se encontraron resultados para la búsqueda."}, status=status.HTTP_204_NO_CONTENT)
+        return Response({
+            "packs": outcome["packs"],
+            "per_query": outcome["per_query"],
+            "failed_queries": outcome["failed_queries"],
+            "results": [select_fields(result.to_dict(), fields) for result in outcome["results"]],
+        }, status=status.HTTP_200_OK)
+
+class GoogleDorkStatsView(APIView):
+    def get(self, request):
+        # Estadísticas de la caché de Google CSE y consumo de la cuota diaria
+        return Response(get_google_cse_cache().stats(), status=status.HTTP_200_OK)
+
+class CacheStatsView(APIView):
+    def get(self, request):
+        # Cachés compartidas por los workers del nodo: tamaño, vigencia y aciertos por nivel (memoria / SQLite)
+        caches = {namespace: scanner_cache(namespace) for namespace in SCANNER_CACHE_TTLS}
+        stats = {namespace: cache.stats() if cache else {"namespace": namespace, "disabled": True}
+                 for namespace, cache in caches.items()}
+        stats["google_cse"] = get_google_cse_cache().responses.stats()
+        stats["llm_analysis"] = get_analysis_cache().stats()
+        return Response({"caches": stats}, status=status.HTTP_200_OK)
+
+class UpstreamStatusView(APIView):
+    def get(self, request):
+        # Estado de los circuit breakers de los servicios externos (DeepSeek, Google CSE)
+        return Response({"upstreams": breakers_snapshot()}, status=status.HTTP_200_OK)
+
 class DnsScanView(APIView):
     def post(self, request):
         serializer = DnsScanRequestSerializer(data=request.data)
@@ -44,32 +97,45 @@ class DnsScanView(APIView):
             domain = serializer.validated_data['domain']
             record_types = serializer.validated_data.get('record_types')
             use_case = DnsScanUseCase()
-            results = use_case.execute(domain, record_types)
-            result_serializer = DnsRecordSerializer(results.items(), many=True)
-            return Response(result_serializer.data, status=status.HTTP_200_OK)
+            results = use_case.execute(domain, record_types, serializer.validated_data['fresh'])
+            record_scan(scanner_response(domain, "dns", format_dns_results_structured(results)))
+            # Mismo formato que DnsRecordSerializer, sin pasar por el serializador; la procedencia, en cabeceras
+            return Response([{"type": record_type, "value": values} for record_type, values in results.items()],
+                            status=status.HTTP_200_OK, headers=scanner_cache_headers(results))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class WhoisScanView(APIView):
     def post(self, request):
         serializer = WhoisScanRequestSerializer(data=request.data)
         if serializer.is_valid():
+            try:
+                fields = fields_from_request(request.data, WHOIS_FIELDS)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
             domain = serializer.validated_data['domain']
             use_case = WhoisScanUseCase()
-            result = use_case.execute(domain)
-            result_serializer = WhoisInfoSerializer(result)
-            return Response(result_serializer.data, status=status.HTTP_200_OK)
+            result = use_case.execute(domain, serializer.validated_data['fresh'])
+            record_scan(scanner_response(domain, "whois", result.to_dict()))
+            return Response(select_fields(result.to_dict(), fields), status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class NmapScanView(APIView):
     def post(self, request):
         serializer = NmapScanRequestSerializer(data=request.data)
         if serializer.is_valid():
+            try:
+                fields = fields_from_request(request.data, NMAP_HOST_FIELDS)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
             targets = serializer.validated_data['targets']
             use_case = NmapScanUseCase()
-            results = use_case.execute(targets) # Esto es List[NmapHost] (modelos Pydantic)
-            
-            # Aquí es donde los modelos Pydantic se convierten para la respuesta:
-            result_serializer = NmapHostSerializer(results, many=True) 
-            
-            return Response(result_serializer.data, status=status.HTTP_200_OK)
+            # Sin 'service' entre los campos pedidos Nmap se ejecuta sin detección de servicios (-A)
+            results = use_case.execute(targets, service_detection=fields is None or "service" in fields,
+                                       fresh=serializer.validated_data['fresh']) # List[NmapHost] (Pydantic)
+            record_scan(scanner_response(",".join(targets), "nmap", format_nmap_results_structured(results)))
+
+            if fields is not None:
+                return Response([select_nmap_fields(host, fields) for host in format_nmap_results_structured(results)], status=status.HTTP_200_OK)
+            # Los modelos Pydantic se codifican directamente a JSON (model_dump_json), sin NmapHostSerializer
+            return Response(encode_models(results), status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
@@ -0,0 +1,44 @@
+# api/watchlist_views.py
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from .models import WatchedAsset
+from .monitoring import add_to_watchlist
+from .serializers import WatchedAssetRequestSerializer
+
+
+def _asset_dict(asset: WatchedAsset) -> dict:
+    return {
+        "id": asset.pk,
+        "domain": asset.domain,
+        "scenario": asset.scenario,
+        "interval_seconds": asset.interval_seconds,
+        "criticality": asset.criticality,
+        "enabled": asset.enabled,
+        "next_run_at": asset.next_run_at.isoformat(),
+        "last_run_at": asset.last_run_at.isoformat() if asset.last_run_at else None,
+        "last_scan_id": asset.last_scan_id,
+        "last_error": asset.last_error or None,
+    }
+
+
+class WatchlistView(APIView):
+    def get(self, request):
+        # Lista de vigilancia, por próxima ejecución (la ejecuta el comando monitor_watchlist)
+        assets = WatchedAsset.objects.order_by("next_run_at")
+        return Response({"assets": [_asset_dict(asset) for asset in assets]}, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        serializer = WatchedAssetRequestSerializer(data=request.data)
+        if serializer.is_valid():
+            asset = add_to_watchlist(**serializer.validated_data)
+            return Response(_asset_dict(asset), status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class WatchedAssetDetailView(APIView):
+    def delete(self, request, asset_id: int):
+        deleted, _ = WatchedAsset.objects.filter(pk=asset_id).delete()
+        if not deleted:
+            return Response({"error": "Activo no encontrado en la lista de vigilancia."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,104 @@
+# api/write_behind.py
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+SCAN_WRITE_BATCH_SIZE = int(os.getenv('SCAN_WRITE_BATCH_SIZE', '50'))
+SCAN_WRITE_FLUSH_INTERVAL = float(os.getenv('SCAN_WRITE_FLUSH_INTERVAL', '2.0'))
+# Por encima de este número de escaneos pendientes se escribe en el propio hilo (contrapresión)
+SCAN_WRITE_MAX_PENDING = int(os.getenv('SCAN_WRITE_MAX_PENDING', '5000'))
+
+
+class WriteBehindBuffer:
+    """
+    Escritura diferida de escaneos: submit() solo los añade a memoria y un hilo los guarda por lotes
+    (history.save_scans, un bulk_create por tabla) al llegar a 'batch_size' o cada 'interval'
+    segundos. close() (registrado con atexit) vacía el buffer antes de salir.
+    """
+
+    def __init__(self, history, batch_size: int = SCAN_WRITE_BATCH_SIZE, interval: float = SCAN_WRITE_FLUSH_INTERVAL,
+                 max_pending: int = SCAN_WRITE_MAX_PENDING):
+        self.history = history
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # Un solo lote en escritura a la vez
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self.flushed = 0
+        self.failed = 0
+        atexit.register(self.close)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="scan-write-behind", daemon=True)
+            self._thread.start()
+
+    def submit(self, response: Dict[str, Any]) -> None:
+        """Encola un escaneo (con 'scan_uid' ya asignado) para guardarlo en el próximo lote."""
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._pending.append(response)
+                overflow = len(self._pending) > self.max_pending
+                if len(self._pending) >= self.batch_size:
+                    self._wake.set()
+                self._ensure_thread()
+        if closed:
+            self.history.save_scans([response])  # Ya sin hilo (apagado): se guarda directamente
+        elif overflow:
+            self.flush()
+
+    def flush(self) -> int:
+        """Guarda todo lo pendiente; retorna cuántos escaneos se guardaron."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            saved = 0
+            for start in range(0, len(batch), self.batch_size):
+                chunk = batch[start:start + self.batch_size]
+                try:
+                    self.history.save_scans(chunk)
+                    saved += len(chunk)
+                except Exception:
+                    # Cualquier error (base de datos o una respuesta con forma inesperada) pierde solo este lote
+                    self.failed += len(chunk)
+                    logger.exception(f"Escritura diferida: no se pudieron guardar {len(chunk)} escaneos.")
+            self.flushed += saved
+            return saved
+
+    def _run(self) -> None:
+        try:
+            while not self._closed:
+                self._wake.wait(self.interval)
+                self._wake.clear()
+                # Como al empezar una petición: descarta la conexión si quedó rota (p. ej. tras reiniciar la base de datos)
+                close_old_connections()
+                self.flush()
+        finally:
+            connection.close()  # Conexión propia de este hilo
+
+    def close(self) -> None:
+        """Detiene el hilo y guarda lo pendiente (al apagar el proceso)."""
+        with self._lock:
+            self._closed = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=30)
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "flushed": self.flushed, "failed": self.failed}
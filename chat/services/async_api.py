@@ -0,0 +1,40 @@
+# security_apy/chat/services/async_api.py
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from django.http import HttpResponse
+from django.views import View
+
+from .fast_json import PreEncodedJSON, dumps
+
+
+class AsyncJSONView(View):
+    """
+    Base para las vistas asíncronas (async def post) servidas por ASGI. Las APIView de DRF no admiten
+    manejadores async, así que se usa una vista de Django con el mismo contrato JSON: cuerpo JSON
+    de entrada, JSON (json_response) de salida y sin CSRF (como las vistas DRF sin sesión).
+    """
+    http_method_names = ["post", "options"]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    @staticmethod
+    def parse_body(request) -> Tuple[Optional[Dict[str, Any]], Optional[HttpResponse]]:
+        """Retorna (datos, None) o (None, respuesta 400) si el cuerpo no es un objeto JSON."""
+        try:
+            data = json.loads(request.body or b"{}")
+        except (UnicodeDecodeError, ValueError):
+            return None, json_response({"error": "El cuerpo de la solicitud debe ser JSON válido."}, status=400)
+        if not isinstance(data, dict):
+            return None, json_response({"error": "El cuerpo de la solicitud debe ser un objeto JSON."}, status=400)
+        return data, None
+
+
+def json_response(data: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+    """Respuesta JSON codificada con fast_json (admite PreEncodedJSON); listas incluidas, como en las vistas DRF."""
+    content = data.content if isinstance(data, PreEncodedJSON) else dumps(data)
+    return HttpResponse(content, status=status, content_type="application/json", headers=headers)
@@ -0,0 +1,208 @@
+# security_apy/chat/services/chat_sessions.py
+import logging
+import os
+import threading
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import ChatConversation, ChatMessage
+from core.application.prompt_builder import PromptBuilder, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+MAX_SUMMARY_QUESTION_CHARS = 120
+MAX_SUMMARY_QUESTIONS = 10
+
+
+class ChatSession:
+    """
+    Conversación guardada en el servidor (ChatConversation), tal como se leyó de la base de datos.
+    'context' es texto fijo que encabeza cada petición (p. ej. el informe de un escaneo) y 'messages'
+    el historial completo de turnos user/assistant; 'version' es la del registro al leerlo.
+    """
+
+    def __init__(self, session_id: str, context: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None,
+                 messages: Optional[List[Dict[str, str]]] = None, version: int = 0,
+                 created_at: Optional[float] = None, updated_at: Optional[float] = None):
+        self.session_id = session_id
+        self.context = context
+        self.metadata = metadata or {}
+        self.messages: List[Dict[str, str]] = messages or []
+        self.version = version
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "context": self.context,
+            "metadata": self.metadata,
+            "messages": list(self.messages),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class HistoryWindow:
+    """
+    Política de historial: el contexto fijo y los turnos más recientes que quepan en 'token_budget'
+    (como máximo 'max_messages'). Los turnos que quedan fuera se resumen localmente en una línea por
+    pregunta, así el prompt no crece con la conversación y no hace falta otra llamada al modelo.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, max_messages: Optional[int] = None):
+        self.token_budget = token_budget or int(os.getenv('CHAT_HISTORY_TOKEN_BUDGET', '6000'))
+        self.max_messages = max_messages or int(os.getenv('CHAT_HISTORY_MAX_MESSAGES', '20'))
+
+    @staticmethod
+    def _summarize(dropped: List[Dict[str, str]]) -> str:
+        questions = [" ".join(m["content"].split()) for m in dropped if m["role"] == "user"]
+        # Acotado también el resumen: solo las últimas preguntas omitidas
+        older = len(questions) - MAX_SUMMARY_QUESTIONS
+        lines = [q if len(q) <= MAX_SUMMARY_QUESTION_CHARS else q[:MAX_SUMMARY_QUESTION_CHARS - 1] + "…"
+                 for q in questions[-MAX_SUMMARY_QUESTIONS:]]
+        if older > 0:
+            lines.insert(0, f"({older} preguntas anteriores más)")
+        return "Resumen de la conversación anterior (preguntas ya respondidas):\n" + "\n".join(f"- {line}" for line in lines)
+
+    def build_messages(self, session: ChatSession, question: str) -> List[Dict[str, str]]:
+        """Mensajes a enviar para 'question': contexto, resumen de lo omitido, ventana reciente y la pregunta."""
+        remaining = self.token_budget - estimate_tokens(question)
+        if session.context:
+            remaining -= estimate_tokens(session.context)
+
+        window: List[Dict[str, str]] = []
+        history = session.messages[-self.max_messages:] if self.max_messages else []
+        for message in reversed(history):
+            cost = estimate_tokens(message["content"]) + 4
+            if cost > remaining:
+                break
+            remaining -= cost
+            window.insert(0, message)
+        # La ventana debe empezar por una pregunta del usuario, no por una respuesta suelta
+        while window and window[0]["role"] != "user":
+            window.pop(0)
+
+        messages: List[Dict[str, str]] = []
+        preamble = [session.context] if session.context else []
+        dropped = session.messages[:len(session.messages) - len(window)]
+        if dropped:
+            preamble.append(self._summarize(dropped))
+        if preamble:
+            # El contexto va como un primer intercambio para que el modelo lo trate como dato, no como pregunta
+            messages.append({"role": "user", "content": "\n\n".join(preamble)})
+            messages.append({"role": "assistant", "content": "Entendido. Usaré esta información para responder."})
+        messages.extend(window)
+        messages.append({"role": "user", "content": question})
+        return messages
+
+
+class ChatSessionStore:
+    """
+    Sesiones en la base de datos (ChatConversation y ChatMessage): cualquier proceso o worker atiende
+    cualquier sesión. Caducan tras CHAT_SESSION_TTL segundos sin actividad.
+
+    Los turnos se guardan con control de versión optimista: append_turn solo escribe si la sesión
+    sigue en la versión que se leyó. Así dos preguntas simultáneas a la misma sesión no se intercalan
+    (la segunda se rechaza y el cliente la repite) sin mantener un bloqueo durante la llamada a DeepSeek.
+    """
+
+    def __init__(self, ttl: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else int(os.getenv('CHAT_SESSION_TTL', '3600'))
+
+    def _expired_before(self):
+        return timezone.now() - timedelta(seconds=self.ttl)
+
+    def purge_expired(self) -> int:
+        deleted, _ = ChatConversation.objects.filter(updated_at__lt=self._expired_before()).delete()
+        return deleted
+
+    def create(self, context: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None,
+               messages: Optional[List[Dict[str, str]]] = None) -> ChatSession:
+        """Crea la sesión (con sus mensajes iniciales, si los hay) y retira de paso las caducadas."""
+        self.purge_expired()
+        messages = messages or []
+        with transaction.atomic():
+            conversation = ChatConversation.objects.create(id=uuid.uuid4().hex, context=context, metadata=metadata or {},
+                                                           updated_at=timezone.now())
+            ChatMessage.objects.bulk_create(
+                ChatMessage(conversation=conversation, position=position, role=m["role"], content=m["content"])
+                for position, m in enumerate(messages))
+        return self._session(conversation, list(messages))
+
+    @staticmethod
+    def _session(conversation: ChatConversation, messages: List[Dict[str, str]]) -> ChatSession:
+        return ChatSession(conversation.pk, conversation.context, conversation.metadata, messages, conversation.version,
+                           conversation.created_at.timestamp(), conversation.updated_at.timestamp())
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        conversation = ChatConversation.objects.filter(pk=session_id).first()
+        if conversation is None:
+            return None
+        if conversation.updated_at < self._expired_before():
+            conversation.delete()
+            return None
+        messages = [{"role": role, "content": content}
+                    for role, content in conversation.messages.order_by("position").values_list("role", "content")]
+        return self._session(conversation, messages)
+
+    def append_turn(self, session: ChatSession, question: str, answer: str) -> bool:
+        """
+        Guarda la pregunta y su respuesta si la sesión no ha cambiado desde que se leyó 'session'.
+        Retorna False (sin guardar nada) si otra petición guardó antes un turno o la sesión ya no existe.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            if ChatConversation.objects.filter(pk=session.session_id, version=session.version).update(
+                    version=session.version + 1, updated_at=now) != 1:
+                return False
+            position = len(session.messages)
+            ChatMessage.objects.bulk_create([
+                ChatMessage(conversation_id=session.session_id, position=position, role="user", content=question),
+                ChatMessage(conversation_id=session.session_id, position=position + 1, role="assistant", content=answer),
+            ])
+        session.messages.extend([{"role": "user", "content": question}, {"role": "assistant", "content": answer}])
+        session.version += 1
+        session.updated_at = now.timestamp()
+        return True
+
+    def delete(self, session_id: str) -> bool:
+        deleted, _ = ChatConversation.objects.filter(pk=session_id).delete()
+        return deleted > 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"sessions": ChatConversation.objects.count(), "messages": ChatMessage.objects.count(),
+                "ttl_seconds": self.ttl}
+
+
+def create_session_from_scan(store: ChatSessionStore, scan_response: Dict[str, Any]) -> ChatSession:
+    """
+    Abre una sesión a partir de la respuesta de una orquestación (run_scan). El informe compactado
+    queda como contexto y el análisis de DeepSeek, si lo hay, como primera respuesta; las preguntas
+    siguientes solo envían la pregunta.
+    """
+    url_dominio = scan_response.get("url_dominio") or ""
+    scenario = scan_response.get("scenario") or "complete"
+    report = PromptBuilder().build_report(url_dominio, scenario, scan_response.get("scan_results") or {})
+    analysis = scan_response.get("deepseek_analysis")
+    messages = [
+        {"role": "user", "content": "Analiza la información de seguridad recopilada para el objetivo."},
+        {"role": "assistant", "content": analysis},
+    ] if analysis else []
+    return store.create(context=report, metadata={"url_dominio": url_dominio, "scenario": scenario}, messages=messages)
+
+
+_store: Optional[ChatSessionStore] = None
+_store_lock = threading.Lock()
+
+def get_chat_session_store() -> ChatSessionStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ChatSessionStore()
+    return _store
@@ -1,4 +1,5 @@
 # security_apy/chat/services/deep_seek_service.py
+import asyncio
 import os
 from dotenv import load_dotenv
 import requests
@@ -11,50 +12,256 @@ from requests import RequestException
 from django.views.decorators.csrf import csrf_exempt
 load_dotenv()
 import json
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterator, List, Optional
 from django.http import JsonResponse
+import httpx
+from core.infrastructure.archive.artifact_archive import archive_artifact
+from core.infrastructure.http.async_client import async_http_request
+from core.infrastructure.http.client import http_request
+from core.infrastructure.http.resilience import CircuitOpenError, get_breaker
 
+DEEPSEEK_URL = "https://api.deepseek.com/chat/completions"
 
-def consultar_deepseek(prompt: str) -> str:
-    url = "https://api.deepseek.com/chat/completions"
-    headers = {
+
+def get_deepseek_breaker():
+    # Respuestas de más de 45 s cuentan como fallo: con el servicio degradado es mejor fallar rápido
+    return get_breaker("deepseek", failure_threshold=3, reset_timeout=60.0, slow_call_seconds=45.0)
+
+
+MENSAJE_SIN_CREDITO = "Tu cuenta de DeepSeek no tiene crédito o acceso habilitado. Verifica tu plan en https://platform.deepseek.com"
+
+
+class DeepSeekError(Exception):
+    """
+    Error al consultar DeepSeek; el mensaje está pensado para mostrarse al usuario.
+    'retryable' indica si tiene sentido reintentar (timeouts, 429, 5xx, circuito abierto) y
+    'retry_after' los segundos de espera sugeridos por el servicio, si los indicó.
+    """
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class DeepSeekRateLimitError(DeepSeekError):
+    """DeepSeek respondió 429 (límite de peticiones o tokens)."""
+    pass
+
+
+def _build_headers() -> dict:
+    return {
         "Authorization": f"Bearer {os.getenv('DEEPSEEK_API_KEY')}",
         "Content-Type": "application/json"
     }
 
+
+SYSTEM_PROMPT = "Eres un asistente útil que responde en español."
+
+
+def _build_chat_payload(messages: List[dict], stream: bool = False) -> dict:
+    """Payload con una conversación completa: mensajes {'role', 'content'} precedidos del mensaje de sistema."""
     payload = {
         "model": "deepseek-chat",  # o "deepseek-coder" si usas el modelo para código
-        "messages": [
-            {"role": "system", "content": "Eres un asistente útil que responde en español."},
-            {"role": "user", "content": prompt}
-        ],
+        "messages": [{"role": "system", "content": SYSTEM_PROMPT}, *messages],
         "temperature": 0.3,
         "max_tokens": 5000
     }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+def _build_payload(prompt: str, stream: bool = False) -> dict:
+    return _build_chat_payload([{"role": "user", "content": prompt}], stream)
+
 
+def _enviar_a_deepseek(headers: dict, payload: dict, stream: bool = False) -> requests.Response:
+    # Sesión compartida con keep-alive: evita un handshake TLS por cada consulta
+    response = http_request(
+        "POST", DEEPSEEK_URL, headers=headers, json=payload, stream=stream,
+        read_timeout=float(os.getenv('DEEPSEEK_READ_TIMEOUT', '70'))
+    )
+    # Solo los 5xx indican un servicio degradado; se lanzan aquí para que el circuito los cuente.
+    # Un 429 es contrapresión por límite de uso (p. ej. del envío por lotes), no una caída: lo trata
+    # quien llama, fuera del circuito, como DeepSeekRateLimitError con su Retry-After.
+    if response.status_code >= 500:
+        response.raise_for_status()
+    return response
+
+
+async def _enviar_a_deepseek_async(headers: dict, payload: dict) -> httpx.Response:
+    response = await async_http_request(
+        "POST", DEEPSEEK_URL, headers=headers, json=payload,
+        read_timeout=float(os.getenv('DEEPSEEK_READ_TIMEOUT', '70'))
+    )
+    if response.status_code >= 500:
+        response.raise_for_status()
+    return response
+
+
+def _archivar_transcripcion(payload: dict, response: dict) -> None:
+    """Guarda la petición y la respuesta completas en el archivo de artefactos, para auditarlas después."""
+    archive_artifact("deepseek_transcript", payload.get("model", ""),
+                     json.dumps({"request": payload, "response": response}, ensure_ascii=False).encode("utf-8"),
+                     {"stream": bool(payload.get("stream"))})
+
+
+def _describir_error(error: Exception) -> str:
+    """Traduce una excepción de la llamada a DeepSeek a un mensaje para el usuario."""
+    if isinstance(error, CircuitOpenError):
+        return f"DeepSeek no está disponible temporalmente (demasiados fallos o respuestas lentas). Reintenta en {error.retry_after:.0f} s."
+    if isinstance(error, requests.exceptions.Timeout):
+        return "Tiempo de espera agotado al contactar DeepSeek."
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return f"No se pudo establecer conexión con DeepSeek. {str(error)}"
+    if isinstance(error, requests.exceptions.HTTPError):
+        return f"Error HTTP: {error.response.status_code} - {error.response.text}"
+    if isinstance(error, requests.exceptions.RequestException):
+        return f"Error de solicitud: {str(error)}"
+    if isinstance(error, httpx.TimeoutException):
+        return "Tiempo de espera agotado al contactar DeepSeek."
+    if isinstance(error, httpx.TransportError):
+        return f"No se pudo establecer conexión con DeepSeek. {str(error)}"
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"Error HTTP: {error.response.status_code} - {error.response.text}"
+    if isinstance(error, httpx.HTTPError):
+        return f"Error de solicitud: {str(error)}"
+    return f"Error inesperado: {str(error)}"
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Cabecera Retry-After en segundos o como fecha HTTP."""
+    if not value:
+        return None
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=70)
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _a_deepseek_error(error: Exception) -> DeepSeekError:
+    """Convierte la excepción de la llamada en un DeepSeekError con su mensaje y si es reintentable."""
+    message = _describir_error(error)
+    if isinstance(error, CircuitOpenError):
+        return DeepSeekError(message, retryable=True, retry_after=error.retry_after)
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        if error.response.status_code == 429:
+            return DeepSeekRateLimitError(message, retryable=True,
+                                          retry_after=_parse_retry_after(error.response.headers.get("Retry-After")))
+        return DeepSeekError(message, retryable=error.response.status_code >= 500)
+    if isinstance(error, httpx.HTTPStatusError):
+        if error.response.status_code == 429:
+            return DeepSeekRateLimitError(message, retryable=True,
+                                          retry_after=_parse_retry_after(error.response.headers.get("Retry-After")))
+        return DeepSeekError(message, retryable=error.response.status_code >= 500)
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError, httpx.TransportError)):
+        return DeepSeekError(message, retryable=True)
+    return DeepSeekError(message)
+
+
+def solicitar_analisis_deepseek(prompt: str) -> str:
+    """Como consultar_deepseek, pero lanza DeepSeekError en vez de devolver el mensaje de error."""
+    return solicitar_chat_deepseek([{"role": "user", "content": prompt}])
+
+
+def solicitar_chat_deepseek(messages: List[dict]) -> str:
+    """Envía una conversación (lista de mensajes 'user'/'assistant') y retorna la respuesta. Lanza DeepSeekError."""
+    try:
+        payload = _build_chat_payload(messages)
+        response = get_deepseek_breaker().call(_enviar_a_deepseek, _build_headers(), payload)
 
         # Manejar errores HTTP con claridad
         if response.status_code == 402:
-            return "Tu cuenta de DeepSeek no tiene crédito o acceso habilitado. Verifica tu plan en https://platform.deepseek.com"
+            raise DeepSeekError(MENSAJE_SIN_CREDITO)
 
         response.raise_for_status()
 
         data = response.json()
+        _archivar_transcripcion(payload, data)
         return data["choices"][0]["message"]["content"].strip()
 
-    except requests.exceptions.Timeout:
-        return "Tiempo de espera agotado al contactar DeepSeek."
+    except DeepSeekError:
+        raise
+    except Exception as e:
+        raise _a_deepseek_error(e) from e
+
+
+async def solicitar_analisis_deepseek_async(prompt: str) -> str:
+    """Versión asíncrona (httpx) de solicitar_analisis_deepseek, con el mismo circuito y los mismos errores."""
+    try:
+        payload = _build_payload(prompt)
+        response = await get_deepseek_breaker().call_async(_enviar_a_deepseek_async, _build_headers(), payload)
+
+        if response.status_code == 402:
+            raise DeepSeekError(MENSAJE_SIN_CREDITO)
+
+        response.raise_for_status()
+
+        data = response.json()
+        await asyncio.to_thread(_archivar_transcripcion, payload, data)
+        return data["choices"][0]["message"]["content"].strip()
+
+    except DeepSeekError:
+        raise
+    except Exception as e:
+        raise _a_deepseek_error(e) from e
+
+
+def consultar_deepseek(prompt: str) -> str:
+    try:
+        return solicitar_analisis_deepseek(prompt)
+    except DeepSeekError as e:
+        return str(e)
 
-    except requests.exceptions.ConnectionError as conn_err:
-        return f"No se pudo establecer conexión con DeepSeek. {str(conn_err)}"
 
-    except requests.exceptions.HTTPError as http_err:
-        return f"Error HTTP: {http_err.response.status_code} - {http_err.response.text}"
+def consultar_deepseek_stream(prompt: str) -> Iterator[str]:
+    """
+    Consulta DeepSeek con stream=true y va devolviendo los fragmentos de texto según llegan.
+    Lanza DeepSeekError (con un mensaje para el usuario) si la llamada falla.
+    """
+    return consultar_chat_deepseek_stream([{"role": "user", "content": prompt}])
 
-    except requests.exceptions.RequestException as req_err:
-        return f"Error de solicitud: {str(req_err)}"
 
+def consultar_chat_deepseek_stream(messages: List[dict]) -> Iterator[str]:
+    """Como consultar_deepseek_stream, para una conversación completa."""
+    payload = _build_chat_payload(messages, stream=True)
+    try:
+        response = get_deepseek_breaker().call(_enviar_a_deepseek, _build_headers(), payload, True)
     except Exception as e:
-        return f"Error inesperado: {str(e)}"
-    
\ No newline at end of file
+        raise _a_deepseek_error(e) from e
+
+    chunks: List[str] = []
+
+    try:
+        if response.status_code == 402:
+            raise DeepSeekError(MENSAJE_SIN_CREDITO)
+        response.raise_for_status()
+
+        # Formato SSE: líneas "data: {json}" con choices[0].delta.content y un "data: [DONE]" final
+        for raw_line in response.iter_lines():
+            line = raw_line.decode("utf-8", errors="replace") if isinstance(raw_line, bytes) else raw_line
+            if not line.startswith("data:"):
+                continue  # líneas vacías y comentarios de keep-alive
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                continue
+            choices = chunk.get("choices") or []
+            text = (choices[0].get("delta") or {}).get("content") if choices else None
+            if text:
+                chunks.append(text)
+                yield text
+        _archivar_transcripcion(payload, {"content": "".join(chunks)})
+    except requests.exceptions.RequestException as e:
+        raise _a_deepseek_error(e) from e
+    finally:
+        response.close()
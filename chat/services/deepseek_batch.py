@@ -0,0 +1,157 @@
+# security_apy/chat/services/deepseek_batch.py
+import logging
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from core.application.prompt_builder import estimate_tokens
+from .deep_seek_service import DeepSeekError, DeepSeekRateLimitError, solicitar_analisis_deepseek
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Limitador por cubetas de tokens para peticiones por minuto (RPM) y tokens por minuto (TPM),
+    compartido entre hilos. None desactiva ese límite; un límite <= 0 o no finito lanza ValueError
+    (la cubeta no se rellenaría nunca). pause() detiene a todos los hilos (p. ej. tras un 429 con
+    Retry-After).
+    """
+
+    def __init__(self, requests_per_minute: Optional[float], tokens_per_minute: Optional[float]):
+        for name, value in (("requests_per_minute", requests_per_minute), ("tokens_per_minute", tokens_per_minute)):
+            if value is not None and not (math.isfinite(value) and value > 0):
+                raise ValueError(f"'{name}' debe ser un número positivo (o None para no limitar): {value!r}")
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self._requests = float(self.rpm or 0)
+        self._tokens = float(self.tpm or 0)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Bloquea hasta que haya cupo para una petición de 'tokens' tokens y lo consume."""
+        if self.tpm:
+            tokens = min(tokens, self.tpm)  # Una petición mayor que la cubeta no podría pasar nunca
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    missing_requests = (1 - self._requests) if self.rpm else 0
+                    missing_tokens = (tokens - self._tokens) if self.tpm else 0
+                    if missing_requests <= 0 and missing_tokens <= 0:
+                        if self.rpm:
+                            self._requests -= 1
+                        if self.tpm:
+                            self._tokens -= tokens
+                        return
+                    wait = max(
+                        missing_requests * 60.0 / self.rpm if self.rpm else 0,
+                        missing_tokens * 60.0 / self.tpm if self.tpm else 0,
+                    )
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _env_limit(name: str, default: str) -> Optional[float]:
+    """Límite configurado por entorno; 0 lo desactiva."""
+    value = float(os.getenv(name, default))
+    return value or None
+
+
+def client_limits(requests_per_minute: Optional[float], tokens_per_minute: Optional[float]) -> Dict[str, Optional[float]]:
+    """
+    Límites efectivos de un lote pedido por un cliente: solo puede bajar los configurados
+    (DEEPSEEK_BATCH_RPM/TPM), nunca subirlos, y no por debajo de DEEPSEEK_BATCH_MIN_RPM/TPM (un límite
+    ínfimo dejaría el lote ocupando un hilo durante horas).
+    """
+    limits = {}
+    for key, requested, name, default, floor_name, floor_default in (
+        ("requests_per_minute", requests_per_minute, 'DEEPSEEK_BATCH_RPM', '60', 'DEEPSEEK_BATCH_MIN_RPM', '10'),
+        ("tokens_per_minute", tokens_per_minute, 'DEEPSEEK_BATCH_TPM', '200000', 'DEEPSEEK_BATCH_MIN_TPM', '20000'),
+    ):
+        configured = _env_limit(name, default)
+        if requested is None:
+            limits[key] = configured
+            continue
+        value = max(requested, float(os.getenv(floor_name, floor_default)))
+        limits[key] = min(value, configured) if configured is not None else value
+    return limits
+
+
+def _backoff_delay(attempt: int, error: DeepSeekError, base: float, cap: float) -> float:
+    """Espera antes de reintentar: Retry-After si el servicio lo indicó, si no exponencial con jitter completo."""
+    if error.retry_after is not None:
+        return error.retry_after + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def analizar_lote(prompts: List[str], max_workers: Optional[int] = None,
+                  requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                  max_retries: Optional[int] = None,
+                  on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Envía muchos prompts a DeepSeek en paralelo sin superar los límites RPM/TPM configurados.
+    Los 429 pausan a todos los hilos durante el Retry-After; los errores reintentables se reintentan
+    con backoff exponencial y jitter. Retorna, en el mismo orden que 'prompts', un diccionario por
+    prompt con 'respuesta' o 'error', y 'intentos'. 'on_result' se llama (desde los hilos del lote)
+    con cada resultado en cuanto termina, para informar del progreso.
+    """
+    max_workers = max_workers or int(os.getenv('DEEPSEEK_BATCH_WORKERS', '8'))
+    max_retries = max_retries if max_retries is not None else int(os.getenv('DEEPSEEK_BATCH_MAX_RETRIES', '5'))
+    limiter = RateLimiter(
+        requests_per_minute if requests_per_minute is not None else _env_limit('DEEPSEEK_BATCH_RPM', '60'),
+        tokens_per_minute if tokens_per_minute is not None else _env_limit('DEEPSEEK_BATCH_TPM', '200000'),
+    )
+    # El TPM del proveedor cuenta también la respuesta; se reserva una estimación de su tamaño.
+    expected_completion = int(os.getenv('DEEPSEEK_BATCH_EXPECTED_COMPLETION_TOKENS', '1000'))
+    backoff_base = float(os.getenv('DEEPSEEK_BATCH_BACKOFF_BASE', '1'))
+    backoff_cap = float(os.getenv('DEEPSEEK_BATCH_BACKOFF_CAP', '60'))
+
+    def _analizar(index: int, prompt: str) -> Dict[str, Any]:
+        tokens = estimate_tokens(prompt) + expected_completion
+        for attempt in range(max_retries + 1):
+            limiter.acquire(tokens)
+            try:
+                return {"index": index, "respuesta": solicitar_analisis_deepseek(prompt), "intentos": attempt + 1}
+            except DeepSeekError as e:
+                if not e.retryable or attempt == max_retries:
+                    return {"index": index, "error": str(e), "intentos": attempt + 1}
+                delay = _backoff_delay(attempt, e, backoff_base, backoff_cap)
+                if isinstance(e, DeepSeekRateLimitError):
+                    # Un 429 afecta a toda la cuenta: se frena el lote entero, no solo este hilo.
+                    limiter.pause(delay)
+                logger.warning(f"Lote DeepSeek: prompt {index} falló ({e}); reintento {attempt + 1}/{max_retries} en {delay:.1f} s.")
+                time.sleep(delay)
+        return {"index": index, "error": "Reintentos agotados.", "intentos": max_retries + 1}
+
+    def _analizar_e_informar(index: int, prompt: str) -> Dict[str, Any]:
+        result = _analizar(index, prompt)
+        if on_result is not None:
+            try:
+                on_result(result)
+            except Exception as e:
+                logger.error(f"Lote DeepSeek: error al informar del resultado del prompt {index}: {e}")
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_analizar_e_informar, index, prompt) for index, prompt in enumerate(prompts)]
+        return [future.result() for future in futures]
@@ -0,0 +1,110 @@
+# security_apy/chat/services/deepseek_batch_jobs.py
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.db import DatabaseError, connection
+from django.db.models import F
+from django.utils import timezone
+
+from api.models import DeepSeekBatchJob
+from .deepseek_batch import analizar_lote
+
+logger = logging.getLogger(__name__)
+
+# Lotes que procesa a la vez cada proceso (cada uno con sus DEEPSEEK_BATCH_WORKERS hilos)
+BATCH_JOB_CONCURRENCY = int(os.getenv('DEEPSEEK_BATCH_JOB_CONCURRENCY', '2'))
+# Un lote en ejecución sin progreso durante este tiempo se da por interrumpido (el proceso se detuvo)
+BATCH_JOB_STALE_SECONDS = int(os.getenv('DEEPSEEK_BATCH_JOB_STALE_SECONDS', '900'))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BATCH_JOB_CONCURRENCY, thread_name_prefix="deepseek-batch")
+    return _executor
+
+
+def _jobs(job_id):
+    return DeepSeekBatchJob.objects.filter(pk=job_id)
+
+
+def _run_job(job_id) -> None:
+    try:
+        now = timezone.now()
+        if _jobs(job_id).filter(status=DeepSeekBatchJob.QUEUED).update(
+                status=DeepSeekBatchJob.RUNNING, started_at=now, updated_at=now) != 1:
+            return
+        job = DeepSeekBatchJob.objects.get(pk=job_id)
+
+        def _progress(result: Dict[str, Any]) -> None:
+            # Se llama desde los hilos de analizar_lote: cada uno cierra la conexión que abre
+            try:
+                _jobs(job_id).update(completed=F("completed") + 1, updated_at=timezone.now())
+            finally:
+                connection.close()
+
+        try:
+            results = analizar_lote(job.prompts, requests_per_minute=job.requests_per_minute,
+                                    tokens_per_minute=job.tokens_per_minute, on_result=_progress)
+        except Exception as e:
+            logger.exception(f"Lote DeepSeek {job_id}: error inesperado: {e}")
+            now = timezone.now()
+            _jobs(job_id).update(status=DeepSeekBatchJob.FAILED, error=str(e)[:2000], finished_at=now, updated_at=now)
+            return
+        now = timezone.now()
+        _jobs(job_id).update(status=DeepSeekBatchJob.DONE, results=results, completed=len(results),
+                             finished_at=now, updated_at=now)
+        logger.info(f"Lote DeepSeek {job_id}: {len(results)} prompts procesados.")
+    except DatabaseError as e:
+        logger.error(f"Lote DeepSeek {job_id}: no se pudo actualizar su estado: {e}")
+    finally:
+        connection.close()  # Conexión propia del hilo del ejecutor
+
+
+def submit_batch_job(prompts: List[str], requests_per_minute: Optional[float],
+                     tokens_per_minute: Optional[float]) -> DeepSeekBatchJob:
+    """Guarda el lote y lo encola en el ejecutor del proceso; retorna el trabajo en estado 'queued'."""
+    job = DeepSeekBatchJob.objects.create(prompts=prompts, requests_per_minute=requests_per_minute,
+                                          tokens_per_minute=tokens_per_minute)
+    _get_executor().submit(_run_job, job.pk)
+    return job
+
+
+def get_batch_job(job_id) -> Optional[DeepSeekBatchJob]:
+    """El lote con ese id, o None. Un lote en ejecución sin progreso reciente se marca como fallido."""
+    job = DeepSeekBatchJob.objects.filter(pk=job_id).first()
+    if job is None or job.status != DeepSeekBatchJob.RUNNING:
+        return job
+    stale_before = timezone.now() - timedelta(seconds=BATCH_JOB_STALE_SECONDS)
+    if job.updated_at < stale_before:
+        now = timezone.now()
+        if _jobs(job_id).filter(status=DeepSeekBatchJob.RUNNING, updated_at__lt=stale_before).update(
+                status=DeepSeekBatchJob.FAILED, error="Lote interrumpido: sin progreso (el proceso que lo ejecutaba se detuvo).",
+                finished_at=now, updated_at=now):
+            job.refresh_from_db()
+    return job
+
+
+def batch_job_dict(job: DeepSeekBatchJob) -> Dict[str, Any]:
+    return {
+        "id": str(job.pk),
+        "status": job.status,
+        "total": len(job.prompts),
+        "completed": job.completed,
+        "rpm": job.requests_per_minute,
+        "tpm": job.tokens_per_minute,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "error": job.error or None,
+        "resultados": job.results,
+    }
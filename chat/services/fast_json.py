@@ -0,0 +1,65 @@
+# security_apy/chat/services/fast_json.py
+import json
+from typing import Any, Iterable, List
+
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json de la librería estándar
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # Entidades del dominio (to_dict), modelos pydantic y cualquier otro tipo (texto)
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+def dumps(data: Any) -> bytes:
+    """Serializa a JSON en UTF-8 con orjson si está disponible."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class PreEncodedJSON:
+    """JSON ya codificado: FastJSONRenderer lo envía tal cual, sin volver a recorrer los datos."""
+    __slots__ = ("content",)
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+
+def encode_models(models: Iterable[Any]) -> PreEncodedJSON:
+    """
+    Lista de modelos pydantic directamente a bytes (model_dump_json, validado por pydantic en Rust),
+    sin pasar por diccionarios intermedios ni serializadores DRF.
+    """
+    parts: List[bytes] = []
+    for model in models:
+        if hasattr(model, "model_dump_json"):
+            parts.append(model.model_dump_json().encode("utf-8"))
+        else:  # pydantic v1
+            parts.append(model.json().encode("utf-8"))
+    return PreEncodedJSON(b"[" + b",".join(parts) + b"]")
+
+
+class FastJSONRenderer(BaseRenderer):
+    """
+    Sustituto de JSONRenderer: codifica con orjson (o json) en una sola pasada y deja pasar
+    PreEncodedJSON sin tocarlo.
+    """
+    media_type = "application/json"
+    format = "json"
+    charset = None  # JSON siempre es UTF-8 (RFC 8259)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, PreEncodedJSON):
+            return data.content
+        return dumps(data)
@@ -0,0 +1,46 @@
+# security_apy/chat/services/sse.py
+import json
+from typing import Any, Iterable, Iterator, Tuple
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Formatea un evento Server-Sent Events con los datos serializados en JSON."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Permite que DRF acepte 'Accept: text/event-stream'. Las respuestas normales (p. ej. errores 400)
+    se envían como un único evento 'error'; el streaming real lo hace sse_response.
+    """
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return format_sse("error", data).encode(self.charset)
+
+
+def wants_stream(request) -> bool:
+    """El cliente pide streaming con 'stream: true' en el cuerpo, '?stream=1' o 'Accept: text/event-stream'."""
+    flag = request.data.get("stream") if hasattr(request.data, "get") else None
+    if flag is None:
+        flag = request.query_params.get("stream")
+    if isinstance(flag, str):
+        flag = flag.lower() in ("1", "true", "yes", "si", "sí")
+    return bool(flag) or "text/event-stream" in request.headers.get("Accept", "")
+
+
+def sse_response(events: Iterable[Tuple[str, Any]]) -> StreamingHttpResponse:
+    """Respuesta HTTP que envía cada (evento, datos) en cuanto el generador lo produce."""
+    def _stream() -> Iterator[str]:
+        for event, data in events:
+            yield format_sse(event, data)
+
+    response = StreamingHttpResponse(_stream(), content_type="text/event-stream; charset=utf-8")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Evita que nginx acumule la respuesta
+    return response
@@ -1,9 +1,16 @@
 # security_apy/chat/urls.py
 from django.urls import path
 from .views.viewTest import TestView
-from .views.viewDeepseek import DeepSeekView
+from .views.viewDeepseek import DeepSeekView, DeepSeekAsyncView, DeepSeekBatchView, DeepSeekBatchJobView
+from .views.viewChatSession import ChatSessionListView, ChatSessionDetailView, ChatSessionMessageView
 
 urlpatterns = [
     path('test/', TestView.as_view(), name='test-endpoint'),
-    path('deepseek/', DeepSeekView.as_view(), name='deepseek-endpoint')
+    path('deepseek/', DeepSeekView.as_view(), name='deepseek-endpoint'),
+    path('deepseek/async/', DeepSeekAsyncView.as_view(), name='deepseek-async-endpoint'),
+    path('deepseek/lote/', DeepSeekBatchView.as_view(), name='deepseek-batch-endpoint'),
+    path('deepseek/lote/<uuid:job_id>/', DeepSeekBatchJobView.as_view(), name='deepseek-batch-job'),
+    path('deepseek/sesiones/', ChatSessionListView.as_view(), name='chat-sessions'),
+    path('deepseek/sesiones/<str:session_id>/', ChatSessionDetailView.as_view(), name='chat-session-detail'),
+    path('deepseek/sesiones/<str:session_id>/mensajes/', ChatSessionMessageView.as_view(), name='chat-session-messages'),
 ]
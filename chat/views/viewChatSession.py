@@ -0,0 +1,116 @@
+# security_apy/chat/views/viewChatSession.py
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.settings import api_settings
+from core.application.prompt_builder import estimate_tokens
+from ..services.chat_sessions import HistoryWindow, create_session_from_scan, get_chat_session_store
+from ..services.deep_seek_service import DeepSeekError, consultar_chat_deepseek_stream, get_deepseek_breaker, solicitar_chat_deepseek
+from ..services.sse import EventStreamRenderer, sse_response, wants_stream
+
+
+SESSION_CONFLICT = "La sesión recibió otra pregunta mientras se respondía esta; repite la pregunta."
+
+
+def _session_not_found():
+    return Response({"error": "Sesión no encontrada o caducada."}, status=status.HTTP_404_NOT_FOUND)
+
+
+class ChatSessionListView(APIView):
+
+    def post(self, request):
+        # Se abre vacía, con un contexto de texto libre o a partir de la respuesta de una orquestación
+        store = get_chat_session_store()
+        scan = request.data.get("scan")
+        if scan is not None:
+            if not isinstance(scan, dict) or not isinstance(scan.get("scan_results"), dict):
+                return Response({"error": "'scan' debe ser la respuesta de una consulta de orquestación."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            session = create_session_from_scan(store, scan)
+        else:
+            context = request.data.get("context")
+            if context is not None and not isinstance(context, str):
+                return Response({"error": "'context' debe ser texto."}, status=status.HTTP_400_BAD_REQUEST)
+            session = store.create(context=context or None)
+        return Response(session.to_dict(), status=status.HTTP_201_CREATED)
+
+
+class ChatSessionDetailView(APIView):
+
+    def get(self, request, session_id):
+        session = get_chat_session_store().get(session_id)
+        if session is None:
+            return _session_not_found()
+        return Response(session.to_dict())
+
+    def delete(self, request, session_id):
+        if not get_chat_session_store().delete(session_id):
+            return _session_not_found()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ChatSessionMessageView(APIView):
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
+
+    def post(self, request, session_id):
+        question = request.data.get("message", "")
+        if not question:
+            return Response({"error": "Falta el mensaje."}, status=status.HTTP_400_BAD_REQUEST)
+        store = get_chat_session_store()
+        session = store.get(session_id)
+        if session is None:
+            return _session_not_found()
+
+        breaker = get_deepseek_breaker()
+        if breaker.is_open():
+            return Response(
+                {"error": "DeepSeek no está disponible temporalmente.", "circuito": breaker.snapshot()},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(int(breaker.retry_after()) + 1)}
+            )
+
+        window = HistoryWindow()
+        if wants_stream(request):
+            return sse_response(self._stream_turn(store, session, window, question))
+
+        messages = window.build_messages(session, question)
+        try:
+            respuesta = solicitar_chat_deepseek(messages)
+        except DeepSeekError as e:
+            # El turno fallido no se guarda: el cliente puede repetir la pregunta
+            return Response({"error": str(e), "session_id": session.session_id},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE if e.retryable else status.HTTP_502_BAD_GATEWAY)
+        # Cada pregunta debe ver la respuesta anterior: si otra petición guardó un turno antes, esta se rechaza
+        if not store.append_turn(session, question, respuesta):
+            return Response({"error": SESSION_CONFLICT, "session_id": session.session_id},
+                            status=status.HTTP_409_CONFLICT)
+        return Response({
+            "session_id": session.session_id,
+            "respuesta": respuesta,
+            "historial": self._history_info(session, messages),
+        })
+
+    def _stream_turn(self, store, session, window, question):
+        messages = window.build_messages(session, question)
+        chunks = []
+        try:
+            for chunk in consultar_chat_deepseek_stream(messages):
+                chunks.append(chunk)
+                yield "token", {"text": chunk}
+        except DeepSeekError as e:
+            yield "error", {"error": str(e), "session_id": session.session_id}
+            return
+        respuesta = "".join(chunks).strip()
+        if not store.append_turn(session, question, respuesta):
+            yield "error", {"error": SESSION_CONFLICT, "session_id": session.session_id, "conflict": True}
+            return
+        yield "done", {"session_id": session.session_id, "respuesta": respuesta,
+                       "historial": self._history_info(session, messages)}
+
+    @staticmethod
+    def _history_info(session, messages):
+        return {
+            "mensajes_guardados": len(session.messages),
+            "mensajes_enviados": len(messages),
+            "tokens_estimados": sum(estimate_tokens(m["content"]) for m in messages),
+        }
@@ -1,15 +1,113 @@
 # security_apy/chat/views/viewDeepseek.py
+import math
+import os
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from ..services.deep_seek_service import consultar_deepseek
+from rest_framework.settings import api_settings
+from ..services.async_api import AsyncJSONView, json_response
+from ..services.deep_seek_service import (
+    DeepSeekError, consultar_deepseek, consultar_deepseek_stream, get_deepseek_breaker, solicitar_analisis_deepseek_async
+)
+from ..services.deepseek_batch import client_limits
+from ..services.deepseek_batch_jobs import batch_job_dict, get_batch_job, submit_batch_job
+from ..services.sse import EventStreamRenderer, sse_response, wants_stream
+
+
+def deepseek_stream_events(prompt: str):
+    """Eventos SSE de una consulta en streaming: 'token' por fragmento y 'done' (o 'error') al final."""
+    chunks = []
+    try:
+        for chunk in consultar_deepseek_stream(prompt):
+            chunks.append(chunk)
+            yield "token", {"text": chunk}
+    except DeepSeekError as e:
+        yield "error", {"error": str(e)}
+        return
+    yield "done", {"respuesta": "".join(chunks).strip()}
+
  
 class DeepSeekView(APIView):
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
 
     def post(self, request):
         prompt = request.data.get("message", "")    
         if not prompt:
             return Response({"error": "Falta el mensaje."}, status=status.HTTP_400_BAD_REQUEST)
 
+        breaker = get_deepseek_breaker()
+        if breaker.is_open():
+            retry_after = breaker.retry_after()
+            return Response(
+                {"error": "DeepSeek no está disponible temporalmente.", "circuito": breaker.snapshot()},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(int(retry_after) + 1)}
+            )
+
+        if wants_stream(request):
+            return sse_response(deepseek_stream_events(prompt))
+
         respuesta = consultar_deepseek(prompt)
-        return Response({"respuesta": respuesta})
\ No newline at end of file
+        return Response({"respuesta": respuesta})
+
+
+
+class DeepSeekAsyncView(AsyncJSONView):
+    """Igual que DeepSeekView (sin streaming), pero la espera a DeepSeek no ocupa un hilo bajo ASGI."""
+
+    async def post(self, request):
+        data, error_response = self.parse_body(request)
+        if error_response:
+            return error_response
+        prompt = data.get("message", "")
+        if not prompt:
+            return json_response({"error": "Falta el mensaje."}, status=400)
+
+        breaker = get_deepseek_breaker()
+        if breaker.is_open():
+            return json_response(
+                {"error": "DeepSeek no está disponible temporalmente.", "circuito": breaker.snapshot()},
+                status=503,
+                headers={"Retry-After": str(int(breaker.retry_after()) + 1)}
+            )
+
+        try:
+            respuesta = await solicitar_analisis_deepseek_async(prompt)
+        except DeepSeekError as e:
+            respuesta = str(e)
+        return json_response({"respuesta": respuesta})
+
+
+class DeepSeekBatchView(APIView):
+    """
+    Encola un lote de prompts y responde 202 con su id; el estado, el progreso y los resultados se
+    consultan en DeepSeekBatchJobView. 'rpm'/'tpm' solo pueden bajar los límites configurados.
+    """
+
+    def post(self, request):
+        prompts = request.data.get("messages")
+        if not isinstance(prompts, list) or not prompts or not all(isinstance(p, str) and p for p in prompts):
+            return Response({"error": "Se requiere 'messages': una lista de mensajes no vacíos."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(prompts) > int(os.getenv('DEEPSEEK_BATCH_MAX_PROMPTS', '500')):
+            return Response({"error": "Demasiados mensajes en un solo lote."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rpm = float(request.data["rpm"]) if request.data.get("rpm") is not None else None
+            tpm = float(request.data["tpm"]) if request.data.get("tpm") is not None else None
+        except (TypeError, ValueError):
+            return Response({"error": "'rpm' y 'tpm' deben ser numéricos."}, status=status.HTTP_400_BAD_REQUEST)
+        if any(value is not None and not (math.isfinite(value) and value > 0) for value in (rpm, tpm)):
+            return Response({"error": "'rpm' y 'tpm' deben ser mayores que 0."}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = submit_batch_job(prompts, **client_limits(rpm, tpm))
+        url = f"{request.path.rstrip('/')}/{job.pk}/"  # deepseek/lote/<id>/, donde esté montada la vista
+        return Response({**batch_job_dict(job), "url": url}, status=status.HTTP_202_ACCEPTED, headers={"Location": url})
+
+
+class DeepSeekBatchJobView(APIView):
+
+    def get(self, request, job_id):
+        job = get_batch_job(job_id)
+        if job is None:
+            return Response({"error": "Lote no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(batch_job_dict(job), status=status.HTTP_200_OK)
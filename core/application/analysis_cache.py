@@ -0,0 +1,125 @@
+# security_api/core/application/analysis_cache.py
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from core.domain.links import normalize_link
+from core.infrastructure.cache.tiered_cache import get_tiered_cache
+
+logger = logging.getLogger(__name__)
+
+# Cambiar este valor invalida todas las entradas (p. ej. si cambia el prompt o el modelo).
+ANALYSIS_CACHE_VERSION = "3"
+
+
+def _canonical_dns(dns_result: Optional[Dict]) -> Dict[str, List[str]]:
+    details = (dns_result or {}).get("details") or {}
+    canonical = {}
+    for record_type, records in details.items():
+        values = []
+        for record in records or []:
+            if record_type == "SOA":
+                # El serial del SOA cambia con cada actualización de zona; no es un hallazgo.
+                parts = str(record).split()
+                if len(parts) >= 3:
+                    parts[2] = "-"
+                record = " ".join(parts)
+            values.append(str(record).strip().lower())
+        canonical[record_type] = sorted(set(values))
+    return canonical
+
+
+def _canonical_nmap(nmap_result: Optional[List[Dict]]) -> List[Dict]:
+    hosts = []
+    for host in nmap_result or []:
+        ports = sorted(
+            (
+                str(port.get("protocol")), str(port.get("port")), str(port.get("state")),
+                (port.get("service") or {}).get("name", ""),
+                (port.get("service") or {}).get("product", ""),
+                (port.get("service") or {}).get("version", ""),
+            )
+            for port in host.get("ports") or []
+        )
+        hosts.append({"ip": host.get("ip"), "status": host.get("status"), "ports": ports})
+    return sorted(hosts, key=lambda h: str(h["ip"]))
+
+
+def _canonical_whois(whois_result: Optional[Dict]) -> Optional[Dict]:
+    if not whois_result or whois_result.get("error"):
+        return None
+    # updated_date y los mensajes de error se omiten: cambian sin que cambie la exposición del dominio.
+    return {
+        "registrar": whois_result.get("registrar"),
+        "creation_date": whois_result.get("creation_date"),
+        "expiration_date": whois_result.get("expiration_date"),
+        "country": whois_result.get("country"),
+        "name_servers": sorted({str(ns).lower().rstrip(".") for ns in whois_result.get("name_servers") or []}),
+        "status": sorted(set(whois_result.get("status") or [])),
+        "emails": sorted({str(email).lower() for email in whois_result.get("emails") or []}),
+    }
+
+
+def _canonical_dorks(dorks_result: Optional[Dict]) -> Optional[List[str]]:
+    if not dorks_result or dorks_result.get("status") == "omitted":
+        return None
+    # Los fragmentos (snippets) incluyen fechas y texto dinámico; solo cuentan los enlaces encontrados.
+    return sorted({normalize_link(item.get("link", "")) for item in dorks_result.get("results") or []})
+
+
+def canonical_findings(scenario: str, scan_results: Dict[str, Any]) -> Dict[str, Any]:
+    """Representación estable de los hallazgos: ordenada y sin campos volátiles."""
+    return {
+        "version": ANALYSIS_CACHE_VERSION,
+        "scenario": scenario,
+        "dns": _canonical_dns(scan_results.get("dns")),
+        "nmap": _canonical_nmap(scan_results.get("nmap")),
+        "whois": _canonical_whois(scan_results.get("whois")),
+        "google_dorks": _canonical_dorks(scan_results.get("google_dorks")),
+    }
+
+
+def findings_key(url_dominio: str, scenario: str, scan_results: Dict[str, Any]) -> str:
+    canonical = canonical_findings(scenario, scan_results)
+    canonical["target"] = url_dominio.strip().lower()
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Caché de análisis de DeepSeek por hash de hallazgos, sobre la caché compartida de escáneres
+    (TieredCache, espacio 'llm_analysis'): LRU en memoria delante de SQLite compartido por los procesos del nodo.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[int] = None,
+                 shared_max_entries: Optional[int] = None):
+        self.max_entries = max_entries or int(os.getenv('LLM_ANALYSIS_CACHE_SIZE', '256'))
+        self.ttl = ttl if ttl is not None else int(os.getenv('LLM_ANALYSIS_CACHE_TTL', str(7 * 24 * 3600)))
+        self.shared_max_entries = shared_max_entries or int(os.getenv('LLM_ANALYSIS_CACHE_MAX_ENTRIES', '5000'))
+        self._cache = get_tiered_cache("llm_analysis", self.ttl, max_entries=self.max_entries,
+                                       shared_max_entries=self.shared_max_entries)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, analysis: str) -> None:
+        self._cache.set(key, analysis)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+_analysis_cache: Optional[AnalysisCache] = None
+_analysis_cache_lock = threading.Lock()
+
+def get_analysis_cache() -> AnalysisCache:
+    global _analysis_cache
+    if _analysis_cache is None:
+        with _analysis_cache_lock:
+            if _analysis_cache is None:
+                _analysis_cache = AnalysisCache()
+    return _analysis_cache
@@ -0,0 +1,78 @@
+# security_api/core/application/batch_planner.py
+import copy
+import ipaddress
+import os
+from typing import Any, Dict, List, Optional
+
+# IPs de un mismo dominio que se escanean como mucho (el resto de registros A no se escanean)
+BATCH_MAX_IPS_PER_DOMAIN = int(os.getenv('BATCH_MAX_IPS_PER_DOMAIN', '4'))
+BATCH_MAX_DOMAINS = int(os.getenv('BATCH_MAX_DOMAINS', '200'))
+
+
+def ipv4_addresses(dns_records: Optional[Dict[str, List[str]]], limit: int = BATCH_MAX_IPS_PER_DOMAIN) -> List[str]:
+    """IPv4 válidas de los registros A, sin repetir y en su orden (como mucho 'limit')."""
+    addresses: List[str] = []
+    for value in (dns_records or {}).get("A") or []:
+        try:
+            address = str(ipaddress.IPv4Address(value.strip()))
+        except ValueError:
+            continue
+        if address not in addresses:
+            addresses.append(address)
+    return addresses[:limit]
+
+
+class TargetPlan:
+    """
+    Objetivos de Nmap de un lote de dominios: cada dominio se escanea por las IPs a las que resuelve y
+    cada IP una sola vez, aunque la compartan varios dominios (CDN, hosting compartido). Los dominios
+    sin IPv4 conocida se escanean por su nombre, como en un escaneo individual.
+    """
+
+    def __init__(self, domain_targets: Dict[str, List[str]]):
+        self.domain_targets = domain_targets
+        self.domains_by_target: Dict[str, List[str]] = {}
+        for domain, targets in domain_targets.items():
+            for target in targets:
+                self.domains_by_target.setdefault(target, []).append(domain)
+
+    @property
+    def unique_targets(self) -> List[str]:
+        return list(self.domains_by_target)
+
+    def shared_with(self, domain: str) -> Dict[str, List[str]]:
+        """Para cada objetivo del dominio compartido con otros dominios del lote, esos otros dominios."""
+        return {target: [other for other in self.domains_by_target[target] if other != domain]
+                for target in self.domain_targets[domain] if len(self.domains_by_target[target]) > 1}
+
+    def nmap_results(self, domain: str, hosts_by_target: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Resultado de Nmap del dominio: los hosts de sus objetivos (copias: cada dominio se guarda por separado)."""
+        return [copy.deepcopy(hosts_by_target[target]) for target in self.domain_targets[domain] if target in hosts_by_target]
+
+    def summary(self) -> Dict[str, Any]:
+        requested = sum(len(targets) for targets in self.domain_targets.values())
+        return {
+            "domains": len(self.domain_targets),
+            "nmap_targets": len(self.domains_by_target),
+            "nmap_targets_without_dedup": requested,
+            "shared_targets": {target: domains for target, domains in self.domains_by_target.items() if len(domains) > 1},
+        }
+
+
+def plan_targets(resolved: Dict[str, Optional[Dict[str, List[str]]]],
+                 max_ips_per_domain: int = BATCH_MAX_IPS_PER_DOMAIN) -> TargetPlan:
+    """Plan de Nmap a partir de los registros DNS de cada dominio (None si no se pudieron resolver)."""
+    return TargetPlan({domain: ipv4_addresses(records, max_ips_per_domain) or [domain]
+                       for domain, records in resolved.items()})
+
+
+def normalize_domains(domains: List[str], limit: int = BATCH_MAX_DOMAINS) -> List[str]:
+    """Dominios del lote sin repetir (en minúsculas, en su orden). Lanza ValueError si el lote supera 'limit'."""
+    unique: List[str] = []
+    for domain in domains:
+        domain = domain.strip().lower()
+        if domain and domain not in unique:
+            unique.append(domain)
+    if len(unique) > limit:
+        raise ValueError(f"El lote tiene {len(unique)} dominios; el máximo es {limit}.")
+    return unique
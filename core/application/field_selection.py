@@ -0,0 +1,102 @@
+# security_api/core/application/field_selection.py
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Union
+
+SCAN_STAGES = ("dns", "nmap", "whois", "google_dorks")
+ANALYSIS_FIELDS = ("local_analysis", "deepseek_analysis")
+# "nmap.ports": solo puertos, sin detección de servicios (Nmap sin -A, mucho más rápido)
+ORCHESTRATION_FIELDS = SCAN_STAGES + ("nmap.ports",) + ANALYSIS_FIELDS
+
+# "service" añade a cada puerto los datos de la detección de servicios (Nmap -A); sin él no se ejecuta
+NMAP_HOST_FIELDS = ("ip", "status", "error", "ports", "service")
+NMAP_PORT_FIELDS = ("port", "protocol", "state")
+WHOIS_FIELDS = ("registrar", "creation_date", "expiration_date", "name_servers", "status", "emails",
+                "country", "whois_server", "updated_date", "domain_name", "error")
+GOOGLE_DORK_FIELDS = ("title", "link", "snippet")
+# Procedencia de un resultado de escáner (caché o escaneo nuevo): se devuelve siempre, se pida o no
+PROVENANCE_FIELDS = ("cached", "scanned_at")
+
+
+def parse_fields(raw: Union[None, str, Iterable[str]], allowed: Iterable[str]) -> Optional[FrozenSet[str]]:
+    """
+    Lee el parámetro 'fields'/'include' ("a,b" o ["a", "b"]). Retorna None si no se indicó (todos los
+    campos) o lanza ValueError con los campos desconocidos.
+    """
+    if raw is None or raw == "" or raw == []:
+        return None
+    items = raw.split(",") if isinstance(raw, str) else raw
+    if not all(isinstance(item, str) for item in items):
+        raise ValueError("'fields' debe ser una lista de nombres de campo.")
+    fields = frozenset(item.strip() for item in items if item.strip())
+    unknown = sorted(fields - set(allowed))
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(unknown)}. Disponibles: {', '.join(allowed)}.")
+    return fields or None
+
+
+def fields_from_request(data: Dict[str, Any], allowed: Iterable[str]) -> Optional[FrozenSet[str]]:
+    """'fields' o su alias 'include' del cuerpo de la petición."""
+    return parse_fields(data.get("fields", data.get("include")), allowed)
+
+
+class FieldSelection:
+    """
+    Qué pide el cliente de una orquestación y, a partir de ello, qué etapas hay que ejecutar.
+    Sin selección se ejecuta y devuelve todo. Si solo se piden análisis, se escanea todo para
+    analizarlo pero no se devuelven los resultados crudos.
+    """
+
+    def __init__(self, fields: Optional[FrozenSet[str]] = None):
+        self.fields = fields
+        requested_stages = {stage for stage in SCAN_STAGES if self._wants(stage)}
+        if fields is not None and "nmap.ports" in fields:
+            requested_stages.add("nmap")
+        self.returned_stages = frozenset(requested_stages) if fields is not None else frozenset(SCAN_STAGES)
+        self.deepseek = self._wants("deepseek_analysis")
+        self.local_analysis_returned = self._wants("local_analysis")
+        # El análisis local también decide si hace falta DeepSeek y encabeza su prompt
+        self.local_analysis = self.local_analysis_returned or self.deepseek
+        if requested_stages or fields is None:
+            self.stages = self.returned_stages
+        else:
+            self.stages = frozenset(SCAN_STAGES)
+        # La detección de servicios se omite si solo se pidieron puertos y nadie más necesita los servicios
+        self.nmap_services = not (fields is not None and "nmap.ports" in fields and "nmap" not in fields
+                                  and not self.local_analysis)
+
+    def _wants(self, field: str) -> bool:
+        return self.fields is None or field in self.fields
+
+    def runs(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def trim_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Quita de la respuesta lo que no se pidió (lo que no se ejecutó ya viene vacío)."""
+        if self.fields is None:
+            return response
+        response["scan_results"] = {stage: value for stage, value in response["scan_results"].items()
+                                    if stage in self.returned_stages}
+        if not self.local_analysis_returned:
+            response.pop("local_analysis", None)
+        if not self.deepseek:
+            response.pop("deepseek_analysis", None)
+            response.pop("deepseek_analysis_cached", None)
+        return response
+
+
+def select_fields(data: Dict[str, Any], fields: Optional[FrozenSet[str]]) -> Dict[str, Any]:
+    """Subconjunto de un diccionario (p. ej. WhoisInfo.to_dict()) con los campos pedidos."""
+    if fields is None:
+        return data
+    return {key: value for key, value in data.items() if key in fields or key in PROVENANCE_FIELDS}
+
+
+def select_nmap_fields(host: Dict[str, Any], fields: Optional[FrozenSet[str]]) -> Dict[str, Any]:
+    """Subconjunto de un host Nmap (model_dump); 'service' implica 'ports'."""
+    if fields is None:
+        return host
+    selected = {key: value for key, value in host.items()
+                if (key in fields and key not in ("ports", "service")) or key in PROVENANCE_FIELDS}
+    if "ports" in fields or "service" in fields:
+        keys = NMAP_PORT_FIELDS + (("service",) if "service" in fields else ())
+        selected["ports"] = [{key: port.get(key) for key in keys} for port in host.get("ports") or []]
+    return selected
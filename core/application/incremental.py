@@ -0,0 +1,168 @@
+# security_api/core/application/incremental.py
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.application.analysis_cache import _canonical_dns, _canonical_dorks, _canonical_whois
+
+# Vigencia por defecto (segundos) del último resultado de cada escáner en el modo incremental
+DEFAULT_SCANNER_TTLS = {
+    "dns": 3600,
+    "nmap": 6 * 3600,
+    "whois": 24 * 3600,
+    "google_dorks": 24 * 3600,
+}
+
+
+def scanner_ttls() -> Dict[str, int]:
+    """Vigencias configurables con SCAN_TTL_DNS, SCAN_TTL_NMAP, SCAN_TTL_WHOIS y SCAN_TTL_GOOGLE_DORKS."""
+    return {stage: int(os.getenv(f"SCAN_TTL_{stage.upper()}", str(ttl))) for stage, ttl in DEFAULT_SCANNER_TTLS.items()}
+
+
+def mark_service_detection(nmap_result: Optional[List[Dict]], service_detection: bool) -> None:
+    """Anota en cada host si Nmap se ejecutó con detección de servicios (-A), para saber luego si se puede reutilizar."""
+    for host in nmap_result or []:
+        if "ip" in host:
+            host["service_detection"] = service_detection
+
+
+def has_service_data(nmap_result: Optional[List[Dict]]) -> bool:
+    """Indica si el resultado incluye detección de servicios (los anteriores a la anotación, si algún puerto la tiene)."""
+    hosts = [host for host in nmap_result or [] if "ip" in host]
+    if any("service_detection" in host for host in hosts):
+        return all(host.get("service_detection") for host in hosts)
+    return any((port.get("service") or {}).get("name") for host in hosts for port in host.get("ports") or [])
+
+
+def is_reusable(stage: str, data: Any, dns_record_types: Optional[Iterable[str]] = None,
+                nmap_services: bool = False) -> bool:
+    """
+    Un resultado guardado se puede reutilizar si no es un error (en DNS, si tiene todos los tipos y,
+    en Nmap con 'nmap_services', si se obtuvo con detección de servicios).
+    """
+    if not data:
+        return False
+    if stage == "dns":
+        return not data.get("error") and set(dns_record_types or []) <= set(data.get("details") or {})
+    if stage == "nmap":
+        if nmap_services and not all(host.get("service_detection") for host in data):
+            return False
+        return all("ip" in host and not host.get("error") and not str(host.get("status") or "").startswith("error")
+                   for host in data)
+    if stage == "whois":
+        return not data.get("error")
+    if stage == "google_dorks":
+        return not data.get("error") and data.get("status") != "omitted"
+    return False
+
+
+def dork_plan_matches(plan: Dict[str, Any], data: Dict[str, Any]) -> bool:
+    """Indica si un resultado de Google Dorks guardado corresponde a la misma búsqueda planificada."""
+    if plan["packs"]:
+        return sorted(data.get("packs") or {}) == sorted(plan["packs"])
+    return data.get("query_executed") == plan["query"]
+
+
+# --- Diferencias con el escaneo anterior ---
+def _port_map(nmap_result: Optional[List[Dict]]) -> Dict[tuple, tuple]:
+    ports = {}
+    for host in nmap_result or []:
+        for port in host.get("ports") or []:
+            if port.get("state") == "open":
+                service = port.get("service") or {}
+                ports[(host.get("ip"), str(port.get("port")), port.get("protocol"))] = (
+                    service.get("name") or "", service.get("product") or "", service.get("version") or "")
+    return ports
+
+
+def _port_label(key: tuple) -> Dict[str, Any]:
+    ip, port, protocol = key
+    return {"ip": ip, "port": port, "protocol": protocol}
+
+
+def diff_nmap(before: Optional[List[Dict]], after: Optional[List[Dict]]) -> Dict[str, Any]:
+    old, new = _port_map(before), _port_map(after)
+    diff = {
+        "opened": [_port_label(key) for key in sorted(new.keys() - old.keys(), key=str)],
+        "closed": [_port_label(key) for key in sorted(old.keys() - new.keys(), key=str)],
+    }
+    # Los servicios solo se comparan si ambos escaneos los detectaron (uno de solo puertos no los tiene)
+    if has_service_data(before) and has_service_data(after):
+        diff["service_changed"] = [
+            {**_port_label(key), "before": " ".join(filter(None, old[key])), "after": " ".join(filter(None, new[key]))}
+            for key in sorted(old.keys() & new.keys(), key=str) if old[key] != new[key] and any(new[key])
+        ]
+    return {kind: changes for kind, changes in diff.items() if changes}
+
+
+def diff_dns(before: Optional[Dict], after: Optional[Dict]) -> Dict[str, Any]:
+    old, new = _canonical_dns(before), _canonical_dns(after)
+    diff = {}
+    for record_type in sorted(old.keys() | new.keys()):
+        added = sorted(set(new.get(record_type, [])) - set(old.get(record_type, [])))
+        removed = sorted(set(old.get(record_type, [])) - set(new.get(record_type, [])))
+        if added or removed:
+            diff[record_type] = {"added": added, "removed": removed}
+    return diff
+
+
+def diff_whois(before: Optional[Dict], after: Optional[Dict]) -> Dict[str, Any]:
+    old, new = _canonical_whois(before) or {}, _canonical_whois(after) or {}
+    return {field: {"before": old.get(field), "after": new.get(field)}
+            for field in sorted(old.keys() | new.keys()) if old.get(field) != new.get(field)}
+
+
+def diff_dorks(before: Optional[Dict], after: Optional[Dict]) -> Dict[str, Any]:
+    old, new = set(_canonical_dorks(before) or []), set(_canonical_dorks(after) or [])
+    diff = {"new_links": sorted(new - old), "removed_links": sorted(old - new)}
+    return {kind: links for kind, links in diff.items() if links}
+
+
+DIFFS = {"dns": diff_dns, "nmap": diff_nmap, "whois": diff_whois, "google_dorks": diff_dorks}
+
+
+class IncrementalBaseline:
+    """
+    Últimos resultados guardados de un dominio por escáner (ScanHistoryPort.latest_results) y cuáles
+    siguen vigentes según la vigencia de cada escáner. Los vigentes se reutilizan en lugar de escanear
+    y el resto se compara con lo nuevo para informar de los cambios.
+    """
+
+    def __init__(self, previous: Dict[str, Dict[str, Any]], ttls: Optional[Dict[str, int]] = None,
+                 now: Optional[datetime] = None, dns_record_types: Optional[Iterable[str]] = None,
+                 nmap_services: bool = True):
+        self.previous = previous
+        self.ttls = ttls if ttls is not None else scanner_ttls()
+        self.now = now or datetime.now(timezone.utc)
+        # Un Nmap de solo puertos no sirve si ahora se necesitan los servicios
+        self.fresh = {
+            stage: stored for stage, stored in previous.items()
+            if is_reusable(stage, stored["data"], dns_record_types, nmap_services)
+            and (self.now - stored["created_at"]).total_seconds() < self.ttls.get(stage, 0)
+        }
+
+    def reusable_results(self) -> Dict[str, Any]:
+        return {stage: stored["data"] for stage, stored in self.fresh.items()}
+
+    def summary(self, scan_results: Dict[str, Any], reused_stages: Iterable[str]) -> Dict[str, Any]:
+        """Sección 'incremental' de la respuesta: qué se reutilizó y qué cambió en lo que se volvió a escanear."""
+        reused = {
+            stage: {
+                "scan_id": self.fresh[stage]["scan_id"],
+                "age_seconds": int((self.now - self.fresh[stage]["created_at"]).total_seconds()),
+            }
+            for stage in reused_stages
+        }
+        diff, compared_with = {}, {}
+        for stage, stored in self.previous.items():
+            if stage in reused or scan_results.get(stage) is None or not is_reusable(stage, stored["data"]):
+                continue
+            if not is_reusable(stage, scan_results[stage]):
+                continue  # El escaneo nuevo falló o se omitió: no hay con qué comparar
+            compared_with[stage] = stored["scan_id"]
+            changes = DIFFS[stage](stored["data"], scan_results[stage])
+            if changes:
+                diff[stage] = changes
+        rescanned = [stage for stage, data in scan_results.items()
+                     if data is not None and stage not in reused and not (isinstance(data, dict) and data.get("status") == "omitted")]
+        return {"reused": reused, "rescanned": rescanned, "compared_with": compared_with, "diff": diff}
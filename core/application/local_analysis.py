@@ -0,0 +1,217 @@
+# security_api/core/application/local_analysis.py
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from core.application.prompt_builder import PromptSection
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_SCORES = {"critical": 10, "high": 7, "medium": 4, "low": 1, "info": 0}
+
+# Servicios que no deberían estar expuestos a Internet: (nombre, severidad, motivo)
+RISKY_PORTS = {
+    "21": ("FTP", "high", "transmite credenciales sin cifrar"),
+    "23": ("Telnet", "critical", "acceso remoto sin cifrar"),
+    "25": ("SMTP", "low", "comprobar que no sea un relay abierto"),
+    "111": ("RPCbind", "medium", "expone servicios RPC"),
+    "135": ("MS RPC", "high", "superficie de ataque de Windows"),
+    "139": ("NetBIOS", "high", "compartición de ficheros de Windows"),
+    "445": ("SMB", "critical", "objetivo habitual de ransomware y gusanos"),
+    "1433": ("MS SQL Server", "high", "base de datos expuesta"),
+    "1521": ("Oracle DB", "high", "base de datos expuesta"),
+    "2375": ("Docker API", "critical", "API de Docker sin TLS: control total del host"),
+    "3306": ("MySQL", "high", "base de datos expuesta"),
+    "3389": ("RDP", "high", "escritorio remoto expuesto a fuerza bruta"),
+    "5432": ("PostgreSQL", "high", "base de datos expuesta"),
+    "5900": ("VNC", "high", "escritorio remoto, a menudo sin autenticación fuerte"),
+    "6379": ("Redis", "critical", "sin autenticación por defecto"),
+    "9200": ("Elasticsearch", "critical", "sin autenticación por defecto"),
+    "11211": ("Memcached", "high", "sin autenticación; usable para amplificación"),
+    "27017": ("MongoDB", "critical", "sin autenticación en versiones antiguas"),
+}
+RISKY_SERVICE_NAMES = {"telnet": "23", "ftp": "21", "microsoft-ds": "445", "ms-wbt-server": "3389", "vnc": "5900",
+                       "redis": "6379", "mongodb": "27017", "mysql": "3306", "postgresql": "5432"}
+
+SENSITIVE_DORK_MARKERS = {
+    ".env": "critical", ".sql": "critical", ".bak": "high", "backup": "high", "password": "high",
+    ".log": "medium", "index of": "medium", "config": "medium", "phpinfo": "medium",
+    "admin": "low", "login": "low",
+}
+
+EXPIRATION_WARNING_DAYS = 30
+EXPIRATION_NOTICE_DAYS = 90
+
+
+class LocalFinding:
+    """Hallazgo de las reglas locales, con una severidad y la puntuación que le corresponde."""
+    def __init__(self, category: str, severity: str, title: str, detail: str = ""):
+        self.category = category
+        self.severity = severity
+        self.title = title
+        self.detail = detail
+        self.score = SEVERITY_SCORES[severity]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"category": self.category, "severity": self.severity, "score": self.score,
+                "title": self.title, "detail": self.detail}
+
+
+class LocalAnalysis:
+    """
+    Resultado del análisis local: hallazgos ordenados por puntuación, una puntuación de riesgo
+    (0-100) y si el resultado es trivial (no merece una consulta a DeepSeek) y por qué.
+    """
+    def __init__(self, url_dominio: str, findings: List[LocalFinding], trivial_reason: Optional[str] = None):
+        self.url_dominio = url_dominio
+        self.findings = sorted(findings, key=lambda f: -f.score)
+        self.risk_score = min(100, sum(f.score for f in self.findings))
+        self.trivial_reason = trivial_reason
+
+    @property
+    def trivial(self) -> bool:
+        return self.trivial_reason is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "risk_score": self.risk_score,
+            "findings": [f.to_dict() for f in self.findings],
+            "trivial": self.trivial,
+            "trivial_reason": self.trivial_reason,
+        }
+
+    def render_text(self) -> str:
+        """Informe breve en texto; se usa como análisis cuando se omite DeepSeek."""
+        lines = [f"Análisis local para {self.url_dominio} (puntuación de riesgo {self.risk_score}/100)."]
+        if self.trivial_reason:
+            lines.append(f"No se consultó DeepSeek: {self.trivial_reason}.")
+        if self.findings:
+            lines.append("Hallazgos:")
+            lines.extend(f"- [{f.severity}] {f.title}" + (f": {f.detail}" if f.detail else "") for f in self.findings)
+        else:
+            lines.append("No se detectaron hallazgos relevantes.")
+        return "\n".join(lines)
+
+    def to_prompt_section(self) -> Optional[PromptSection]:
+        """Sección de pre-análisis para el prompt: el modelo parte de los hallazgos ya puntuados."""
+        if not self.findings:
+            return None
+        lines = [f"- [{f.severity}] {f.title}" + (f": {f.detail}" if f.detail else "") for f in self.findings]
+        return PromptSection(f"Pre-análisis local (riesgo {self.risk_score}/100)", priority=-1, lines=lines)
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class LocalAnalyzer:
+    """Reglas rápidas (milisegundos) sobre los resultados estructurados de un escaneo."""
+
+    def __init__(self, skip_trivial: Optional[bool] = None):
+        if skip_trivial is None:
+            skip_trivial = os.getenv('LOCAL_ANALYSIS_SKIP_TRIVIAL', 'true').lower() in ("1", "true", "yes")
+        self.skip_trivial = skip_trivial
+
+    # --- Reglas ---
+    @staticmethod
+    def _nmap_findings(nmap_result: Optional[List[Dict]]) -> List[LocalFinding]:
+        findings = []
+        for host in nmap_result or []:
+            open_ports = [p for p in host.get("ports") or [] if p.get("state") == "open"]
+            open_numbers = {str(p.get("port")) for p in open_ports}
+            for port in open_ports:
+                number = str(port.get("port"))
+                service_name = ((port.get("service") or {}).get("name") or "").lower()
+                known = RISKY_PORTS.get(number) or RISKY_PORTS.get(RISKY_SERVICE_NAMES.get(service_name, ""))
+                if known:
+                    label, severity, reason = known
+                    findings.append(LocalFinding("nmap", severity, f"{label} expuesto en {host.get('ip')}:{number}/{port.get('protocol')}", reason))
+            if "80" in open_numbers and "443" not in open_numbers:
+                findings.append(LocalFinding("nmap", "medium", f"HTTP sin HTTPS en {host.get('ip')}", "el puerto 80 está abierto y el 443 no"))
+        return findings
+
+    @staticmethod
+    def _whois_findings(whois_result: Optional[Dict], now: datetime) -> List[LocalFinding]:
+        if not whois_result or whois_result.get("error"):
+            return []
+        expiration = _parse_date(whois_result.get("expiration_date"))
+        if expiration is None:
+            return []
+        days = (expiration - now).days
+        if days < 0:
+            return [LocalFinding("whois", "critical", "Dominio caducado", f"expiró el {expiration.date()}")]
+        if days <= EXPIRATION_WARNING_DAYS:
+            return [LocalFinding("whois", "high", "Dominio a punto de caducar", f"expira en {days} días ({expiration.date()})")]
+        if days <= EXPIRATION_NOTICE_DAYS:
+            return [LocalFinding("whois", "low", "Renovación del dominio próxima", f"expira en {days} días ({expiration.date()})")]
+        return []
+
+    @staticmethod
+    def _dns_findings(dns_result: Optional[Dict]) -> List[LocalFinding]:
+        details = (dns_result or {}).get("details") or {}
+        if not any(details.values()):
+            return []
+        findings = []
+        txt_records = [str(r).strip('"').lower() for r in details.get("TXT") or []]
+        if not any(r.startswith("v=spf1") for r in txt_records):
+            findings.append(LocalFinding("dns", "medium", "Sin registro SPF", "cualquiera puede enviar correo suplantando el dominio"))
+        elif any(r.startswith("v=spf1") and "+all" in r for r in txt_records):
+            findings.append(LocalFinding("dns", "high", "SPF con '+all'", "autoriza a cualquier servidor a enviar correo del dominio"))
+        if "DMARC" in details:
+            dmarc = [str(r).strip('"').lower() for r in details.get("DMARC") or []]
+            if not any(r.startswith("v=dmarc1") for r in dmarc):
+                findings.append(LocalFinding("dns", "medium", "Sin registro DMARC", "no hay política ante correos que fallen SPF/DKIM"))
+            elif any("p=none" in r.replace(" ", "") for r in dmarc):
+                findings.append(LocalFinding("dns", "low", "DMARC en modo 'p=none'", "solo monitoriza, no bloquea suplantaciones"))
+        return findings
+
+    @staticmethod
+    def _dork_findings(dorks_result: Optional[Dict]) -> List[LocalFinding]:
+        findings = []
+        for item in (dorks_result or {}).get("results") or []:
+            haystack = f"{item.get('link', '')} {item.get('title', '')}".lower()
+            severities = [severity for marker, severity in SENSITIVE_DORK_MARKERS.items() if marker in haystack]
+            if severities:
+                severity = max(severities, key=SEVERITY_SCORES.get)
+                findings.append(LocalFinding("google_dorks", severity, "Resultado sensible indexado", item.get("link", "")))
+        return findings
+
+    @staticmethod
+    def _trivial_reason(scan_results: Dict[str, Any], findings: List[LocalFinding]) -> Optional[str]:
+        dns_details = (scan_results.get("dns") or {}).get("details") or {}
+        hosts = scan_results.get("nmap") or []
+        dork_items = (scan_results.get("google_dorks") or {}).get("results") or []
+        has_open_ports = any(p.get("state") == "open" for host in hosts for p in host.get("ports") or [])
+        if has_open_ports or dork_items or any(f.score >= SEVERITY_SCORES["high"] for f in findings):
+            return None
+        if (scan_results.get("dns") or {}).get("error"):
+            return None  # La resolución falló (timeout, error): no es lo mismo que no tener registros
+        statuses = [host.get("status") or "" for host in hosts]
+        nmap_failed = not statuses or any(not st or st.startswith("error") for st in statuses)
+        if scan_results.get("nmap") is not None and nmap_failed:
+            return None  # Nmap falló: no se sabe si hay servicios expuestos
+        if scan_results.get("dns") is not None and not any(dns_details.values()):
+            return "el dominio no tiene registros DNS (NXDOMAIN o sin resolución) y no hay puertos abiertos"
+        if nmap_failed:
+            return None  # Sin Nmap en la selección: no se sabe si hay servicios expuestos
+        if all(st == "down" for st in statuses):
+            return "el host no responde o está caído"
+        return "no se encontraron puertos abiertos ni resultados indexados"
+
+    def analyze(self, url_dominio: str, scan_results: Dict[str, Any], now: Optional[datetime] = None) -> LocalAnalysis:
+        now = now or datetime.now(timezone.utc)
+        findings = (
+            self._nmap_findings(scan_results.get("nmap"))
+            + self._whois_findings(scan_results.get("whois"), now)
+            + self._dns_findings(scan_results.get("dns"))
+            + self._dork_findings(scan_results.get("google_dorks"))
+        )
+        trivial_reason = self._trivial_reason(scan_results, findings) if self.skip_trivial else None
+        return LocalAnalysis(url_dominio, findings, trivial_reason)
@@ -1,130 +1,66 @@
 # core/application/orchestration_service.py
 import os
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, FrozenSet, Iterator, List, Optional, Tuple
 
-from core.infrastructure.scanner.dns_scan import DNSScanner
+from asgiref.sync import sync_to_async
+
+from core.infrastructure.adapter.scanner_adapter import DnsScannerAdapter, NmapScannerAdapter, WhoisScannerAdapter
 from core.infrastructure.scanner.google_dorks import GoogleDorkScanner, load_env_variables as load_google_env_vars
-from core.infrastructure.scanner.nmap_scan import NmapScanner
-from core.infrastructure.scanner.whois_scan import WhoisScanner
-from chat.services.deep_seek_service import consultar_deepseek
-from core.domain.entities import GoogleDorkResult, NmapHost, WhoisInfo
+from chat.services.deep_seek_service import DeepSeekError, consultar_deepseek_stream, get_deepseek_breaker, solicitar_analisis_deepseek, solicitar_analisis_deepseek_async
+from chat.services.deepseek_batch import analizar_lote
+from core.application.analysis_cache import findings_key, get_analysis_cache
+from core.application.batch_planner import TargetPlan, plan_targets
+from core.application.field_selection import SCAN_STAGES, FieldSelection
+from core.application.incremental import IncrementalBaseline, dork_plan_matches, mark_service_detection
+from core.application.local_analysis import LocalAnalysis, LocalAnalyzer
+from core.application.prompt_builder import PromptBuilder
+from core.domain.entities import DnsRecords, GoogleDorkResult, NmapHost, WhoisInfo
+from core.domain.ports import ScanHistoryPort
 
 logger = logging.getLogger(__name__)
 
-# --- Funciones de Formateo (sin cambios respecto a la última versión que te di) ---
-def format_dns_results_structured(dns_data: Dict[str, List[str]]) -> Dict:
-    if not dns_data:
-        return {"error": "No se obtuvieron resultados DNS.", "details": {}}
-    return {"details": dns_data}
+# Dominios (y objetivos de Nmap) de un lote que se procesan a la vez
+BATCH_SCAN_CONCURRENCY = int(os.getenv('BATCH_SCAN_CONCURRENCY', '4'))
+
+# DMARC es un pseudo-tipo del escáner DNS (TXT en _dmarc.<dominio>), necesario para el análisis local
+DNS_SCAN_RECORD_TYPES = ["A", "AAAA", "CNAME", "MX", "NS", "SOA", "TXT", "DMARC"]
 
-def format_dns_results_string(dns_data: Dict[str, List[str]]) -> str:
+# --- Funciones de Formateo: entidades -> resultados estructurados (los informes de texto están en report_rendering) ---
+def format_dns_results_structured(dns_data: Dict[str, List[str]]) -> Dict:
     if not dns_data:
-        return "No se obtuvieron resultados DNS.\n"
-    formatted_output = "--- Resultados del Escaneo DNS ---\n"
-    for record_type, records in dns_data.items():
-        if records:
-            formatted_output += f"{record_type}:\n"
-            for record in records:
-                formatted_output += f"  - {record}\n"
-        else:
-            formatted_output += f"{record_type}: (No se encontraron registros)\n"
-    formatted_output += "\n"
-    return formatted_output
+        structured = {"error": "No se obtuvieron resultados DNS.", "details": {}}
+    else:
+        structured = {"details": dict(dns_data)}
+    # DnsRecords del adaptador: si la respuesta viene de la caché de escáneres y cuándo se resolvió
+    if isinstance(dns_data, DnsRecords):
+        structured["cached"] = dns_data.cached
+        structured["scanned_at"] = dns_data.scanned_at
+    return structured
 
 def format_nmap_results_structured(nmap_hosts: List[NmapHost]) -> List[Dict]:
     return [host.model_dump() if hasattr(host, 'model_dump') else host.dict() for host in nmap_hosts]
 
-def format_nmap_results_string(nmap_hosts: List[NmapHost], target_for_nmap: str) -> str:
-    if not nmap_hosts:
-        return f"No se obtuvieron resultados Nmap para {target_for_nmap} o el host está caído/filtrado.\n"
-    formatted_output = "--- Resultados del Escaneo Nmap ---\n"
-    for host in nmap_hosts:
-        formatted_output += f"Objetivo: {host.ip}\n"
-        status_display = host.status if host.status is not None else "desconocido"
-        formatted_output += f"Estado: {status_display}\n"
-        if host.error:
-            formatted_output += f"Error Nmap: {host.error}\n"
-        if host.ports:
-            formatted_output += "Puertos:\n"
-            for port_info in host.ports:
-                service_details = ""
-                if port_info.service:
-                    service_parts = [
-                        port_info.service.get('name', ''),
-                        port_info.service.get('product', ''),
-                        port_info.service.get('version', ''),
-                        port_info.service.get('extrainfo', '')
-                    ]
-                    service_details = " ".join(filter(None, service_parts))
-                formatted_output += f"  - Puerto: {port_info.port}/{port_info.protocol}\n"
-                formatted_output += f"    Estado: {port_info.state}\n"
-                if service_details:
-                    formatted_output += f"    Servicio: {service_details}\n"
-        else:
-            formatted_output += "Puertos: (No se encontraron puertos abiertos o información de puertos no disponible)\n"
-        formatted_output += "\n"
-    return formatted_output
-
 def format_whois_results_structured(whois_data: Optional[WhoisInfo]) -> Optional[Dict]:
     return whois_data.to_dict() if whois_data and hasattr(whois_data, 'to_dict') else None
 
-def format_whois_results_string(whois_data: Optional[WhoisInfo], domain_target: str) -> str:
-    if not whois_data or whois_data.error:
-        error_msg = whois_data.error if whois_data and whois_data.error else "No se pudo obtener información."
-        return f"--- Resultados del Escaneo Whois para {domain_target} ---\nError: {error_msg}\n\n"
-    
-    formatted_output = f"--- Resultados del Escaneo Whois para {domain_target} ---\n"
-    # ... (resto de los campos de formateo de Whois como en la versión anterior) ...
-    if whois_data.domain_name:
-        formatted_output += f"Nombre de Dominio: {', '.join(whois_data.domain_name)}\n"
-    if whois_data.registrar:
-        formatted_output += f"Registrador: {whois_data.registrar}\n"
-    if whois_data.creation_date:
-        formatted_output += f"Fecha de Creación: {whois_data.creation_date}\n"
-    if whois_data.expiration_date:
-        formatted_output += f"Fecha de Expiración: {whois_data.expiration_date}\n"
-    if whois_data.updated_date:
-        formatted_output += f"Última Actualización: {whois_data.updated_date}\n"
-    if whois_data.name_servers:
-        formatted_output += f"Servidores de Nombre: {', '.join(whois_data.name_servers)}\n"
-    if whois_data.status:
-        formatted_output += f"Estado: {', '.join(whois_data.status)}\n"
-    if whois_data.emails:
-        formatted_output += f"Emails: {', '.join(whois_data.emails)}\n"
-    if whois_data.country:
-        formatted_output += f"País: {whois_data.country}\n"
-    formatted_output += "\n"
-    return formatted_output
-
-
 def format_google_dorks_results_structured(dork_results: Optional[List[GoogleDorkResult]]) -> Optional[List[Dict]]:
     return [result.to_dict() for result in dork_results] if dork_results else None
 
-def format_google_dorks_results_string(dork_results: Optional[List[GoogleDorkResult]], query_used: str) -> str:
-    if dork_results is None:
-        return f"--- Resultados de Google Dorks (Query: {query_used}) ---\nError al realizar la búsqueda.\n\n"
-    if not dork_results:
-         return f"--- Resultados de Google Dorks (Query: {query_used}) ---\nNo se encontraron ítems para esta consulta.\n\n"
-    # ... (resto del código de formateo de Google Dorks como en la versión anterior) ...
-    formatted_output = f"--- Resultados de Google Dorks (Query: {query_used}) ---\n"
-    for item in dork_results:
-        formatted_output += f"Título: {item.title}\n"
-        formatted_output += f"Enlace: {item.link}\n"
-        formatted_output += f"Fragmento: {item.snippet}\n---\n"
-    formatted_output += "\n"
-    return formatted_output
-
-
 class OrchestrationService:
-    def __init__(self):
+    def __init__(self, scan_history: Optional[ScanHistoryPort] = None):
+        # Historial de escaneos: necesario para el modo incremental (reutilizar resultados vigentes)
+        self.scan_history = scan_history
         google_env = load_google_env_vars()
         self.google_api_key = google_env.get('api_key')
         self.Google_Search_engine_id = google_env.get('search_engine_id')
 
-        self.dns_scanner = DNSScanner()
-        self.nmap_scanner = NmapScanner()
-        self.whois_scanner = WhoisScanner()
+        # A través de los adaptadores: comparten la caché de escáneres entre los procesos del nodo
+        self.dns_scanner = DnsScannerAdapter()
+        self.nmap_scanner = NmapScannerAdapter()
+        self.whois_scanner = WhoisScannerAdapter()
 
         if self.google_api_key and self.Google_Search_engine_id:
             self.google_dork_scanner = GoogleDorkScanner(
@@ -138,121 +74,613 @@ class OrchestrationService:
         self.deepseek_api_key = os.getenv('DEEPSEEK_API_KEY')
         if not self.deepseek_api_key:
             logger.warning("DEEPSEEK_API_KEY no encontrada en las variables de entorno.")
+        self.prompt_builder = PromptBuilder()
+        self.local_analyzer = LocalAnalyzer()
 
     # CAMBIO: 'target' renombrado a 'url_dominio'
-    def run_scan(self, url_dominio: str, scenario: str, custom_gquery: Optional[str] = None) -> Dict[str, Any]:
-        logger.info(f"Servicio de orquestación: Iniciando escaneo para {url_dominio}, escenario: {scenario.lower()}")
-        
-        current_scenario = scenario.lower() # Normalizar a minúsculas
+    def run_scan(self, url_dominio: str, scenario: str, custom_gquery: Optional[str] = None,
+                 dork_packs: Optional[List[str]] = None, dork_max_results: int = 10,
+                 fields: Optional[FrozenSet[str]] = None, incremental: bool = False, trim: bool = True) -> Dict[str, Any]:
+        # 'fields' (FieldSelection) decide qué escáneres se ejecutan y qué se devuelve; None = todo.
+        # Con 'incremental' se reutilizan los resultados guardados que siguen vigentes.
+        # Con trim=False se retorna la respuesta completa (para el historial); el llamador recorta lo que devuelve.
+        selection = FieldSelection(fields)
+        baseline = self.load_baseline(url_dominio, selection) if incremental else None
+        scan = self.collect_scan_results(url_dominio, scenario, custom_gquery, dork_packs, dork_max_results, selection, baseline)
+        return self._trimmed(selection, self._finish_scan(url_dominio, scan, selection), trim)
 
-        results_structured = {"dns": None, "nmap": None, "whois": None, "google_dorks": None}
-        results_string_formatted = {"dns": "", "nmap": "", "whois": "", "google_dorks": ""}
-        execution_errors = [] 
+    @staticmethod
+    def _trimmed(selection: FieldSelection, response: Dict[str, Any], trim: bool) -> Dict[str, Any]:
+        return selection.trim_response(response) if trim else response
 
-        # 1. DNS Scan (se ejecuta en ambos escenarios)
-        try:
-            logger.info(f"Ejecutando escaneo DNS para {url_dominio}...")
-            raw_dns = self.dns_scanner.resolve_records_raw(url_dominio)
-            results_structured["dns"] = format_dns_results_structured(raw_dns)
-            results_string_formatted["dns"] = format_dns_results_string(raw_dns)
-        except Exception as e:
-            logger.error(f"Error en DNS Scan para {url_dominio}: {e}", exc_info=True)
-            execution_errors.append(f"DNS Scan: {str(e)}")
-            results_string_formatted["dns"] = f"--- Resultados del Escaneo DNS ---\nError: {e}\n\n"
-            results_structured["dns"] = {"error": str(e), "details": {}}
+    def _plan_analysis(self, url_dominio: str, scan: Dict[str, Any],
+                       selection: FieldSelection) -> Tuple[Optional[Dict[str, Any]], Optional[LocalAnalysis], Optional[str]]:
+        """
+        Análisis local de un escaneo ya recopilado. Retorna (respuesta, análisis local, clave de caché): la
+        respuesta completa si no hace falta consultar DeepSeek, o None y la clave con la que guardar su análisis.
+        """
+        if not selection.local_analysis:
+            return self._build_response(scan, None), None, None
 
-        # 2. Nmap Scan (se ejecuta en ambos escenarios según tu nueva lógica)
-        try:
-            logger.info(f"Ejecutando escaneo Nmap para {url_dominio}...")
-            raw_nmap = self.nmap_scanner.scan_targets_raw([url_dominio]) # Nmap toma una lista
-            results_structured["nmap"] = format_nmap_results_structured(raw_nmap)
-            results_string_formatted["nmap"] = format_nmap_results_string(raw_nmap, url_dominio)
-        except FileNotFoundError:
-            logger.error("Error Nmap: Nmap no está instalado o no se encuentra en el PATH.")
-            execution_errors.append("Nmap: Nmap no está instalado o no se encuentra en el PATH.")
-            results_string_formatted["nmap"] = "--- Resultados del Escaneo Nmap ---\nError: Nmap no está instalado.\n\n"
-            results_structured["nmap"] = [{"error": "Nmap no instalado"}] # Nmap devuelve una lista de hosts
-        except Exception as e:
-            logger.error(f"Error en Nmap Scan para {url_dominio}: {e}", exc_info=True)
-            execution_errors.append(f"Nmap Scan: {str(e)}")
-            results_string_formatted["nmap"] = f"--- Resultados del Escaneo Nmap ---\nError: {e}\n\n"
-            results_structured["nmap"] = [{"error": str(e)}]
-            
-        # 3. Whois Scan (se ejecuta en ambos escenarios)
-        try:
-            logger.info(f"Ejecutando escaneo Whois para {url_dominio}...")
-            raw_whois = self.whois_scanner.get_whois_info_raw(url_dominio)
-            results_structured["whois"] = format_whois_results_structured(raw_whois)
-            results_string_formatted["whois"] = format_whois_results_string(raw_whois, url_dominio)
-        except Exception as e:
-            logger.error(f"Error en Whois Scan para {url_dominio}: {e}", exc_info=True)
-            execution_errors.append(f"Whois Scan: {str(e)}")
-            results_string_formatted["whois"] = f"--- Resultados del Escaneo Whois para {url_dominio} ---\nError: {e}\n\n"
-            results_structured["whois"] = {"error": str(e)}
+        # Análisis local: si el resultado es trivial (o no se pidió DeepSeek) no se consulta DeepSeek
+        local_analysis = self.run_local_analysis(scan)
+        if local_analysis.trivial or not selection.deepseek:
+            return self._build_response(scan, local_analysis.render_text(), local_analysis=local_analysis), local_analysis, None
 
-        # 4. Google Dorks Scan (solo para escenario "complete" o "full")
-        if current_scenario in ["complete", "full"]:
-            if self.google_dork_scanner:
-                logger.info(f"Ejecutando escaneo Google Dorks para {url_dominio}...")
-                google_query_executed = custom_gquery if custom_gquery else f'site:{url_dominio} filetype:log OR "Index of /" OR "admin" OR "login"'
-                try:
-                    raw_google = self.google_dork_scanner.search(query=google_query_executed)
-                    results_structured["google_dorks"] = {
-                        "query_executed": google_query_executed,
-                        "results": format_google_dorks_results_structured(raw_google)
-                    }
-                    results_string_formatted["google_dorks"] = format_google_dorks_results_string(raw_google, google_query_executed)
-                except Exception as e:
-                    logger.error(f"Error en Google Dorks Scan para {url_dominio} con query '{google_query_executed}': {e}", exc_info=True)
-                    execution_errors.append(f"Google Dorks Scan: {str(e)}")
-                    results_string_formatted["google_dorks"] = f"--- Resultados de Google Dorks (Query: {google_query_executed}) ---\nError: {e}\n\n"
-                    results_structured["google_dorks"] = {"query_executed": google_query_executed, "error": str(e)}
-            else:
-                msg = "Google Dorks omitido: configuración de API no disponible."
-                logger.warning(msg)
-                execution_errors.append(msg)
-                results_string_formatted["google_dorks"] = f"--- Resultados de Google Dorks ---\n{msg}\n\n"
-                results_structured["google_dorks"] = {"query_executed": "", "error": msg, "results": []}
-        else: # Escenario "basic" omite Google Dorks
-            logger.info(f"Google Dorks omitido para escenario '{current_scenario}'.")
-            results_string_formatted["google_dorks"] = f"Google Dorks omitido para escenario '{current_scenario}'.\n"
-            results_structured["google_dorks"] = {"status": "omitted", "reason": f"Scenario: {current_scenario}", "results": []}
-        
-        # 5. Compilar prompt para DeepSeek
-        deepseek_prompt_parts = [f"Análisis de Seguridad para el objetivo: {url_dominio}\n"]
-        if results_string_formatted["dns"]: deepseek_prompt_parts.append(results_string_formatted["dns"])
-        if results_string_formatted["nmap"]: deepseek_prompt_parts.append(results_string_formatted["nmap"])
-        if results_string_formatted["whois"]: deepseek_prompt_parts.append(results_string_formatted["whois"])
-        if current_scenario in ["complete", "full"] and results_string_formatted["google_dorks"]: # Solo incluye si se ejecutó
-            deepseek_prompt_parts.append(results_string_formatted["google_dorks"])
-        
-        deepseek_prompt_parts.append(
-            "Por favor, analiza la información de seguridad recopilada para el objetivo. "
-            "Proporciona un resumen de los hallazgos clave, identifica posibles vulnerabilidades "
-            "o áreas de preocupación relevantes para la seguridad, y sugiere recomendaciones "
-            "generales de seguridad basadas estrictamente en los datos provistos. "
-            "Responde en español."
-        )
-        deepseek_prompt = "\n".join(filter(None, deepseek_prompt_parts))
+        # Si los hallazgos no han cambiado desde un análisis anterior, se reutiliza sin llamar a DeepSeek
+        cache_key = findings_key(url_dominio, scan["scenario"], scan["results_structured"])
+        cached_analysis = get_analysis_cache().get(cache_key)
+        if cached_analysis is not None:
+            logger.info(f"Análisis de DeepSeek reutilizado desde caché para {url_dominio}.")
+            return (self._build_response(scan, cached_analysis, analysis_cached=True, local_analysis=local_analysis),
+                    local_analysis, cache_key)
+        return None, local_analysis, cache_key
 
-        # 6. Consultar DeepSeek
-        deepseek_analysis = "Análisis de DeepSeek no ejecutado o fallido."
+    def _deepseek_skipped(self) -> str:
+        # Texto del análisis cuando _deepseek_available decidió no consultar DeepSeek
         if self.deepseek_api_key:
+            return "Análisis de DeepSeek omitido: el servicio no está disponible temporalmente."
+        return "Análisis de DeepSeek no ejecutado o fallido."
+
+    def _finish_scan(self, url_dominio: str, scan: Dict[str, Any], selection: FieldSelection) -> Dict[str, Any]:
+        """Análisis local y de DeepSeek de un escaneo ya recopilado; retorna la respuesta completa (sin recortar)."""
+        response, local_analysis, cache_key = self._plan_analysis(url_dominio, scan, selection)
+        if response is not None:
+            return response
+
+        # 6. Consultar DeepSeek
+        deepseek_analysis = self._deepseek_skipped()
+        if self._deepseek_available(url_dominio, scan["execution_errors"]):
             try:
                 logger.info(f"Enviando datos a DeepSeek para análisis del objetivo {url_dominio}...")
-                deepseek_analysis = consultar_deepseek(deepseek_prompt)
+                deepseek_analysis = solicitar_analisis_deepseek(self.build_deepseek_prompt(scan, local_analysis))
+                get_analysis_cache().set(cache_key, deepseek_analysis)
+            except DeepSeekError as e:
+                logger.error(f"Error al consultar DeepSeek para {url_dominio}: {e}")
+                scan["execution_errors"].append(f"DeepSeek API: {str(e)}")
+                deepseek_analysis = str(e)
             except Exception as e:
                 logger.error(f"Error al consultar DeepSeek para {url_dominio}: {e}", exc_info=True)
-                execution_errors.append(f"DeepSeek API: {str(e)}")
+                scan["execution_errors"].append(f"DeepSeek API: {str(e)}")
                 deepseek_analysis = f"Error al contactar o procesar la respuesta de DeepSeek: {str(e)}"
-        else:
+
+        return self._build_response(scan, deepseek_analysis, local_analysis=local_analysis)
+
+    async def run_scan_async(self, url_dominio: str, scenario: str, custom_gquery: Optional[str] = None,
+                             dork_packs: Optional[List[str]] = None, dork_max_results: int = 10,
+                             fields: Optional[FrozenSet[str]] = None, incremental: bool = False,
+                             trim: bool = True) -> Dict[str, Any]:
+        """Versión asíncrona de run_scan: escáneres concurrentes y consulta a DeepSeek sin bloquear el bucle."""
+        selection = FieldSelection(fields)
+        baseline = await sync_to_async(self.load_baseline)(url_dominio, selection) if incremental else None
+        scan = await self.collect_scan_results_async(url_dominio, scenario, custom_gquery, dork_packs, dork_max_results,
+                                                     selection, baseline)
+        return self._trimmed(selection, await self._finish_scan_async(url_dominio, scan, selection), trim)
+
+    async def _finish_scan_async(self, url_dominio: str, scan: Dict[str, Any], selection: FieldSelection) -> Dict[str, Any]:
+        response, local_analysis, cache_key = self._plan_analysis(url_dominio, scan, selection)
+        if response is not None:
+            return response
+
+        deepseek_analysis = self._deepseek_skipped()
+        if self._deepseek_available(url_dominio, scan["execution_errors"]):
+            try:
+                logger.info(f"Enviando datos a DeepSeek para análisis del objetivo {url_dominio}...")
+                deepseek_analysis = await solicitar_analisis_deepseek_async(self.build_deepseek_prompt(scan, local_analysis))
+                get_analysis_cache().set(cache_key, deepseek_analysis)
+            except DeepSeekError as e:
+                logger.error(f"Error al consultar DeepSeek para {url_dominio}: {e}")
+                scan["execution_errors"].append(f"DeepSeek API: {str(e)}")
+                deepseek_analysis = str(e)
+            except Exception as e:
+                logger.error(f"Error al consultar DeepSeek para {url_dominio}: {e}", exc_info=True)
+                scan["execution_errors"].append(f"DeepSeek API: {str(e)}")
+                deepseek_analysis = f"Error al contactar o procesar la respuesta de DeepSeek: {str(e)}"
+
+        return self._build_response(scan, deepseek_analysis, local_analysis=local_analysis)
+
+    def run_scan_stream(self, url_dominio: str, scenario: str, custom_gquery: Optional[str] = None,
+                        dork_packs: Optional[List[str]] = None, dork_max_results: int = 10,
+                        fields: Optional[FrozenSet[str]] = None, incremental: bool = False,
+                        trim: bool = True) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Variante de run_scan que emite eventos (nombre, datos) a medida que avanza:
+        'status' al empezar, 'scan_results' al terminar los escáneres, 'token' por cada fragmento
+        del análisis de DeepSeek y 'done' con la respuesta completa (mismo formato que run_scan; con
+        trim=False, sin recortar).
+        """
+        yield "status", {"url_dominio": url_dominio, "scenario": scenario.lower(), "stage": "scanning"}
+        selection = FieldSelection(fields)
+        baseline = self.load_baseline(url_dominio, selection) if incremental else None
+        scan = self.collect_scan_results(url_dominio, scenario, custom_gquery, dork_packs, dork_max_results, selection, baseline)
+        local_analysis = self.run_local_analysis(scan) if selection.local_analysis else None
+        yield "scan_results", selection.trim_response({
+            "url_dominio": url_dominio,
+            "scenario": scan["scenario"],
+            "scan_results": scan["results_structured"],
+            "local_analysis": local_analysis.to_dict() if local_analysis else None,
+            "execution_errors": list(scan["execution_errors"]),
+            **({"incremental": scan["incremental"]} if "incremental" in scan else {}),
+        })
+        if local_analysis is None or local_analysis.trivial or not selection.deepseek:
+            local_text = local_analysis.render_text() if local_analysis else None
+            if selection.deepseek:
+                yield "token", {"text": local_text}
+            yield "done", self._trimmed(selection, self._build_response(scan, local_text, local_analysis=local_analysis), trim)
+            return
+
+        analysis_cache = get_analysis_cache()
+        cache_key = findings_key(url_dominio, scan["scenario"], scan["results_structured"])
+        cached_analysis = analysis_cache.get(cache_key)
+        if cached_analysis is not None:
+            yield "token", {"text": cached_analysis}
+            yield "done", self._trimmed(selection, self._build_response(scan, cached_analysis, analysis_cached=True, local_analysis=local_analysis), trim)
+            return
+
+        deepseek_analysis = "Análisis de DeepSeek no ejecutado o fallido."
+        if self._deepseek_available(url_dominio, scan["execution_errors"]):
+            yield "status", {"stage": "analyzing"}
+            chunks: List[str] = []
+            try:
+                for chunk in consultar_deepseek_stream(self.build_deepseek_prompt(scan, local_analysis)):
+                    chunks.append(chunk)
+                    yield "token", {"text": chunk}
+                deepseek_analysis = "".join(chunks).strip()
+                analysis_cache.set(cache_key, deepseek_analysis)
+            except DeepSeekError as e:
+                logger.error(f"Error en el streaming de DeepSeek para {url_dominio}: {e}")
+                scan["execution_errors"].append(f"DeepSeek API: {str(e)}")
+                deepseek_analysis = "".join(chunks).strip() or str(e)
+                yield "error", {"message": str(e)}
+        elif self.deepseek_api_key:
+            deepseek_analysis = "Análisis de DeepSeek omitido: el servicio no está disponible temporalmente."
+
+        yield "done", self._trimmed(selection, self._build_response(scan, deepseek_analysis, local_analysis=local_analysis), trim)
+
+    # --- Lotes: un plan de Nmap común (cada IP una vez) y el resto de etapas por dominio ---
+    def run_batch(self, domains: List[str], scenario: str, custom_gquery: Optional[str] = None,
+                  dork_packs: Optional[List[str]] = None, dork_max_results: int = 10,
+                  fields: Optional[FrozenSet[str]] = None, incremental: bool = False,
+                  trim: bool = True) -> Dict[str, Any]:
+        """
+        Escanea varios dominios. Primero resuelve todos, agrupa los dominios por IP y escanea con Nmap
+        cada IP una sola vez; los puertos de cada IP se asignan a todos los dominios que la comparten.
+        Whois, Google Dorks y el análisis se hacen por dominio; cada resultado tiene el formato de run_scan.
+        """
+        selection = FieldSelection(fields)
+        baselines = {domain: self.load_baseline(domain, selection) if incremental else None for domain in domains}
+        needs = self._batch_resolution_needs(domains, selection, baselines)
+        with ThreadPoolExecutor(max_workers=BATCH_SCAN_CONCURRENCY) as pool:
+            resolved = dict(zip(needs, pool.map(
+                lambda domain: self._run_stage("DNS Scan", domain, self.dns_scanner.resolve, domain, needs[domain],
+                                               incremental), needs)))
+            plan, prefetched = self._plan_batch(domains, selection, baselines, needs, resolved)
+            if plan is not None:
+                logger.info(f"Lote de {len(domains)} dominios: {len(plan.unique_targets)} objetivos de Nmap únicos.")
+                outcomes = pool.map(lambda target: self._run_stage("Nmap Scan", target, self.nmap_scanner.scan,
+                                                                   [target], selection.nmap_services, incremental),
+                                    plan.unique_targets)
+                self._assign_batch_nmap(plan, dict(zip(plan.unique_targets, outcomes)), prefetched)
+
+            def _collect(domain: str) -> Dict[str, Any]:
+                scan = self.collect_scan_results(domain, scenario, custom_gquery, dork_packs, dork_max_results,
+                                                 selection, baselines[domain], prefetched[domain])
+                self._annotate_batch(scan, plan, prefetched[domain])
+                return scan
+
+            scans = list(pool.map(_collect, domains))
+
+        results = [self._trimmed(selection, response, trim) for response in self._finish_batch(scans, selection)]
+        return {"scenario": scenario.lower(), "plan": plan.summary() if plan else None, "results": results}
+
+    def _finish_batch(self, scans: List[Dict[str, Any]], selection: FieldSelection) -> List[Dict[str, Any]]:
+        """
+        _finish_scan de todos los escaneos de un lote: los análisis de DeepSeek pendientes se envían juntos
+        con analizar_lote (en paralelo, dentro de los límites RPM/TPM y con reintentos) en vez de uno a uno.
+        """
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(scans)
+        pending = []  # (posición, análisis local, clave de caché, prompt)
+        for index, scan in enumerate(scans):
+            url_dominio = scan["url_dominio"]
+            response, local_analysis, cache_key = self._plan_analysis(url_dominio, scan, selection)
+            if response is not None:
+                responses[index] = response
+            elif self._deepseek_available(url_dominio, scan["execution_errors"]):
+                pending.append((index, local_analysis, cache_key, self.build_deepseek_prompt(scan, local_analysis)))
+            else:
+                responses[index] = self._build_response(scan, self._deepseek_skipped(), local_analysis=local_analysis)
+
+        if pending:
+            logger.info(f"Lote: enviando {len(pending)} análisis a DeepSeek.")
+            outcomes = analizar_lote([prompt for _, _, _, prompt in pending])
+            for (index, local_analysis, cache_key, _), outcome in zip(pending, outcomes):
+                scan = scans[index]
+                if "respuesta" in outcome:
+                    deepseek_analysis = outcome["respuesta"]
+                    get_analysis_cache().set(cache_key, deepseek_analysis)
+                else:
+                    logger.error(f"Error al consultar DeepSeek para {scan['url_dominio']}: {outcome['error']}")
+                    scan["execution_errors"].append(f"DeepSeek API: {outcome['error']}")
+                    deepseek_analysis = outcome["error"]
+                responses[index] = self._build_response(scan, deepseek_analysis, local_analysis=local_analysis)
+        return responses
+
+    async def run_batch_async(self, domains: List[str], scenario: str, custom_gquery: Optional[str] = None,
+                              dork_packs: Optional[List[str]] = None, dork_max_results: int = 10,
+                              fields: Optional[FrozenSet[str]] = None, incremental: bool = False,
+                              trim: bool = True) -> Dict[str, Any]:
+        """Versión asíncrona de run_batch: resoluciones, objetivos de Nmap y dominios se procesan a la vez."""
+        selection = FieldSelection(fields)
+        baselines = {domain: await sync_to_async(self.load_baseline)(domain, selection) if incremental else None
+                     for domain in domains}
+        needs = self._batch_resolution_needs(domains, selection, baselines)
+        semaphore = asyncio.Semaphore(BATCH_SCAN_CONCURRENCY)
+
+        async def _resolve(domain: str):
+            async with semaphore:
+                return await self.dns_scanner.resolve_async(domain, needs[domain], incremental)
+
+        outcomes = await asyncio.gather(*(_resolve(domain) for domain in needs), return_exceptions=True)
+        resolved = dict(zip(needs, outcomes))
+        plan, prefetched = self._plan_batch(domains, selection, baselines, needs, resolved)
+        if plan is not None:
+            logger.info(f"Lote de {len(domains)} dominios: {len(plan.unique_targets)} objetivos de Nmap únicos.")
+            try:
+                # scan_async limita la concurrencia (NMAP_MAX_CONCURRENCY) y retorna un host por objetivo, en orden
+                hosts = await self.nmap_scanner.scan_async(plan.unique_targets, selection.nmap_services, incremental)
+            except Exception as e:
+                logger.error(f"Error en Nmap Scan del lote: {e}", exc_info=True)
+                hosts = []
+            self._assign_batch_nmap(plan, {target: [host] for target, host in zip(plan.unique_targets, hosts)}, prefetched)
+
+        async def _scan(domain: str) -> Dict[str, Any]:
+            async with semaphore:
+                scan = await self.collect_scan_results_async(domain, scenario, custom_gquery, dork_packs, dork_max_results,
+                                                             selection, baselines[domain], prefetched[domain])
+                self._annotate_batch(scan, plan, prefetched[domain])
+                return self._trimmed(selection, await self._finish_scan_async(domain, scan, selection), trim)
+
+        results = await asyncio.gather(*(_scan(domain) for domain in domains))
+        return {"scenario": scenario.lower(), "plan": plan.summary() if plan else None, "results": list(results)}
+
+    @staticmethod
+    def _batch_resolution_needs(domains: List[str], selection: FieldSelection,
+                                baselines: Dict[str, Optional[IncrementalBaseline]]) -> Dict[str, List[str]]:
+        """Tipos de registro a resolver por dominio: todos si hace falta la etapa DNS, solo A si solo se planifica Nmap."""
+        needs = {}
+        for domain in domains:
+            fresh = baselines[domain].fresh if baselines[domain] is not None else {}
+            if selection.runs("dns") and "dns" not in fresh:
+                needs[domain] = DNS_SCAN_RECORD_TYPES
+            elif selection.runs("nmap") and "nmap" not in fresh and "dns" not in fresh:
+                needs[domain] = ["A"]
+        return needs
+
+    @staticmethod
+    def _plan_batch(domains: List[str], selection: FieldSelection, baselines: Dict[str, Optional[IncrementalBaseline]],
+                    needs: Dict[str, List[str]], resolved: Dict[str, Any]) -> Tuple[Optional[TargetPlan], Dict[str, Dict[str, Any]]]:
+        """
+        Etapas ya obtenidas de cada dominio (el DNS resuelto, si se pidió completo) y el plan de Nmap de los
+        dominios que lo necesitan (sin resultado vigente), a partir de su DNS nuevo o del vigente.
+        """
+        prefetched: Dict[str, Dict[str, Any]] = {domain: {} for domain in domains}
+        records: Dict[str, Optional[Dict[str, List[str]]]] = {}
+        for domain in domains:
+            fresh = baselines[domain].fresh if baselines[domain] is not None else {}
+            outcome = resolved.get(domain)
+            if isinstance(outcome, BaseException):
+                outcome = None  # Sin resolver: el dominio se escanea por su nombre y su etapa DNS se repite
+            if outcome is not None and needs.get(domain) == DNS_SCAN_RECORD_TYPES:
+                prefetched[domain]["dns"] = format_dns_results_structured(outcome)
+            if selection.runs("nmap") and "nmap" not in fresh:
+                records[domain] = outcome if outcome is not None else (fresh.get("dns") or {}).get("data", {}).get("details")
+        return (plan_targets(records) if records else None), prefetched
+
+    @staticmethod
+    def _assign_batch_nmap(plan: TargetPlan, outcomes: Dict[str, Any], prefetched: Dict[str, Dict[str, Any]]) -> None:
+        """Asigna a cada dominio los hosts de sus objetivos; si falta alguno, el dominio hará su propio Nmap."""
+        hosts_by_target = {target: format_nmap_results_structured(outcome)[0]
+                           for target, outcome in outcomes.items() if not isinstance(outcome, Exception) and outcome}
+        for domain, targets in plan.domain_targets.items():
+            if all(target in hosts_by_target for target in targets):
+                prefetched[domain]["nmap"] = plan.nmap_results(domain, hosts_by_target)
+
+    @staticmethod
+    def _annotate_batch(scan: Dict[str, Any], plan: Optional[TargetPlan], prefetched: Dict[str, Any]) -> None:
+        if plan is not None and "nmap" in prefetched:
+            domain = scan["url_dominio"]
+            scan["batch"] = {"nmap_targets": plan.domain_targets[domain], "shared_with": plan.shared_with(domain)}
+
+    def _deepseek_available(self, url_dominio: str, execution_errors: List[str]) -> bool:
+        """Indica si debe consultarse DeepSeek; si no, registra el motivo en execution_errors."""
+        if not self.deepseek_api_key:
             logger.warning(f"No se consultará DeepSeek para {url_dominio} porque DEEPSEEK_API_KEY no está configurada.")
             execution_errors.append("DeepSeek API: Clave no configurada.")
+            return False
+        deepseek_breaker = get_deepseek_breaker()
+        if deepseek_breaker.is_open():
+            logger.warning(f"DeepSeek omitido para {url_dominio}: circuito abierto.")
+            execution_errors.append(f"DeepSeek API: circuito abierto, reintentar en {deepseek_breaker.retry_after():.0f} s.")
+            return False
+        return True
 
-        return {
-            "url_dominio": url_dominio, # CAMBIADO de "target"
-            "scenario": current_scenario,
-            "scan_results": results_structured,
+    def run_local_analysis(self, scan: Dict[str, Any]) -> LocalAnalysis:
+        local_analysis = self.local_analyzer.analyze(scan["url_dominio"], scan["results_structured"])
+        logger.info(f"Análisis local para {scan['url_dominio']}: riesgo {local_analysis.risk_score}/100, "
+                    f"{len(local_analysis.findings)} hallazgos" + (f", DeepSeek omitido ({local_analysis.trivial_reason})" if local_analysis.trivial else "."))
+        return local_analysis
+
+    @staticmethod
+    def _build_response(scan: Dict[str, Any], deepseek_analysis: Optional[str], analysis_cached: bool = False,
+                        local_analysis: Optional[LocalAnalysis] = None) -> Dict[str, Any]:
+        response = {
+            "url_dominio": scan["url_dominio"], # CAMBIADO de "target"
+            "scenario": scan["scenario"],
+            "scan_results": scan["results_structured"],
+            "local_analysis": local_analysis.to_dict() if local_analysis else None,
             "deepseek_analysis": deepseek_analysis,
-            "execution_errors": execution_errors
-        }
\ No newline at end of file
+            "deepseek_analysis_cached": analysis_cached,
+            "execution_errors": scan["execution_errors"]
+        }
+        if "incremental" in scan:
+            response["incremental"] = scan["incremental"]
+        if "batch" in scan:
+            response["batch"] = scan["batch"]
+        return response
+
+    def load_baseline(self, url_dominio: str, selection: FieldSelection) -> Optional[IncrementalBaseline]:
+        """Últimos resultados guardados del dominio para el modo incremental (None si no hay historial)."""
+        if self.scan_history is None:
+            logger.warning(f"Modo incremental sin historial de escaneos para {url_dominio}: se escanea todo.")
+            return None
+        try:
+            previous = self.scan_history.latest_results(url_dominio, [stage for stage in SCAN_STAGES if selection.runs(stage)])
+        except Exception as e:
+            logger.error(f"No se pudo leer el historial de {url_dominio}; se escanea todo: {e}", exc_info=True)
+            return None
+        baseline = IncrementalBaseline(previous, dns_record_types=DNS_SCAN_RECORD_TYPES,
+                                       nmap_services=selection.nmap_services)
+        if baseline.fresh:
+            logger.info(f"Modo incremental para {url_dominio}: se reutilizan {', '.join(baseline.fresh)}.")
+        return baseline
+
+    def build_deepseek_prompt(self, scan: Dict[str, Any], local_analysis: Optional[LocalAnalysis] = None) -> str:
+        # 5. Compilar prompt para DeepSeek (compactado y limitado por DEEPSEEK_PROMPT_TOKEN_BUDGET),
+        # encabezado por los hallazgos del análisis local si los hay
+        local_section = local_analysis.to_prompt_section() if local_analysis else None
+        return self.prompt_builder.build(scan["url_dominio"], scan["scenario"], scan["results_structured"],
+                                         extra_sections=[local_section] if local_section else None)
+
+    def collect_scan_results(self, url_dominio: str, scenario: str, custom_gquery: Optional[str] = None,
+                             dork_packs: Optional[List[str]] = None, dork_max_results: int = 10,
+                             selection: Optional[FieldSelection] = None,
+                             baseline: Optional[IncrementalBaseline] = None,
+                             prefetched: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Ejecuta los escáneres del escenario (los de la selección, si la hay) y retorna sus resultados
+        estructurados. Con 'baseline' (modo incremental) las etapas vigentes se reutilizan sin escanear;
+        las de 'prefetched' (ya obtenidas por el plan de un lote) tampoco se vuelven a ejecutar.
+        """
+        selection = selection or FieldSelection()
+        scan = self._new_scan(url_dominio, scenario)
+        reused = self._reuse_stages(scan, selection, baseline)
+        done = reused + self._apply_prefetched(scan, selection, prefetched, reused)
+        # En modo incremental, las etapas que no se reutilizan están caducadas: no se leen de la caché de escáneres
+        fresh = baseline is not None
+
+        # 1. DNS Scan (se ejecuta en ambos escenarios)
+        if selection.runs("dns") and "dns" not in done:
+            logger.info(f"Ejecutando escaneo DNS para {url_dominio}...")
+            self._apply_dns(scan, self._run_stage("DNS Scan", url_dominio, self.dns_scanner.resolve, url_dominio,
+                                                  DNS_SCAN_RECORD_TYPES, fresh))
+
+        # 2. Nmap Scan (se ejecuta en ambos escenarios según tu nueva lógica)
+        if selection.runs("nmap") and "nmap" not in done:
+            logger.info(f"Ejecutando escaneo Nmap para {url_dominio}...")
+            self._apply_nmap(scan, self._run_stage("Nmap Scan", url_dominio, self.nmap_scanner.scan,
+                                                   [url_dominio], selection.nmap_services, fresh)) # Nmap toma una lista
+
+        # 3. Whois Scan (se ejecuta en ambos escenarios)
+        if selection.runs("whois") and "whois" not in done:
+            logger.info(f"Ejecutando escaneo Whois para {url_dominio}...")
+            self._apply_whois(scan, self._run_stage("Whois Scan", url_dominio, self.whois_scanner.get_info, url_dominio, fresh))
+
+        # 4. Google Dorks Scan (solo para escenario "complete" o "full")
+        plan = self._plan_google_dorks(scan, custom_gquery, dork_packs) if selection.runs("google_dorks") else None
+        plan = self._reuse_google_dorks(scan, plan, baseline, reused)
+        if plan is not None:
+            if plan["packs"]:
+                outcome = self._run_stage("Google Dorks Scan", url_dominio, self.google_dork_scanner.search_pack,
+                                          url_dominio, plan["packs"], dork_max_results)
+            else:
+                outcome = self._run_stage("Google Dorks Scan", url_dominio, self.google_dork_scanner.search, plan["query"])
+            self._apply_google_dorks(scan, plan, outcome)
+
+        if "nmap" not in reused:
+            mark_service_detection(scan["results_structured"]["nmap"], selection.nmap_services)
+        if baseline is not None:
+            scan["incremental"] = baseline.summary(scan["results_structured"], reused)
+        return scan
+
+    async def collect_scan_results_async(self, url_dominio: str, scenario: str, custom_gquery: Optional[str] = None,
+                                         dork_packs: Optional[List[str]] = None, dork_max_results: int = 10,
+                                         selection: Optional[FieldSelection] = None,
+                                         baseline: Optional[IncrementalBaseline] = None,
+                                         prefetched: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Versión asíncrona de collect_scan_results: los escáneres se ejecutan a la vez (DNS con
+        dnspython asíncrono, Nmap como subproceso asíncrono, Whois en un hilo y Google con httpx).
+        """
+        selection = selection or FieldSelection()
+        scan = self._new_scan(url_dominio, scenario)
+        reused = self._reuse_stages(scan, selection, baseline)
+        done = reused + self._apply_prefetched(scan, selection, prefetched, reused)
+        plan = self._plan_google_dorks(scan, custom_gquery, dork_packs) if selection.runs("google_dorks") else None
+        plan = self._reuse_google_dorks(scan, plan, baseline, reused)
+        fresh = baseline is not None  # Etapas caducadas del modo incremental: sin caché de escáneres
+
+        # (etiqueta, corrutina, función que registra el resultado) de cada etapa seleccionada
+        stages = []
+        if selection.runs("dns") and "dns" not in done:
+            stages.append(("DNS Scan", self.dns_scanner.resolve_async(url_dominio, DNS_SCAN_RECORD_TYPES, fresh), self._apply_dns))
+        if selection.runs("nmap") and "nmap" not in done:
+            stages.append(("Nmap Scan", self.nmap_scanner.scan_async([url_dominio], selection.nmap_services, fresh),
+                           self._apply_nmap))
+        if selection.runs("whois") and "whois" not in done:
+            stages.append(("Whois Scan", self.whois_scanner.get_info_async(url_dominio, fresh), self._apply_whois))
+        if plan is not None:
+            if plan["packs"]:
+                dorks = self.google_dork_scanner.search_pack_async(url_dominio, plan["packs"], dork_max_results)
+            else:
+                dorks = self.google_dork_scanner.search_async(plan["query"])
+            stages.append(("Google Dorks Scan", dorks, lambda scan, outcome: self._apply_google_dorks(scan, plan, outcome)))
+
+        logger.info(f"Ejecutando escaneos concurrentes para {url_dominio}...")
+        outcomes = await asyncio.gather(*(coro for _, coro, _ in stages), return_exceptions=True)
+        for (label, _, _), outcome in zip(stages, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error en {label} para {url_dominio}: {outcome}", exc_info=outcome)
+            elif isinstance(outcome, BaseException):
+                raise outcome  # Cancelación: no es un error del escáner
+
+        for (_, _, apply), outcome in zip(stages, outcomes):
+            apply(scan, outcome)
+        if "nmap" not in reused:
+            mark_service_detection(scan["results_structured"]["nmap"], selection.nmap_services)
+        if baseline is not None:
+            scan["incremental"] = baseline.summary(scan["results_structured"], reused)
+        return scan
+
+    # --- Etapas de escaneo: obtención (sync o async) separada del registro de resultados ---
+    @staticmethod
+    def _new_scan(url_dominio: str, scenario: str) -> Dict[str, Any]:
+        logger.info(f"Servicio de orquestación: Iniciando escaneo para {url_dominio}, escenario: {scenario.lower()}")
+        return {
+            "url_dominio": url_dominio,
+            "scenario": scenario.lower(), # Normalizar a minúsculas
+            "results_structured": {"dns": None, "nmap": None, "whois": None, "google_dorks": None},
+            "execution_errors": [],
+        }
+
+    @staticmethod
+    def _reuse_stages(scan: Dict[str, Any], selection: FieldSelection, baseline: Optional[IncrementalBaseline]) -> List[str]:
+        """Copia al escaneo los resultados vigentes de DNS, Nmap y Whois; retorna las etapas reutilizadas."""
+        if baseline is None:
+            return []
+        reusable = baseline.reusable_results()
+        reused = [stage for stage in ("dns", "nmap", "whois") if selection.runs(stage) and stage in reusable]
+        for stage in reused:
+            scan["results_structured"][stage] = reusable[stage]
+        return reused
+
+    @staticmethod
+    def _apply_prefetched(scan: Dict[str, Any], selection: FieldSelection, prefetched: Optional[Dict[str, Any]],
+                          reused: List[str]) -> List[str]:
+        """Copia al escaneo las etapas ya obtenidas (lote); retorna cuáles. Cuentan como escaneadas, no reutilizadas."""
+        applied = [stage for stage in ("dns", "nmap", "whois")
+                   if stage in (prefetched or {}) and selection.runs(stage) and stage not in reused]
+        for stage in applied:
+            scan["results_structured"][stage] = prefetched[stage]
+        return applied
+
+    @staticmethod
+    def _reuse_google_dorks(scan: Dict[str, Any], plan: Optional[Dict[str, Any]], baseline: Optional[IncrementalBaseline],
+                            reused: List[str]) -> Optional[Dict[str, Any]]:
+        """Reutiliza la búsqueda de Google Dorks vigente si es la misma que se planificó (retorna None) o retorna el plan."""
+        if plan is None or baseline is None:
+            return plan
+        stored = baseline.reusable_results().get("google_dorks")
+        if stored is None or not dork_plan_matches(plan, stored):
+            return plan
+        scan["results_structured"]["google_dorks"] = stored
+        reused.append("google_dorks")
+        return None
+
+    @staticmethod
+    def _run_stage(label: str, url_dominio: str, func, *args):
+        """Ejecuta un escáner y retorna su resultado, o la excepción si falló (ya registrada en el log)."""
+        try:
+            return func(*args)
+        except Exception as e:
+            logger.error(f"Error en {label} para {url_dominio}: {e}", exc_info=True)
+            return e
+
+    @staticmethod
+    def _apply_dns(scan: Dict[str, Any], outcome) -> None:
+        if isinstance(outcome, Exception):
+            scan["execution_errors"].append(f"DNS Scan: {str(outcome)}")
+            scan["results_structured"]["dns"] = {"error": str(outcome), "details": {}}
+            return
+        scan["results_structured"]["dns"] = format_dns_results_structured(outcome)
+
+    @staticmethod
+    def _apply_nmap(scan: Dict[str, Any], outcome) -> None:
+        if isinstance(outcome, FileNotFoundError):
+            logger.error("Error Nmap: Nmap no está instalado o no se encuentra en el PATH.")
+            scan["execution_errors"].append("Nmap: Nmap no está instalado o no se encuentra en el PATH.")
+            scan["results_structured"]["nmap"] = [{"error": "Nmap no instalado"}] # Nmap devuelve una lista de hosts
+            return
+        if isinstance(outcome, Exception):
+            scan["execution_errors"].append(f"Nmap Scan: {str(outcome)}")
+            scan["results_structured"]["nmap"] = [{"error": str(outcome)}]
+            return
+        scan["results_structured"]["nmap"] = format_nmap_results_structured(outcome)
+
+    @staticmethod
+    def _apply_whois(scan: Dict[str, Any], outcome) -> None:
+        if isinstance(outcome, Exception):
+            scan["execution_errors"].append(f"Whois Scan: {str(outcome)}")
+            scan["results_structured"]["whois"] = {"error": str(outcome)}
+            return
+        scan["results_structured"]["whois"] = format_whois_results_structured(outcome)
+
+    def _plan_google_dorks(self, scan: Dict[str, Any], custom_gquery: Optional[str],
+                           dork_packs: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        """
+        Decide qué búsqueda de Google Dorks corresponde. Si no se ejecuta (escenario "basic" o
+        sin configuración) registra el motivo y retorna None.
+        """
+        url_dominio = scan["url_dominio"]
+        current_scenario = scan["scenario"]
+        if current_scenario not in ["complete", "full"]: # Escenario "basic" omite Google Dorks
+            logger.info(f"Google Dorks omitido para escenario '{current_scenario}'.")
+            scan["results_structured"]["google_dorks"] = {"status": "omitted", "reason": f"Scenario: {current_scenario}", "results": []}
+            return None
+        if not self.google_dork_scanner:
+            msg = "Google Dorks omitido: configuración de API no disponible."
+            logger.warning(msg)
+            scan["execution_errors"].append(msg)
+            scan["results_structured"]["google_dorks"] = {"query_executed": "", "error": msg, "results": []}
+            return None
+        if dork_packs and not custom_gquery:
+            logger.info(f"Ejecutando paquetes de Google Dorks {dork_packs} para {url_dominio}...")
+            return {"packs": dork_packs, "query": None}
+        logger.info(f"Ejecutando escaneo Google Dorks para {url_dominio}...")
+        google_query_executed = custom_gquery if custom_gquery else f'site:{url_dominio} filetype:log OR "Index of /" OR "admin" OR "login"'
+        return {"packs": None, "query": google_query_executed}
+
+    @staticmethod
+    def _apply_google_dorks(scan: Dict[str, Any], plan: Dict[str, Any], outcome) -> None:
+        structured = scan["results_structured"]
+        if plan["packs"]:
+            if isinstance(outcome, Exception):
+                scan["execution_errors"].append(f"Google Dorks Scan: {str(outcome)}")
+                structured["google_dorks"] = {"query_executed": [], "packs": plan["packs"], "error": str(outcome)}
+                return
+            structured["google_dorks"] = {
+                "query_executed": [query for pack in outcome["packs"].values() for query in pack],
+                "packs": outcome["packs"],
+                "per_query": outcome["per_query"],
+                "failed_queries": outcome["failed_queries"],
+                "results": format_google_dorks_results_structured(outcome["results"])
+            }
+            return
+        google_query_executed = plan["query"]
+        if isinstance(outcome, Exception):
+            scan["execution_errors"].append(f"Google Dorks Scan: {str(outcome)}")
+            structured["google_dorks"] = {"query_executed": google_query_executed, "error": str(outcome)}
+            return
+        structured["google_dorks"] = {
+            "query_executed": google_query_executed,
+            "results": format_google_dorks_results_structured(outcome)
+        }
@@ -0,0 +1,204 @@
+# security_api/core/application/prompt_builder.py
+import logging
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.domain.links import normalize_link
+
+logger = logging.getLogger(__name__)
+
+# Aproximación conservadora para texto en español con el tokenizador de DeepSeek.
+CHARS_PER_TOKEN = 3.5
+
+PROMPT_INSTRUCTIONS = (
+    "Por favor, analiza la información de seguridad recopilada para el objetivo. "
+    "Proporciona un resumen de los hallazgos clave, identifica posibles vulnerabilidades "
+    "o áreas de preocupación relevantes para la seguridad, y sugiere recomendaciones "
+    "generales de seguridad basadas estrictamente en los datos provistos. "
+    "Responde en español."
+)
+
+MAX_TXT_CHARS = 200
+MAX_SNIPPET_CHARS = 160
+SENSITIVE_DORK_MARKERS = (".env", ".sql", ".bak", ".log", "backup", "index of", "password", "config", "admin", "login")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida del número de tokens de un texto (sin tokenizador)."""
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN)) if text else 0
+
+
+def _truncate(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class PromptSection:
+    """Sección del prompt: cabecera, líneas ordenadas por relevancia y un resumen que no se recorta."""
+    def __init__(self, title: str, priority: int, lines: List[str], summary: Optional[str] = None):
+        self.title = title
+        self.priority = priority
+        self.lines = lines
+        self.summary = summary
+
+
+class PromptBuilder:
+    """
+    Construye el prompt de análisis a partir de los resultados estructurados, compactándolos
+    (puertos cerrados/filtrados agrupados, registros de-duplicados, textos largos recortados)
+    y respetando un presupuesto de tokens. Las secciones se rellenan por prioridad y, dentro de
+    cada una, por relevancia; lo que no cabe se indica como omitido.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None):
+        self.token_budget = token_budget or int(os.getenv('DEEPSEEK_PROMPT_TOKEN_BUDGET', '3000'))
+
+    # --- Secciones ---
+    def _nmap_section(self, nmap_result: Optional[List[Dict]]) -> Optional[PromptSection]:
+        if not nmap_result:
+            return None
+        lines: List[str] = []
+        for host in nmap_result:
+            if host.get("error") and not host.get("ports"):
+                lines.append(f"Objetivo {host.get('ip', '?')}: error Nmap: {host.get('error')}")
+                continue
+            lines.append(f"Objetivo {host.get('ip')}: estado {host.get('status') or 'desconocido'}")
+            ranked: List[Tuple[Tuple, str]] = []
+            collapsed: Dict[str, int] = {}
+            for port in host.get("ports") or []:
+                state = port.get("state") or "unknown"
+                if state != "open":
+                    collapsed[state] = collapsed.get(state, 0) + 1
+                    continue
+                service = port.get("service") or {}
+                service_details = " ".join(filter(None, [service.get(k, "") for k in ("name", "product", "version", "extrainfo")]))
+                line = f"  - {port.get('port')}/{port.get('protocol')} abierto" + (f": {service_details}" if service_details else "")
+                # Primero los servicios identificados con producto/versión, después por número de puerto
+                rank = (0 if service.get("product") else 1, int(port.get("port") or 0) if str(port.get("port") or "").isdigit() else 0)
+                ranked.append((rank, line))
+            if collapsed:
+                lines.append("  Puertos no abiertos: " + ", ".join(f"{count} {state}" for state, count in sorted(collapsed.items())))
+            lines.extend(line for _, line in sorted(ranked))
+        return PromptSection("Resultados del Escaneo Nmap", priority=0, lines=lines)
+
+    def _whois_section(self, whois_result: Optional[Dict]) -> Optional[PromptSection]:
+        if not whois_result:
+            return None
+        if whois_result.get("error"):
+            return PromptSection("Resultados del Escaneo Whois", priority=1, lines=[f"Error: {whois_result['error']}"])
+        fields = [
+            ("Registrador", whois_result.get("registrar")),
+            ("Fecha de Creación", whois_result.get("creation_date")),
+            ("Fecha de Expiración", whois_result.get("expiration_date")),
+            ("Servidores de Nombre", ", ".join(sorted({ns.lower() for ns in whois_result.get("name_servers") or []}))),
+            ("Estado", ", ".join(sorted(set(whois_result.get("status") or [])))),
+            ("Emails", ", ".join(sorted(set(whois_result.get("emails") or [])))),
+            ("País", whois_result.get("country")),
+        ]
+        return PromptSection("Resultados del Escaneo Whois", priority=1,
+                             lines=[f"{label}: {value}" for label, value in fields if value])
+
+    def _dns_section(self, dns_result: Optional[Dict]) -> Optional[PromptSection]:
+        if not dns_result:
+            return None
+        details = dns_result.get("details") or {}
+        lines: List[str] = []
+        if dns_result.get("error"):
+            lines.append(f"Error: {dns_result['error']}")
+        empty_types = []
+        # Los TXT de SPF/DMARC son los más relevantes para seguridad; se listan primero.
+        for record_type in sorted(details, key=lambda t: (t != "TXT", t)):
+            records = list(dict.fromkeys(details[record_type] or []))
+            if not records:
+                empty_types.append(record_type)
+                continue
+            if record_type == "TXT":
+                records.sort(key=lambda r: (not any(m in r.lower() for m in ("v=spf1", "v=dmarc1")), r))
+                records = [_truncate(r, MAX_TXT_CHARS) for r in records]
+            lines.extend(f"{record_type}: {record}" for record in records)
+        summary = f"Sin registros: {', '.join(empty_types)}" if empty_types else None
+        return PromptSection("Resultados del Escaneo DNS", priority=2, lines=lines, summary=summary)
+
+    def _dorks_section(self, dorks_result: Optional[Dict]) -> Optional[PromptSection]:
+        if not dorks_result or dorks_result.get("status") == "omitted":
+            return None
+        query = dorks_result.get("query_executed")
+        title = "Resultados de Google Dorks" + (f" (Query: {query})" if isinstance(query, str) and query else "")
+        if dorks_result.get("error"):
+            return PromptSection(title, priority=3, lines=[f"Error: {dorks_result['error']}"])
+        seen = set()
+        ranked = []
+        for item in dorks_result.get("results") or []:
+            key = normalize_link(item.get("link", ""))
+            if key in seen:
+                continue
+            seen.add(key)
+            haystack = f"{item.get('link', '')} {item.get('title', '')}".lower()
+            score = sum(marker in haystack for marker in SENSITIVE_DORK_MARKERS)
+            line = f"- {_truncate(item.get('title', ''), 120)} | {item.get('link', '')} | {_truncate(item.get('snippet', ''), MAX_SNIPPET_CHARS)}"
+            ranked.append((-score, len(ranked), line))
+        if not ranked:
+            return PromptSection(title, priority=3, lines=["No se encontraron ítems para esta consulta."])
+        return PromptSection(title, priority=3, lines=[line for _, _, line in sorted(ranked)])
+
+    # --- Ensamblado ---
+    def build(self, url_dominio: str, scenario: str, scan_results: Dict[str, Any],
+              instructions: Optional[str] = PROMPT_INSTRUCTIONS,
+              extra_sections: Optional[List[PromptSection]] = None) -> str:
+        sections = [
+            *(extra_sections or []),
+            self._nmap_section(scan_results.get("nmap")),
+            self._whois_section(scan_results.get("whois")),
+            self._dns_section(scan_results.get("dns")),
+        ]
+        if scenario in ["complete", "full"]:
+            sections.append(self._dorks_section(scan_results.get("google_dorks")))
+        sections = sorted((s for s in sections if s is not None), key=lambda s: s.priority)
+
+        header = f"Análisis de Seguridad para el objetivo: {url_dominio}\n"
+        remaining = self.token_budget - estimate_tokens(header) - estimate_tokens(instructions or "")
+        # Las cabeceras y resúmenes de todas las secciones se reservan antes de repartir las líneas.
+        for section in sections:
+            remaining -= estimate_tokens(f"--- {section.title} ---\n") + estimate_tokens(section.summary or "")
+
+        # Primera pasada: cada sección recibe una parte igual del presupuesto, para que una sección
+        # enorme (p. ej. cientos de puertos) no deje sin espacio a las demás. Segunda pasada: lo que
+        # sobre se reparte por orden de prioridad.
+        taken: Dict[int, int] = {id(s): 0 for s in sections}
+        fair_share = remaining // len(sections) if sections else 0
+        for share_pass in (True, False):
+            for section in sections:
+                allowance = min(fair_share, remaining) if share_pass else remaining
+                spent = 0
+                while taken[id(section)] < len(section.lines):
+                    cost = estimate_tokens(section.lines[taken[id(section)]]) + 1
+                    if spent + cost > allowance:
+                        break
+                    spent += cost
+                    taken[id(section)] += 1
+                remaining -= spent
+
+        rendered: Dict[int, List[str]] = {}
+        omitted_total = 0
+        for section in sections:
+            rendered[id(section)] = section.lines[:taken[id(section)]]
+            omitted = len(section.lines) - taken[id(section)]
+            if omitted:
+                omitted_total += omitted
+                rendered[id(section)].append(f"({omitted} elementos omitidos por límite de tamaño)")
+
+        parts = [header]
+        for section in sections:
+            body = rendered[id(section)] + ([section.summary] if section.summary else [])
+            parts.append(f"--- {section.title} ---\n" + "\n".join(body) + "\n")
+        if instructions:
+            parts.append(instructions)
+        prompt = "\n".join(parts)
+        logger.info(f"Prompt para {url_dominio}: ~{estimate_tokens(prompt)} tokens (presupuesto {self.token_budget}), {omitted_total} elementos omitidos.")
+        return prompt
+
+    def build_report(self, url_dominio: str, scenario: str, scan_results: Dict[str, Any],
+                     extra_sections: Optional[List[PromptSection]] = None) -> str:
+        """El mismo informe compactado, sin las instrucciones de análisis (p. ej. como contexto de un chat)."""
+        return self.build(url_dominio, scenario, scan_results, instructions=None, extra_sections=extra_sections).rstrip()
@@ -0,0 +1,225 @@
+# security_api/core/application/report_rendering.py
+from typing import Any, Callable, Dict, List, Optional
+
+
+def _service_details(service: Optional[Dict[str, str]]) -> str:
+    service = service or {}
+    return " ".join(filter(None, [service.get(k, "") for k in ("name", "product", "version", "extrainfo")]))
+
+
+def _md_cell(value: Any) -> str:
+    return str(value if value is not None else "").replace("|", "\\|").replace("\n", " ")
+
+
+def _dorks_label(dorks: Dict[str, Any]) -> str:
+    if dorks.get("packs"):
+        # dict paquete -> consultas si la búsqueda terminó; lista de paquetes si falló
+        return f"paquetes {', '.join(dorks['packs'])}"
+    return str(dorks.get("query_executed") or "")
+
+
+# --- Texto plano (mismo formato que el informe histórico) ---
+def _text_dns(out: List[str], dns: Optional[Dict]) -> None:
+    if not dns:
+        return
+    out.append("--- Resultados del Escaneo DNS ---\n")
+    if dns.get("error"):
+        out.append(f"Error: {dns['error']}\n\n")
+        return
+    for record_type, records in (dns.get("details") or {}).items():
+        if records:
+            out.append(f"{record_type}:\n")
+            out.extend(f"  - {record}\n" for record in records)
+        else:
+            out.append(f"{record_type}: (No se encontraron registros)\n")
+    out.append("\n")
+
+
+def _text_nmap(out: List[str], nmap: Optional[List[Dict]], url_dominio: str) -> None:
+    if nmap is None:
+        return
+    if not nmap:
+        out.append(f"No se obtuvieron resultados Nmap para {url_dominio} o el host está caído/filtrado.\n")
+        return
+    out.append("--- Resultados del Escaneo Nmap ---\n")
+    for host in nmap:
+        if "ip" not in host:
+            out.append(f"Error: {host.get('error')}\n\n")
+            continue
+        out.append(f"Objetivo: {host['ip']}\n")
+        out.append(f"Estado: {host.get('status') or 'desconocido'}\n")
+        if host.get("error"):
+            out.append(f"Error Nmap: {host['error']}\n")
+        if host.get("ports"):
+            out.append("Puertos:\n")
+            for port in host["ports"]:
+                out.append(f"  - Puerto: {port.get('port')}/{port.get('protocol')}\n")
+                out.append(f"    Estado: {port.get('state')}\n")
+                details = _service_details(port.get("service"))
+                if details:
+                    out.append(f"    Servicio: {details}\n")
+        else:
+            out.append("Puertos: (No se encontraron puertos abiertos o información de puertos no disponible)\n")
+        out.append("\n")
+
+
+WHOIS_FIELDS = [
+    ("domain_name", "Nombre de Dominio"), ("registrar", "Registrador"), ("creation_date", "Fecha de Creación"),
+    ("expiration_date", "Fecha de Expiración"), ("updated_date", "Última Actualización"),
+    ("name_servers", "Servidores de Nombre"), ("status", "Estado"), ("emails", "Emails"), ("country", "País"),
+]
+
+
+def _whois_values(whois: Dict) -> List[tuple]:
+    values = []
+    for key, label in WHOIS_FIELDS:
+        value = whois.get(key)
+        if value:
+            values.append((label, ", ".join(value) if isinstance(value, list) else value))
+    return values
+
+
+def _text_whois(out: List[str], whois: Optional[Dict], url_dominio: str) -> None:
+    out.append(f"--- Resultados del Escaneo Whois para {url_dominio} ---\n")
+    if not whois or whois.get("error"):
+        out.append(f"Error: {(whois or {}).get('error') or 'No se pudo obtener información.'}\n\n")
+        return
+    out.extend(f"{label}: {value}\n" for label, value in _whois_values(whois))
+    out.append("\n")
+
+
+def _text_dorks(out: List[str], dorks: Optional[Dict]) -> None:
+    if not dorks:
+        return
+    if dorks.get("status") == "omitted":
+        out.append(f"Google Dorks omitido ({dorks.get('reason', '')}).\n")
+        return
+    out.append(f"--- Resultados de Google Dorks (Query: {_dorks_label(dorks)}) ---\n")
+    if dorks.get("error"):
+        out.append(f"Error: {dorks['error']}\n\n")
+        return
+    items = dorks.get("results")
+    if not items:
+        out.append("No se encontraron ítems para esta consulta.\n\n")
+        return
+    for item in items:
+        out.append(f"Título: {item.get('title')}\nEnlace: {item.get('link')}\nFragmento: {item.get('snippet')}\n---\n")
+    out.append("\n")
+
+
+def render_text(report: "ScanReport") -> str:
+    out: List[str] = []
+    results = report.scan_results
+    _text_dns(out, results.get("dns"))
+    _text_nmap(out, results.get("nmap"), report.url_dominio)
+    if results.get("whois") is not None:
+        _text_whois(out, results.get("whois"), report.url_dominio)
+    _text_dorks(out, results.get("google_dorks"))
+    if report.deepseek_analysis:
+        out.append(f"--- Análisis ---\n{report.deepseek_analysis}\n")
+    return "".join(out)
+
+
+# --- Markdown ---
+def render_markdown(report: "ScanReport") -> str:
+    results = report.scan_results
+    out: List[str] = [f"# Informe de seguridad: {report.url_dominio}\n\n", f"Escenario: `{report.scenario}`\n\n"]
+
+    if report.local_analysis and report.local_analysis.get("findings"):
+        out.append(f"## Hallazgos (riesgo {report.local_analysis.get('risk_score')}/100)\n\n")
+        out.extend(f"- **{f['severity']}** {f['title']}" + (f": {f['detail']}" if f.get("detail") else "") + "\n"
+                   for f in report.local_analysis["findings"])
+        out.append("\n")
+
+    dns = results.get("dns")
+    if dns:
+        out.append("## DNS\n\n")
+        if dns.get("error"):
+            out.append(f"Error: {dns['error']}\n\n")
+        else:
+            out.append("| Tipo | Valor |\n|---|---|\n")
+            for record_type, records in (dns.get("details") or {}).items():
+                out.extend(f"| {record_type} | {_md_cell(record)} |\n" for record in records or [])
+            out.append("\n")
+
+    nmap = results.get("nmap")
+    if nmap:
+        out.append("## Nmap\n\n")
+        for host in nmap:
+            if "ip" not in host:
+                out.append(f"Error: {host.get('error')}\n\n")
+                continue
+            out.append(f"### {host['ip']} ({host.get('status') or 'desconocido'})\n\n")
+            if host.get("error"):
+                out.append(f"Error: {host['error']}\n\n")
+            if host.get("ports"):
+                out.append("| Puerto | Estado | Servicio |\n|---|---|---|\n")
+                out.extend(f"| {p.get('port')}/{p.get('protocol')} | {p.get('state')} | {_md_cell(_service_details(p.get('service')))} |\n"
+                           for p in host["ports"])
+                out.append("\n")
+
+    whois = results.get("whois")
+    if whois is not None:
+        out.append("## Whois\n\n")
+        if whois.get("error"):
+            out.append(f"Error: {whois['error']}\n\n")
+        else:
+            out.extend(f"- **{label}:** {value}\n" for label, value in _whois_values(whois))
+            out.append("\n")
+
+    dorks = results.get("google_dorks")
+    if dorks and dorks.get("status") != "omitted":
+        out.append(f"## Google Dorks\n\nConsulta: `{_dorks_label(dorks)}`\n\n")
+        if dorks.get("error"):
+            out.append(f"Error: {dorks['error']}\n\n")
+        else:
+            out.extend(f"- [{_md_cell(item.get('title'))}]({item.get('link')})\n" for item in dorks.get("results") or [])
+            out.append("\n")
+
+    if report.deepseek_analysis:
+        out.append(f"## Análisis\n\n{report.deepseek_analysis}\n\n")
+    if report.execution_errors:
+        out.append("## Errores de ejecución\n\n")
+        out.extend(f"- {error}\n" for error in report.execution_errors)
+    return "".join(out)
+
+
+RENDERERS: Dict[str, Callable[["ScanReport"], str]] = {
+    "text": render_text,
+    "markdown": render_markdown,
+}
+
+
+class ScanReport:
+    """
+    Informe de un escaneo a partir de sus resultados estructurados (lo único que se construye
+    durante el escaneo). Cada formato se genera solo cuando se pide y se memoriza; JSON es el
+    propio diccionario estructurado.
+    """
+
+    def __init__(self, url_dominio: str, scenario: str, scan_results: Dict[str, Any],
+                 execution_errors: Optional[List[str]] = None, deepseek_analysis: Optional[str] = None,
+                 local_analysis: Optional[Dict[str, Any]] = None):
+        self.url_dominio = url_dominio
+        self.scenario = scenario
+        self.scan_results = scan_results
+        self.execution_errors = execution_errors or []
+        self.deepseek_analysis = deepseek_analysis
+        self.local_analysis = local_analysis
+        self._rendered: Dict[str, str] = {}
+
+    @classmethod
+    def from_response(cls, response: Dict[str, Any]) -> "ScanReport":
+        """Informe a partir de la respuesta de OrchestrationService.run_scan."""
+        return cls(response["url_dominio"], response["scenario"], response["scan_results"],
+                   response.get("execution_errors"), response.get("deepseek_analysis"), response.get("local_analysis"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.scan_results
+
+    def render(self, fmt: str) -> str:
+        if fmt not in RENDERERS:
+            raise ValueError(f"Formato de informe desconocido: {fmt}. Disponibles: {', '.join(RENDERERS)}")
+        if fmt not in self._rendered:
+            self._rendered[fmt] = RENDERERS[fmt](self)
+        return self._rendered[fmt]
@@ -26,20 +26,59 @@ class GoogleDorkUseCase:
             return service.perform_search(query)
         return None
 
+    def execute_pack(self, domain: str, packs: Optional[List[str]] = None, max_results_per_query: int = 10) -> Optional[Dict]:
+        api_key, search_engine_id, _ = load_api_keys()
+        if api_key and search_engine_id:
+            adapter = GoogleDorkScannerAdapter(api_key, search_engine_id)
+            service = GoogleDorkService(adapter)
+            return service.perform_pack_search(domain, packs, max_results_per_query)
+        return None
+
+    async def execute_async(self, query: str) -> Optional[List[GoogleDorkResult]]:
+        api_key, search_engine_id, _ = load_api_keys()
+        if api_key and search_engine_id:
+            adapter = GoogleDorkScannerAdapter(api_key, search_engine_id)
+            service = GoogleDorkService(adapter)
+            return await service.perform_search_async(query)
+        return None
+
+    async def execute_pack_async(self, domain: str, packs: Optional[List[str]] = None, max_results_per_query: int = 10) -> Optional[Dict]:
+        api_key, search_engine_id, _ = load_api_keys()
+        if api_key and search_engine_id:
+            adapter = GoogleDorkScannerAdapter(api_key, search_engine_id)
+            service = GoogleDorkService(adapter)
+            return await service.perform_pack_search_async(domain, packs, max_results_per_query)
+        return None
+
 class DnsScanUseCase:
-    def execute(self, domain: str, record_types: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    def execute(self, domain: str, record_types: Optional[List[str]] = None, fresh: bool = False) -> Dict[str, List[str]]:
+        adapter = DnsScannerAdapter()
+        service = DNSService(adapter)
+        return service.resolve_records(domain, record_types, fresh)
+
+    async def execute_async(self, domain: str, record_types: Optional[List[str]] = None, fresh: bool = False) -> Dict[str, List[str]]:
         adapter = DnsScannerAdapter()
         service = DNSService(adapter)
-        return service.resolve_records(domain, record_types)
+        return await service.resolve_records_async(domain, record_types, fresh)
 
 class WhoisScanUseCase:
-    def execute(self, domain: str) -> WhoisInfo:
+    def execute(self, domain: str, fresh: bool = False) -> WhoisInfo:
         adapter = WhoisScannerAdapter()
         service = WhoisService(adapter)
-        return service.get_whois_info(domain)
+        return service.get_whois_info(domain, fresh)
+
+    async def execute_async(self, domain: str, fresh: bool = False) -> WhoisInfo:
+        adapter = WhoisScannerAdapter()
+        service = WhoisService(adapter)
+        return await service.get_whois_info_async(domain, fresh)
 
 class NmapScanUseCase:
-    def execute(self, targets: List[str]) -> List[NmapHost]:
+    def execute(self, targets: List[str], service_detection: bool = True, fresh: bool = False) -> List[NmapHost]:
+        adapter = NmapScannerAdapter()
+        service = NmapService(adapter)
+        return service.scan_targets(targets, service_detection, fresh)
+
+    async def execute_async(self, targets: List[str], service_detection: bool = True, fresh: bool = False) -> List[NmapHost]:
         adapter = NmapScannerAdapter()
         service = NmapService(adapter)
-        return service.scan_targets(targets)
\ No newline at end of file
+        return await service.scan_targets_async(targets, service_detection, fresh)
@@ -1,39 +1,67 @@
 # core/domain/entities.py
+from dataclasses import dataclass
 from typing import List, Dict, Optional
 from pydantic import BaseModel
 
+# Entidades con __slots__ (sin __dict__ por instancia): los lotes y el historial mantienen muchas en memoria.
+# orjson serializa las dataclasses de forma nativa; to_dict se mantiene para el resto de usos.
+
+@dataclass(slots=True)
 class GoogleDorkResult:
-    def __init__(self, title: str, link: str, snippet: str):
-        self.title = title
-        self.link = link
-        self.snippet = snippet
+    title: str
+    link: str
+    snippet: str
 
     def to_dict(self) -> Dict[str, str]:
         return {"title": self.title, "link": self.link, "snippet": self.snippet}
 
+class DnsRecords(dict):
+    """
+    Registros DNS por tipo ({"A": [...], "MX": [...]}). 'cached' y 'scanned_at' indican si vienen de la
+    caché de escáneres y cuándo se resolvieron; como atributos, no cambian la forma del diccionario.
+    """
+    __slots__ = ("cached", "scanned_at")
+
+    def __init__(self, records=(), cached: bool = False, scanned_at: Optional[str] = None):
+        super().__init__(records)
+        self.cached = cached
+        self.scanned_at = scanned_at
+
+@dataclass(slots=True)
 class DnsRecord:
-    def __init__(self, type: str, value: List[str]):
-        self.type = type
-        self.value = value
+    type: str
+    value: List[str]
 
+    def to_dict(self) -> Dict:
+        return {"type": self.type, "value": self.value}
+
+@dataclass(slots=True)
 class WhoisInfo:
-    def __init__(self, registrar: Optional[str] = None, creation_date: Optional[str] = None,
-                 expiration_date: Optional[str] = None, name_servers: Optional[List[str]] = None,
-                 status: Optional[List[str]] = None, emails: Optional[List[str]] = None,
-                 country: Optional[str] = None, whois_server: Optional[str] = None,
-                 updated_date: Optional[str] = None, domain_name: Optional[List[str]] = None,
-                 error: Optional[str] = None):
-        self.registrar = registrar
-        self.creation_date = creation_date
-        self.expiration_date = expiration_date
-        self.name_servers = name_servers if name_servers is not None else []
-        self.status = status if status is not None else []
-        self.emails = emails if emails is not None else []
-        self.country = country
-        self.whois_server = whois_server
-        self.updated_date = updated_date
-        self.domain_name = domain_name if domain_name is not None else []
-        self.error = error
+    registrar: Optional[str] = None
+    creation_date: Optional[str] = None
+    expiration_date: Optional[str] = None
+    name_servers: Optional[List[str]] = None
+    status: Optional[List[str]] = None
+    emails: Optional[List[str]] = None
+    country: Optional[str] = None
+    whois_server: Optional[str] = None
+    updated_date: Optional[str] = None
+    domain_name: Optional[List[str]] = None
+    error: Optional[str] = None
+    # Origen del resultado: la caché de escáneres (cached) y cuándo se consultó realmente el WHOIS
+    cached: bool = False
+    scanned_at: Optional[str] = None
+
+    def __post_init__(self):
+        # Como antes: las listas ausentes (None) se guardan vacías
+        if self.name_servers is None:
+            self.name_servers = []
+        if self.status is None:
+            self.status = []
+        if self.emails is None:
+            self.emails = []
+        if self.domain_name is None:
+            self.domain_name = []
 
     def to_dict(self) -> Dict:
         return {
@@ -48,6 +76,8 @@ class WhoisInfo:
             "updated_date": self.updated_date,
             "domain_name": self.domain_name,
             "error": self.error,
+            "cached": self.cached,
+            "scanned_at": self.scanned_at,
         }
 
 class NmapPort(BaseModel):
@@ -60,4 +90,7 @@ class NmapHost(BaseModel):
     ip: str
     ports: List[NmapPort]
     status: Optional[str] = None
-    error: Optional[str] = None
\ No newline at end of file
+    error: Optional[str] = None
+    # Si el host viene de la caché de escáneres y cuándo se escaneó realmente
+    cached: bool = False
+    scanned_at: Optional[str] = None
\ No newline at end of file
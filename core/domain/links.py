@@ -0,0 +1,12 @@
+# security_api/core/domain/links.py
+from urllib.parse import urlsplit, urlunsplit
+
+
+def normalize_link(link: str) -> str:
+    """Normaliza un enlace para de-duplicar: esquema y host en minúsculas, sin fragmento ni '/' final."""
+    try:
+        parts = urlsplit(link.strip())
+    except ValueError:
+        return link.strip()
+    path = parts.path.rstrip('/') or ''
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
@@ -1,6 +1,6 @@
 # core/domain/ports.py
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 
 class GoogleDorkResultItem(Dict):
     """
@@ -30,3 +30,40 @@ class GoogleDorkSearchPort(ABC):
             Una lista de diccionarios representando los resultados, o None si hay un error.
         """
         pass
+
+
+class ScanHistoryPort(ABC):
+    """
+    Puerto para el historial persistente de escaneos.
+    Los escaneos se guardan con el mismo formato de respuesta de OrchestrationService.run_scan.
+    """
+    @abstractmethod
+    def save_scan(self, response: Dict[str, Any]) -> int:
+        """
+        Guarda un escaneo (respuesta de run_scan o de un escáner individual).
+
+        Returns:
+            El identificador del escaneo guardado.
+        """
+        pass
+
+    @abstractmethod
+    def get_scan(self, scan_id: int) -> Optional[Dict[str, Any]]:
+        """Retorna un escaneo guardado con el formato de respuesta de run_scan, o None si no existe."""
+        pass
+
+    @abstractmethod
+    def list_scans(self, domain: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Retorna el resumen de los escaneos más recientes, opcionalmente de un dominio."""
+        pass
+
+    @abstractmethod
+    def latest_results(self, domain: str, stages: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Último resultado guardado de cada escáner para un dominio (para el escaneo incremental).
+
+        Returns:
+            Diccionario escáner -> {"data": resultado estructurado, "scan_id": int,
+            "created_at": datetime con zona horaria}; los escáneres sin resultados no aparecen.
+        """
+        pass
@@ -12,23 +12,41 @@ class GoogleDorkService:
     def perform_search(self, query: str) -> Optional[List[GoogleDorkResult]]:
         return self.scanner_adapter.search(query)
 
+    def perform_pack_search(self, domain: str, packs: Optional[List[str]] = None, max_results_per_query: int = 10) -> Dict:
+        return self.scanner_adapter.search_pack(domain, packs, max_results_per_query)
+
+    async def perform_search_async(self, query: str) -> Optional[List[GoogleDorkResult]]:
+        return await self.scanner_adapter.search_async(query)
+
+    async def perform_pack_search_async(self, domain: str, packs: Optional[List[str]] = None, max_results_per_query: int = 10) -> Dict:
+        return await self.scanner_adapter.search_pack_async(domain, packs, max_results_per_query)
+
 class DNSService:
     def __init__(self, scanner_adapter):
         self.scanner_adapter = scanner_adapter
 
-    def resolve_records(self, domain: str, record_types: Optional[List[str]] = None) -> Dict[str, List[str]]:
-        return self.scanner_adapter.resolve(domain, record_types)
+    def resolve_records(self, domain: str, record_types: Optional[List[str]] = None, fresh: bool = False) -> Dict[str, List[str]]:
+        return self.scanner_adapter.resolve(domain, record_types, fresh)
+
+    async def resolve_records_async(self, domain: str, record_types: Optional[List[str]] = None, fresh: bool = False) -> Dict[str, List[str]]:
+        return await self.scanner_adapter.resolve_async(domain, record_types, fresh)
 
 class WhoisService:
     def __init__(self, scanner_adapter):
         self.scanner_adapter = scanner_adapter
 
-    def get_whois_info(self, domain: str) -> WhoisInfo:
-        return self.scanner_adapter.get_info(domain)
+    def get_whois_info(self, domain: str, fresh: bool = False) -> WhoisInfo:
+        return self.scanner_adapter.get_info(domain, fresh)
+
+    async def get_whois_info_async(self, domain: str, fresh: bool = False) -> WhoisInfo:
+        return await self.scanner_adapter.get_info_async(domain, fresh)
 
 class NmapService:
     def __init__(self, scanner_adapter):
         self.scanner_adapter = scanner_adapter
 
-    def scan_targets(self, targets: List[str]) -> List[NmapHost]:
-        return self.scanner_adapter.scan(targets)
\ No newline at end of file
+    def scan_targets(self, targets: List[str], service_detection: bool = True, fresh: bool = False) -> List[NmapHost]:
+        return self.scanner_adapter.scan(targets, service_detection, fresh)
+
+    async def scan_targets_async(self, targets: List[str], service_detection: bool = True, fresh: bool = False) -> List[NmapHost]:
+        return await self.scanner_adapter.scan_async(targets, service_detection, fresh)
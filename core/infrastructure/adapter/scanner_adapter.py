@@ -1,14 +1,21 @@
 # core/infrastructure/adapter/scanner_adapter.py
 from abc import ABC, abstractmethod # Aunque no se usan directamente como interfaces base aquí, las mantengo si son parte de tu estructura.
+import asyncio
+import os
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
 from typing import List, Dict, Optional
 
 # Importaciones de las entidades de dominio
 # DnsRecord no se usa directamente en este archivo, pero no causa error.
-from core.domain.entities import GoogleDorkResult, DnsRecord, WhoisInfo, NmapHost
+from core.domain.entities import GoogleDorkResult, DnsRecord, DnsRecords, WhoisInfo, NmapHost
+
+from ..cache.tiered_cache import TieredCache, get_tiered_cache
 
 # Importaciones de las clases Scanner de sus respectivos módulos
 from ..scanner.google_dorks import GoogleDorkScanner
-from ..scanner.dns_scan import DNSScanner
+from ..scanner.dns_scan import AsyncDNSScanner, DNSScanner
 # Asegúrate de que estas rutas de importación y los nombres de las clases sean correctos
 # según la ubicación y definición de tus archivos de scanner.
 from ..scanner.whois_scan import WhoisScanner   # <--- DESCOMENTADO
@@ -19,6 +26,31 @@ from ..scanner.nmap_scan import NmapScanner     # <--- DESCOMENTADO
 # class NmapScannerPlaceholder: ...
 
 
+# Vigencia por defecto (segundos) de la caché de cada escáner
+SCANNER_CACHE_TTLS = {"dns": 300, "whois": 6 * 3600, "nmap": 600}
+
+
+def scanner_cache(namespace: str) -> Optional[TieredCache]:
+    """
+    Caché compartida por los procesos del nodo para un escáner. Vigencia configurable con
+    SCANNER_CACHE_TTL_<ESCÁNER> (segundos); 0 la desactiva.
+    """
+    ttl = int(os.getenv(f"SCANNER_CACHE_TTL_{namespace.upper()}", str(SCANNER_CACHE_TTLS[namespace])))
+    if ttl <= 0:
+        return None
+    return get_tiered_cache(namespace, ttl, max_entries=int(os.getenv('SCANNER_CACHE_MEMORY_ENTRIES', '512')),
+                            shared_max_entries=int(os.getenv('SCANNER_CACHE_MAX_ENTRIES', '20000')))
+
+
+def _host_to_dict(host: NmapHost) -> Dict:
+    return host.model_dump() if hasattr(host, 'model_dump') else host.dict()
+
+
+def _timestamp(at: Optional[float] = None) -> str:
+    # Momento (UTC, ISO 8601) en que se consultó realmente el escáner; en un acierto de caché, el de la entrada
+    return datetime.fromtimestamp(time.time() if at is None else at, timezone.utc).isoformat(timespec="seconds")
+
+
 class GoogleDorkScannerAdapter:
     def __init__(self, api_key: str, search_engine_id: str):
         self.scanner = GoogleDorkScanner(api_key=api_key, search_engine_id=search_engine_id)
@@ -26,27 +58,160 @@ class GoogleDorkScannerAdapter:
     def search(self, query: str, start: int = 1, lang: str = "lang_es") -> Optional[List[GoogleDorkResult]]:
         return self.scanner.search(query, start, lang)
 
+    def search_pack(self, domain: str, packs: Optional[List[str]] = None, max_results_per_query: int = 10,
+                    lang: str = "lang_es") -> Dict:
+        return self.scanner.search_pack(domain, packs, max_results_per_query, lang)
+
+    async def search_async(self, query: str, start: int = 1, lang: str = "lang_es") -> Optional[List[GoogleDorkResult]]:
+        return await self.scanner.search_async(query, start, lang)
+
+    async def search_pack_async(self, domain: str, packs: Optional[List[str]] = None, max_results_per_query: int = 10,
+                                lang: str = "lang_es") -> Dict:
+        return await self.scanner.search_pack_async(domain, packs, max_results_per_query, lang)
+
 class DnsScannerAdapter:
     def __init__(self):
         self.scanner = DNSScanner()
+        self.async_scanner = AsyncDNSScanner()
+        self.cache = scanner_cache("dns")
+
+    @staticmethod
+    def _key(domain: str, record_types: Optional[List[str]]) -> str:
+        return f"{domain.strip().lower()}|{','.join(sorted(record_types or []))}"
+
+    @staticmethod
+    def _cacheable(records: Dict[str, List[str]]) -> bool:
+        # Sin ningún registro puede ser un timeout: no se guarda para no repetir el fallo durante el TTL
+        return any(records.values())
 
-    def resolve(self, domain: str, record_types: Optional[List[str]] = None) -> Dict[str, List[str]]:
-        return self.scanner.resolve_records_raw(domain, record_types)
+    def _cached(self, key: str) -> Optional[DnsRecords]:
+        found = self.cache.get_entry(key)
+        return DnsRecords(found[0], cached=True, scanned_at=_timestamp(found[1])) if found is not None else None
+
+    def _store(self, key: str, records: Dict[str, List[str]]) -> None:
+        if self._cacheable(records):
+            self.cache.set(key, dict(records))
+
+    def resolve(self, domain: str, record_types: Optional[List[str]] = None, fresh: bool = False) -> DnsRecords:
+        # 'fresh' no lee la caché (la respuesta nueva sí se guarda para las siguientes consultas)
+        if self.cache is None:
+            return DnsRecords(self.scanner.resolve_records_raw(domain, record_types), scanned_at=_timestamp())
+        key = self._key(domain, record_types)
+        records = None if fresh else self._cached(key)
+        if records is None:
+            records = DnsRecords(self.scanner.resolve_records_raw(domain, record_types), scanned_at=_timestamp())
+            self._store(key, records)
+        return records
+
+    async def resolve_async(self, domain: str, record_types: Optional[List[str]] = None, fresh: bool = False) -> DnsRecords:
+        if self.cache is None:
+            return DnsRecords(await self.async_scanner.resolve_records_raw(domain, record_types), scanned_at=_timestamp())
+        key = self._key(domain, record_types)
+        records = None if fresh else await asyncio.to_thread(self._cached, key)
+        if records is None:
+            records = DnsRecords(await self.async_scanner.resolve_records_raw(domain, record_types), scanned_at=_timestamp())
+            await asyncio.to_thread(self._store, key, records)
+        return records
 
 class WhoisScannerAdapter:
     def __init__(self):
         # Usando la implementación real de WhoisScanner
         self.scanner = WhoisScanner() # <--- MODIFICADO
+        self.cache = scanner_cache("whois")
+
+    def _cached(self, domain: str) -> Optional[WhoisInfo]:
+        found = self.cache.get_entry(domain.strip().lower())
+        if found is None:
+            return None
+        data, stored_at = found
+        return WhoisInfo(**{**data, "cached": True, "scanned_at": _timestamp(stored_at)})
+
+    def _store(self, domain: str, info: WhoisInfo) -> None:
+        if not info.error:
+            data = asdict(info)
+            data.pop("cached", None)
+            data.pop("scanned_at", None)
+            self.cache.set(domain.strip().lower(), data)
+
+    def _scanned(self, info: WhoisInfo) -> WhoisInfo:
+        info.scanned_at = _timestamp()
+        return info
+
+    def get_info(self, domain: str, fresh: bool = False) -> WhoisInfo:
+        if self.cache is None:
+            # Asume que tu clase WhoisScanner real tiene un método get_whois_info_raw
+            return self._scanned(self.scanner.get_whois_info_raw(domain))
+        info = None if fresh else self._cached(domain)
+        if info is None:
+            info = self._scanned(self.scanner.get_whois_info_raw(domain))
+            self._store(domain, info)
+        return info
 
-    def get_info(self, domain: str) -> WhoisInfo:
-        # Asume que tu clase WhoisScanner real tiene un método get_whois_info_raw
-        return self.scanner.get_whois_info_raw(domain)
+    async def get_info_async(self, domain: str, fresh: bool = False) -> WhoisInfo:
+        if self.cache is None:
+            return self._scanned(await self.scanner.get_whois_info_raw_async(domain))
+        info = None if fresh else await asyncio.to_thread(self._cached, domain)
+        if info is None:
+            info = self._scanned(await self.scanner.get_whois_info_raw_async(domain))
+            await asyncio.to_thread(self._store, domain, info)
+        return info
 
 class NmapScannerAdapter:
     def __init__(self):
         # Usando la implementación real de NmapScanner
         self.scanner = NmapScanner() # <--- MODIFICADO
+        self.cache = scanner_cache("nmap")
+
+    @staticmethod
+    def _key(target: str, service_detection: bool) -> str:
+        return f"{target.strip().lower()}|{'A' if service_detection else 'ports'}"
+
+    def _cached_hosts(self, targets: List[str], service_detection: bool) -> Dict[str, NmapHost]:
+        cached = {}
+        for target in targets:
+            found = self.cache.get_entry(self._key(target, service_detection))
+            if found is not None:
+                data, stored_at = found
+                cached[target] = NmapHost(**{**data, "cached": True, "scanned_at": _timestamp(stored_at)})
+        return cached
+
+    def _store_hosts(self, targets: List[str], hosts: List[NmapHost], service_detection: bool) -> None:
+        # scan_targets_raw retorna un host por objetivo, en orden (menos si Nmap no está instalado)
+        for target, host in zip(targets, hosts):
+            if not host.error and not str(host.status or "").startswith("error"):
+                data = _host_to_dict(host)
+                data.pop("cached", None)
+                data.pop("scanned_at", None)
+                self.cache.set(self._key(target, service_detection), data)
+
+    @staticmethod
+    def _scanned(hosts: List[NmapHost]) -> List[NmapHost]:
+        scanned_at = _timestamp()
+        for host in hosts:
+            host.scanned_at = scanned_at
+        return hosts
+
+    @staticmethod
+    def _merge(targets: List[str], cached: Dict[str, NmapHost], missing: List[str], scanned: List[NmapHost]) -> List[NmapHost]:
+        by_target = {**dict(zip(missing, scanned)), **cached}
+        return [by_target[target] for target in targets if target in by_target]
+
+    def scan(self, targets: List[str], service_detection: bool = True, fresh: bool = False) -> List[NmapHost]:
+        # 'fresh' escanea todos los objetivos sin mirar la caché (y la actualiza con el resultado)
+        if self.cache is None:
+            # Asume que tu clase NmapScanner real tiene un método scan_targets_raw
+            return self._scanned(self.scanner.scan_targets_raw(targets, service_detection))
+        cached = {} if fresh else self._cached_hosts(targets, service_detection)
+        missing = [target for target in targets if target not in cached]
+        scanned = self._scanned(self.scanner.scan_targets_raw(missing, service_detection)) if missing else []
+        self._store_hosts(missing, scanned, service_detection)
+        return self._merge(targets, cached, missing, scanned)
 
-    def scan(self, targets: List[str]) -> List[NmapHost]:
-        # Asume que tu clase NmapScanner real tiene un método scan_targets_raw
-        return self.scanner.scan_targets_raw(targets)
\ No newline at end of file
+    async def scan_async(self, targets: List[str], service_detection: bool = True, fresh: bool = False) -> List[NmapHost]:
+        if self.cache is None:
+            return self._scanned(await self.scanner.scan_targets_raw_async(targets, service_detection))
+        cached = {} if fresh else await asyncio.to_thread(self._cached_hosts, targets, service_detection)
+        missing = [target for target in targets if target not in cached]
+        scanned = self._scanned(await self.scanner.scan_targets_raw_async(missing, service_detection)) if missing else []
+        await asyncio.to_thread(self._store_hosts, missing, scanned, service_detection)
+        return self._merge(targets, cached, missing, scanned)
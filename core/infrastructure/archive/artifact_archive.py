@@ -0,0 +1,380 @@
+# security_api/core/infrastructure/archive/artifact_archive.py
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl  # Bloqueo entre procesos (POSIX); sin él solo se protege el propio proceso
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+ARTIFACT_ARCHIVE_ENABLED = os.getenv('ARTIFACT_ARCHIVE_ENABLED', 'true').lower() in ("1", "true", "yes")
+# Retención: se borran segmentos cerrados completos sin escrituras en este número de días y, si el
+# archivo sigue ocupando más de ARTIFACT_MAX_BYTES, los más antiguos. 0 desactiva cada límite.
+ARTIFACT_RETENTION_DAYS = float(os.getenv('ARTIFACT_RETENTION_DAYS', '30'))
+ARTIFACT_MAX_BYTES = int(os.getenv('ARTIFACT_MAX_BYTES', str(2 * 1024 * 1024 * 1024)))
+
+# Cabecera de cada registro en un segmento: marca, longitud de los metadatos, longitud comprimida,
+# longitud original y CRC32 del contenido original. Permite reconstruir el índice desde los segmentos.
+RECORD_MAGIC = b"ARC1"
+RECORD_HEADER = struct.Struct(">4sIIII")
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".seg"
+
+
+class ArtifactNotFound(KeyError):
+    pass
+
+
+class ArtifactArchive:
+    """
+    Archivo de artefactos en bruto (XML de Nmap, transcripciones de DeepSeek...) de solo escritura al final.
+
+    - Cada artefacto se comprime con zlib y se añade al segmento actual; al superar 'segment_max_bytes'
+      se abre un segmento nuevo. Los segmentos cerrados no se vuelven a modificar.
+    - Un índice SQLite (WAL) guarda por artefacto su segmento, offset y longitud, junto con el tipo,
+      la clave (objetivo, dominio...) y metadatos, para buscarlos sin recorrer los segmentos.
+    - La lectura proyecta el segmento en memoria (mmap) y descomprime solo el rango del artefacto.
+    - La retención borra segmentos cerrados completos (por antigüedad y por tamaño total) al abrir
+      uno nuevo; el segmento en curso nunca se borra.
+    """
+
+    def __init__(self, root: Optional[str] = None, segment_max_bytes: Optional[int] = None,
+                 compression_level: Optional[int] = None, retention_days: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        self.root = root or os.getenv('ARTIFACT_ARCHIVE_PATH', '/tmp/artifact_archive')
+        self.segment_max_bytes = segment_max_bytes or int(os.getenv('ARTIFACT_SEGMENT_MAX_BYTES', str(64 * 1024 * 1024)))
+        self.compression_level = (compression_level if compression_level is not None
+                                  else int(os.getenv('ARTIFACT_COMPRESSION_LEVEL', '6')))
+        self.retention_days = retention_days if retention_days is not None else ARTIFACT_RETENTION_DAYS
+        self.max_bytes = max_bytes if max_bytes is not None else ARTIFACT_MAX_BYTES
+        self.index_path = os.path.join(self.root, "index.sqlite3")
+        self._lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._maps_lock = threading.Lock()
+
+    # --- Índice ---
+    def _connect(self) -> sqlite3.Connection:
+        self._initialize()
+        return sqlite3.connect(self.index_path, timeout=10, isolation_level=None)
+
+    def _initialize(self) -> None:
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    os.makedirs(self.root, exist_ok=True)
+                    conn = sqlite3.connect(self.index_path, timeout=10, isolation_level=None)
+                    try:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS artifacts ("
+                            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, key TEXT NOT NULL,"
+                            " segment TEXT NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL,"
+                            " raw_length INTEGER NOT NULL, crc32 INTEGER NOT NULL,"
+                            " created_at REAL NOT NULL, meta TEXT NOT NULL)"
+                        )
+                        conn.execute("CREATE INDEX IF NOT EXISTS artifacts_kind_key ON artifacts (kind, key, created_at)")
+                        conn.execute("CREATE INDEX IF NOT EXISTS artifacts_kind_created ON artifacts (kind, created_at)")
+                    finally:
+                        conn.close()
+                    self._initialized = True
+
+    # --- Escritura ---
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.root, f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}")
+
+    def _segments(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.root)
+                      if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+
+    def _current_segment(self, incoming: int) -> str:
+        """Último segmento, o uno nuevo si el último no admite 'incoming' bytes más."""
+        segments = self._segments()
+        if segments:
+            last = os.path.join(self.root, segments[-1])
+            if os.path.getsize(last) + incoming <= self.segment_max_bytes or os.path.getsize(last) == 0:
+                return last
+            number = int(segments[-1][len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1
+        else:
+            number = 1
+        return self._segment_path(number)
+
+    def put(self, kind: str, key: str, data: bytes, meta: Optional[Dict[str, Any]] = None) -> str:
+        """Añade un artefacto y retorna su id."""
+        self._initialize()
+        artifact_id = uuid.uuid4().hex
+        created_at = time.time()
+        compressed = zlib.compress(data, self.compression_level)
+        crc = zlib.crc32(data)
+        record_meta = json.dumps({"id": artifact_id, "kind": kind, "key": key, "created_at": created_at,
+                                  "meta": meta or {}}, separators=(",", ":")).encode("utf-8")
+        header = RECORD_HEADER.pack(RECORD_MAGIC, len(record_meta), len(compressed), len(data), crc)
+        record = header + record_meta + compressed
+
+        with self._lock, open(os.path.join(self.root, ".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)  # Otros procesos escriben en los mismos segmentos
+            try:
+                segment_path = self._current_segment(len(record))
+                new_segment = not os.path.exists(segment_path)
+                with open(segment_path, "ab") as segment:
+                    start = segment.seek(0, os.SEEK_END)
+                    segment.write(record)
+                offset = start + len(header) + len(record_meta)
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        "INSERT INTO artifacts (id, kind, key, segment, offset, length, raw_length, crc32, created_at, meta)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (artifact_id, kind, key, os.path.basename(segment_path), offset, len(compressed), len(data), crc,
+                         created_at, json.dumps(meta or {}))
+                    )
+                finally:
+                    conn.close()
+                if new_segment:
+                    self._apply_retention()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return artifact_id
+
+    # --- Retención ---
+    def _expired_segments(self, now: float) -> List[str]:
+        """Segmentos cerrados a borrar: sin escrituras desde hace más de la retención y, por tamaño, los más antiguos."""
+        closed = [(name, os.stat(os.path.join(self.root, name))) for name in self._segments()[:-1]]
+        expired = []
+        if self.retention_days > 0:
+            cutoff = now - self.retention_days * 86400
+            expired = [name for name, stat in closed if stat.st_mtime < cutoff]
+        if self.max_bytes > 0:
+            total = sum(os.path.getsize(os.path.join(self.root, name)) for name in self._segments())
+            total -= sum(stat.st_size for name, stat in closed if name in expired)
+            for name, stat in closed:
+                if total <= self.max_bytes:
+                    break
+                if name not in expired:
+                    expired.append(name)
+                    total -= stat.st_size
+        return expired
+
+    def _apply_retention(self) -> List[str]:
+        """Borra los segmentos caducados y sus entradas del índice (con el bloqueo de escritura tomado)."""
+        expired = self._expired_segments(time.time())
+        if not expired:
+            return []
+        conn = self._connect()
+        try:
+            conn.executemany("DELETE FROM artifacts WHERE segment = ?", [(name,) for name in expired])
+        finally:
+            conn.close()
+        with self._maps_lock:
+            for name in expired:
+                mapped = self._maps.pop(name, None)
+                if mapped is not None:
+                    mapped.close()
+        for name in expired:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+        logging.info(f"Archivo de artefactos: retención aplicada, {len(expired)} segmentos borrados ({', '.join(expired)}).")
+        return expired
+
+    def prune(self) -> List[str]:
+        """Aplica la retención ahora (normalmente se aplica sola al abrir un segmento). Retorna los segmentos borrados."""
+        self._initialize()
+        with self._lock, open(os.path.join(self.root, ".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                return self._apply_retention()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # --- Lectura ---
+    def _slice(self, segment: str, offset: int, length: int) -> bytes:
+        """
+        Copia un rango del segmento desde su proyección en memoria (solo se leen esas páginas). La
+        proyección se reutiliza entre lecturas y se renueva si el segmento creció más allá de lo proyectado.
+        """
+        with self._maps_lock:
+            mapped = self._maps.get(segment)
+            if mapped is None or len(mapped) < offset + length:
+                if mapped is not None:
+                    mapped.close()
+                self._maps.pop(segment, None)
+                try:
+                    with open(os.path.join(self.root, segment), "rb") as f:
+                        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except FileNotFoundError:
+                    raise ArtifactNotFound(f"{segment} (borrado por la retención)")
+                self._maps[segment] = mapped
+            return mapped[offset:offset + length]
+
+    def _read(self, segment: str, offset: int, length: int, crc: int) -> bytes:
+        data = zlib.decompress(self._slice(segment, offset, length))
+        if zlib.crc32(data) != crc:
+            raise ValueError(f"Artefacto corrupto en {segment}@{offset} (CRC no coincide).")
+        return data
+
+    def get(self, artifact_id: str) -> bytes:
+        entry = self.describe(artifact_id)
+        if entry is None:
+            raise ArtifactNotFound(artifact_id)
+        return self._read(entry["segment"], entry["offset"], entry["length"], entry["crc32"])
+
+    @staticmethod
+    def _entry(row: Tuple) -> Dict[str, Any]:
+        artifact_id, kind, key, segment, offset, length, raw_length, crc, created_at, meta = row
+        return {"id": artifact_id, "kind": kind, "key": key, "segment": segment, "offset": offset, "length": length,
+                "raw_length": raw_length, "crc32": crc, "created_at": created_at, "meta": json.loads(meta)}
+
+    _COLUMNS = "id, kind, key, segment, offset, length, raw_length, crc32, created_at, meta"
+
+    def describe(self, artifact_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute(f"SELECT {self._COLUMNS} FROM artifacts WHERE id = ?", (artifact_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._entry(row) if row else None
+
+    def find(self, kind: Optional[str] = None, key: Optional[str] = None, since: Optional[float] = None,
+             limit: int = 100) -> List[Dict[str, Any]]:
+        """Artefactos más recientes primero, filtrados por tipo, clave y fecha (epoch)."""
+        clauses, params = [], []
+        for column, op, value in (("kind", "=", kind), ("key", "=", key), ("created_at", ">=", since)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT {self._COLUMNS} FROM artifacts{where} ORDER BY created_at DESC LIMIT ?",
+                                (*params, limit)).fetchall()
+        finally:
+            conn.close()
+        return [self._entry(row) for row in rows]
+
+    def iter_artifacts(self, kind: str, since: Optional[float] = None) -> Iterator[Tuple[Dict[str, Any], bytes]]:
+        """Recorre los artefactos de un tipo en orden físico (segmento, offset): lectura secuencial para re-procesarlos."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT {self._COLUMNS} FROM artifacts WHERE kind = ? AND created_at >= ? ORDER BY segment, offset",
+                (kind, since or 0)).fetchall()
+        finally:
+            conn.close()
+        for row in rows:
+            entry = self._entry(row)
+            yield entry, self._read(entry["segment"], entry["offset"], entry["length"], entry["crc32"])
+
+    def rebuild_index(self) -> int:
+        """Vuelve a indexar todos los segmentos (p. ej. si se perdió el índice). Retorna los artefactos indexados."""
+        conn = self._connect()
+        indexed = 0
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM artifacts")
+            for segment in self._segments():
+                with open(os.path.join(self.root, segment), "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    if not size:
+                        continue
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        position = 0
+                        while position + RECORD_HEADER.size <= size:
+                            magic, meta_len, length, raw_length, crc = RECORD_HEADER.unpack_from(mapped, position)
+                            if magic != RECORD_MAGIC:
+                                logging.error(f"Archivo de artefactos: registro inválido en {segment}@{position}; se ignora el resto.")
+                                break
+                            record = json.loads(mapped[position + RECORD_HEADER.size:position + RECORD_HEADER.size + meta_len])
+                            offset = position + RECORD_HEADER.size + meta_len
+                            if offset + length > size:
+                                break  # Registro incompleto (escritura interrumpida)
+                            conn.execute(
+                                "INSERT OR REPLACE INTO artifacts (id, kind, key, segment, offset, length, raw_length, crc32, created_at, meta)"
+                                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                (record["id"], record["kind"], record["key"], segment, offset, length, raw_length, crc,
+                                 record["created_at"], json.dumps(record.get("meta") or {}))
+                            )
+                            indexed += 1
+                            position = offset + length
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return indexed
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT kind, COUNT(*), SUM(length), SUM(raw_length) FROM artifacts GROUP BY kind").fetchall()
+        finally:
+            conn.close()
+        kinds = {kind: {"artifacts": count, "stored_bytes": stored, "raw_bytes": raw,
+                        "ratio": round(stored / raw, 4) if raw else None}
+                 for kind, count, stored, raw in rows}
+        segments = self._segments()
+        return {
+            "root": self.root,
+            "segments": len(segments),
+            "segment_bytes": sum(os.path.getsize(os.path.join(self.root, name)) for name in segments),
+            "retention_days": self.retention_days,
+            "max_bytes": self.max_bytes,
+            "kinds": kinds,
+        }
+
+    def mapped_segments(self) -> Dict[str, int]:
+        """Segmentos proyectados en memoria por este proceso (los mmap se reutilizan entre lecturas)."""
+        with self._maps_lock:
+            return {"segments": len(self._maps), "bytes": sum(len(mapped) for mapped in self._maps.values())}
+
+    def close(self) -> None:
+        with self._maps_lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+
+
+_archive_instance: Optional[ArtifactArchive] = None
+_archive_instance_lock = threading.Lock()
+
+
+def get_artifact_archive() -> ArtifactArchive:
+    """Instancia compartida del archivo, configurada desde las variables de entorno."""
+    global _archive_instance
+    if _archive_instance is None:
+        with _archive_instance_lock:
+            if _archive_instance is None:
+                _archive_instance = ArtifactArchive()
+    return _archive_instance
+
+
+def archive_artifact(kind: str, key: str, data: bytes, meta: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Guarda un artefacto en el archivo compartido y retorna su id. Un fallo al archivar se registra
+    pero no interrumpe el escaneo o la consulta que lo produjo.
+    """
+    if not ARTIFACT_ARCHIVE_ENABLED or not data:
+        return None
+    try:
+        return get_artifact_archive().put(kind, key, data, meta)
+    except (OSError, sqlite3.Error) as e:
+        logging.error(f"No se pudo archivar el artefacto '{kind}' de {key}: {e}")
+        return None
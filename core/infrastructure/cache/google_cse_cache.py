@@ -0,0 +1,171 @@
+# security_api/core/infrastructure/cache/google_cse_cache.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from core.infrastructure.cache.tiered_cache import TieredCache, get_tiered_cache
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+try:
+    from zoneinfo import ZoneInfo
+    # Google reinicia la cuota diaria de Custom Search a medianoche, hora del Pacífico.
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:  # zoneinfo sin base de datos tz (p. ej. Windows sin tzdata)
+    QUOTA_TIMEZONE = timezone.utc
+
+
+class GoogleCseCache:
+    """
+    Caché de respuestas de la API Custom Search, con contabilidad de cuota diaria.
+
+    - Las respuestas se guardan por (motor, query, start, lang) en la caché compartida de escáneres
+      (TieredCache, espacio 'google_cse') y se consideran frescas durante 'ttl' segundos.
+    - Las entradas caducadas se conservan (hasta 7 veces el TTL) para servirlas si la cuota del día está agotada.
+    - La cuota se guarda en su propia base de datos SQLite, compartida por todos los procesos que usen el mismo fichero.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl: Optional[int] = None,
+                 daily_quota: Optional[int] = None, quota_reserve: Optional[int] = None):
+        self.db_path = db_path or os.getenv('GOOGLE_CSE_CACHE_PATH', '/tmp/google_cse_cache.sqlite3')
+        self.ttl = ttl if ttl is not None else int(os.getenv('GOOGLE_CSE_CACHE_TTL', '86400'))
+        self.daily_quota = daily_quota if daily_quota is not None else int(os.getenv('GOOGLE_CSE_DAILY_QUOTA', '100'))
+        # Llamadas que se dejan sin consumir como margen (p. ej. para uso manual en la consola de Google)
+        self.quota_reserve = quota_reserve if quota_reserve is not None else int(os.getenv('GOOGLE_CSE_QUOTA_RESERVE', '0'))
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._responses: Optional[TieredCache] = None
+
+    @property
+    def responses(self) -> TieredCache:
+        if self._responses is None:
+            self._responses = get_tiered_cache(
+                "google_cse", self.ttl, stale_retention=self.ttl * 6,
+                max_entries=int(os.getenv('GOOGLE_CSE_CACHE_MEMORY_ENTRIES', '256')),
+                shared_max_entries=int(os.getenv('GOOGLE_CSE_CACHE_MAX_ENTRIES', '20000')),
+            )
+        return self._responses
+
+    @staticmethod
+    def _key(search_engine_id: str, query: str, start: int, lang: str) -> str:
+        # El motor (cx) forma parte de la clave: otro motor devuelve otros resultados para la misma consulta
+        return json.dumps([search_engine_id, query, start, lang], ensure_ascii=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("CREATE TABLE IF NOT EXISTS quota (day TEXT PRIMARY KEY, calls INTEGER NOT NULL)")
+                    conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+                    self._initialized = True
+        return conn
+
+    @staticmethod
+    def _quota_day() -> str:
+        return datetime.now(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+    @staticmethod
+    def _incr_stat(conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO stats (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def get(self, search_engine_id: str, query: str, start: int, lang: str, allow_stale: bool = False) -> Optional[Dict]:
+        """Retorna la respuesta cacheada si está fresca (o si 'allow_stale'), o None."""
+        return self.responses.get(self._key(search_engine_id, query, start, lang), allow_stale=allow_stale)
+
+    def set(self, search_engine_id: str, query: str, start: int, lang: str, payload: Dict) -> None:
+        self.responses.set(self._key(search_engine_id, query, start, lang), payload)
+
+    def try_consume_quota(self) -> bool:
+        """
+        Reserva una llamada de la cuota del día. Retorna False (y no consume) si la cuota
+        disponible, descontando el margen, ya está agotada.
+        """
+        limit = self.daily_quota - self.quota_reserve
+        day = self._quota_day()
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT calls FROM quota WHERE day = ?", (day,)).fetchone()
+                calls = row[0] if row else 0
+                if calls >= limit:
+                    self._incr_stat(conn, "quota_refused")
+                    conn.execute("COMMIT")
+                    return False
+                conn.execute(
+                    "INSERT INTO quota (day, calls) VALUES (?, 1) ON CONFLICT(day) DO UPDATE SET calls = calls + 1",
+                    (day,)
+                )
+                conn.execute("COMMIT")
+                return True
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            # Si la contabilidad falla no bloqueamos la búsqueda; solo lo registramos.
+            logging.error(f"Error contabilizando la cuota de Google CSE ({self.db_path}): {e}")
+            return True
+
+    def purge_expired(self, max_age: Optional[int] = None) -> int:
+        """Elimina respuestas más antiguas que 'max_age' segundos (por defecto 7 veces el TTL)."""
+        removed = self.responses.purge(max_age)
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM quota WHERE day < ?", (self._quota_day(),))
+        finally:
+            conn.close()
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        day = self._quota_day()
+        conn = self._connect()
+        try:
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            row = conn.execute("SELECT calls FROM quota WHERE day = ?", (day,)).fetchone()
+        finally:
+            conn.close()
+        calls_today = row[0] if row else 0
+        cache = self.responses.stats()
+        return {
+            "cache": {
+                "entries": cache["entries_shared"],
+                "entries_in_memory": cache["entries_in_memory"],
+                "ttl_seconds": self.ttl,
+                "hits": cache["hits"],
+                "misses": cache["misses"],
+                "stale_served": cache["stale_served"],
+                "hit_ratio": cache["hit_ratio"],
+            },
+            "quota": {
+                "day": day,
+                "daily_quota": self.daily_quota,
+                "reserve": self.quota_reserve,
+                "calls_today": calls_today,
+                "remaining_today": max(0, self.daily_quota - self.quota_reserve - calls_today),
+                "refused": counters.get("quota_refused", 0),
+            },
+        }
+
+
+_cache_instance: Optional[GoogleCseCache] = None
+_cache_instance_lock = threading.Lock()
+
+def get_google_cse_cache() -> GoogleCseCache:
+    """Instancia compartida de la caché, configurada desde las variables de entorno."""
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_instance_lock:
+            if _cache_instance is None:
+                _cache_instance = GoogleCseCache()
+    return _cache_instance
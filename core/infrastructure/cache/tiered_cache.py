@@ -0,0 +1,290 @@
+# security_api/core/infrastructure/cache/tiered_cache.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Cada cuántas operaciones un proceso vuelca sus contadores y revisa el tamaño de su espacio en SQLite
+STATS_FLUSH_EVERY = 50
+EVICT_EVERY = 100
+
+
+class SharedCacheStore:
+    """
+    Nivel compartido de la caché: un fichero SQLite en modo WAL que comparten todos los procesos del
+    nodo (workers de gunicorn, scan_worker, monitor...) y que sobrevive a los reinicios. Las entradas
+    se agrupan por espacio de nombres (un escáner o servicio) y guardan el valor en JSON.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv('SCANNER_CACHE_PATH', '/tmp/scanner_cache.sqlite3')
+        self._local = threading.local()  # Una conexión por hilo
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS cache_entries ("
+                        " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                        " stored_at REAL NOT NULL, expires_at REAL NOT NULL,"
+                        " PRIMARY KEY (namespace, key))"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS cache_entries_age ON cache_entries (namespace, stored_at)")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS cache_stats ("
+                        " namespace TEXT NOT NULL, name TEXT NOT NULL, value INTEGER NOT NULL,"
+                        " PRIMARY KEY (namespace, name))"
+                    )
+                    self._initialized = True
+        conn.execute("PRAGMA synchronous=NORMAL")  # Suficiente para una caché con WAL
+        self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[float, float, str]]:
+        return self._connect().execute(
+            "SELECT stored_at, expires_at, value FROM cache_entries WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+
+    def set(self, namespace: str, key: str, value: str, stored_at: float, expires_at: float) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, stored_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, value, stored_at, expires_at)
+        )
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._connect().execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def evict(self, namespace: str, max_entries: int, drop_before: float) -> int:
+        """Borra las entradas caducadas hace más de lo retenido y, si sobran, las más antiguas."""
+        conn = self._connect()
+        removed = conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?",
+                               (namespace, drop_before)).rowcount
+        excess = self.count(namespace) - max_entries
+        if excess > 0:
+            removed += conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache_entries WHERE namespace = ? ORDER BY stored_at LIMIT ?)",
+                (namespace, namespace, excess)
+            ).rowcount
+        return removed
+
+    def count(self, namespace: str) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    def add_stats(self, namespace: str, counters: Dict[str, int]) -> None:
+        conn = self._connect()
+        conn.executemany(
+            "INSERT INTO cache_stats (namespace, name, value) VALUES (?, ?, ?)"
+            " ON CONFLICT(namespace, name) DO UPDATE SET value = value + excluded.value",
+            [(namespace, name, value) for name, value in counters.items() if value]
+        )
+
+    def stats(self, namespace: str) -> Dict[str, int]:
+        return dict(self._connect().execute("SELECT name, value FROM cache_stats WHERE namespace = ?", (namespace,)).fetchall())
+
+
+class TieredCache:
+    """
+    Caché en dos niveles para un espacio de nombres:
+
+    - Nivel 1: LRU en memoria del proceso (como mucho 'max_entries'); evita ir a SQLite en los aciertos repetidos.
+    - Nivel 2: SharedCacheStore, compartido por los procesos del nodo y persistente (como mucho 'shared_max_entries').
+
+    Las entradas son frescas durante 'ttl' segundos. Con 'stale_retention' se conservan ese tiempo más
+    para servirlas caducadas si se piden con allow_stale (p. ej. sin cuota o con el servicio caído).
+    Los valores se guardan en JSON: lo que se lee es siempre una copia nueva. Si SQLite falla, la caché
+    sigue funcionando solo en memoria. Los contadores (aciertos por nivel, fallos...) se suman en SQLite,
+    así stats() refleja a todos los procesos.
+    """
+
+    def __init__(self, namespace: str, ttl: int, max_entries: int = 256, shared_max_entries: int = 10000,
+                 stale_retention: int = 0, store: Optional[SharedCacheStore] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.shared_max_entries = shared_max_entries
+        self.stale_retention = stale_retention
+        self.store = store or get_shared_cache_store()
+        self._entries: "OrderedDict[str, Tuple[float, float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, int] = {}
+        self._operations = 0
+        self._sets = 0
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._pending[name] = self._pending.get(name, 0) + 1
+            self._operations += 1
+            flush = self._operations >= STATS_FLUSH_EVERY
+        if flush:
+            self._flush_stats()
+
+    def _flush_stats(self) -> None:
+        with self._lock:
+            pending, self._pending, self._operations = self._pending, {}, 0
+        try:
+            self.store.add_stats(self.namespace, pending)
+        except sqlite3.Error as e:
+            logging.warning(f"Caché '{self.namespace}': no se pudieron guardar las estadísticas: {e}")
+
+    def _remember(self, key: str, entry: Tuple[float, float, str]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[Any]:
+        """Valor fresco de 'key' (o caducado dentro de la retención, si 'allow_stale'), o None."""
+        found = self.get_entry(key, allow_stale)
+        return found[0] if found is not None else None
+
+    def get_entry(self, key: str, allow_stale: bool = False) -> Optional[Tuple[Any, float]]:
+        """Como get, pero retorna (valor, momento en que se guardó) para indicar su antigüedad."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        level = "l1"
+        if entry is None or entry[1] <= now:
+            # Otro proceso puede haber refrescado la entrada en el nivel compartido
+            try:
+                shared = self.store.get(self.namespace, key)
+            except sqlite3.Error as e:
+                logging.warning(f"Caché '{self.namespace}': error leyendo SQLite: {e}")
+                shared = None
+            if shared is not None and (entry is None or shared[0] >= entry[0]):
+                entry, level = shared, "l2"
+                self._remember(key, entry)
+        if entry is None or entry[1] + (self.stale_retention if allow_stale else 0) <= now:
+            if not allow_stale:
+                self._count("misses")
+            return None
+        self._count("stale_served" if entry[1] <= now else f"{level}_hits")
+        return json.loads(entry[2]), entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        stored_at = time.time()
+        entry = (stored_at, stored_at + (self.ttl if ttl is None else ttl),
+                 json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str))
+        self._remember(key, entry)
+        with self._lock:
+            self._sets += 1
+            evict = self._sets % EVICT_EVERY == 0
+        try:
+            self.store.set(self.namespace, key, entry[2], *entry[:2])
+            if evict:
+                self.purge()
+        except sqlite3.Error as e:
+            logging.warning(f"Caché '{self.namespace}': error escribiendo en SQLite: {e}")
+        self._count("sets")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        try:
+            self.store.delete(self.namespace, key)
+        except sqlite3.Error as e:
+            logging.warning(f"Caché '{self.namespace}': error borrando en SQLite: {e}")
+
+    def purge(self, max_age: Optional[int] = None) -> int:
+        """
+        Limpia el nivel compartido: lo caducado hace más de la retención (o almacenado hace más de
+        'max_age' segundos) y, por encima de 'shared_max_entries', lo más antiguo.
+        """
+        now = time.time()
+        drop_before = now - self.stale_retention if max_age is None else now - max_age + self.ttl
+        removed = self.store.evict(self.namespace, self.shared_max_entries, drop_before)
+        if removed:
+            self._count_evictions(removed)
+        return removed
+
+    def _count_evictions(self, removed: int) -> None:
+        with self._lock:
+            self._pending["evictions"] = self._pending.get("evictions", 0) + removed
+
+    def stats(self) -> Dict[str, Any]:
+        self._flush_stats()
+        try:
+            counters = self.store.stats(self.namespace)
+            shared_entries = self.store.count(self.namespace)
+        except sqlite3.Error as e:
+            logging.warning(f"Caché '{self.namespace}': no se pudieron leer las estadísticas: {e}")
+            counters, shared_entries = {}, None
+        hits = counters.get("l1_hits", 0) + counters.get("l2_hits", 0)
+        lookups = hits + counters.get("misses", 0)
+        with self._lock:
+            memory_entries = len(self._entries)
+        return {
+            "namespace": self.namespace,
+            "ttl_seconds": self.ttl,
+            "entries_in_memory": memory_entries,
+            "max_entries_in_memory": self.max_entries,
+            "entries_shared": shared_entries,
+            "max_entries_shared": self.shared_max_entries,
+            "hits": hits,
+            "l1_hits": counters.get("l1_hits", 0),
+            "l2_hits": counters.get("l2_hits", 0),
+            "misses": counters.get("misses", 0),
+            "stale_served": counters.get("stale_served", 0),
+            "sets": counters.get("sets", 0),
+            "evictions": counters.get("evictions", 0),
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        }
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Ocupación del nivel en memoria de este proceso (sin consultar SQLite)."""
+        with self._lock:
+            entries = len(self._entries)
+            value_bytes = sum(len(entry[2]) for entry in self._entries.values())
+        return {"namespace": self.namespace, "entries": entries, "max_entries": self.max_entries,
+                "value_chars": value_bytes}
+
+
+_store_instance: Optional[SharedCacheStore] = None
+_caches: Dict[str, TieredCache] = {}
+_registry_lock = threading.Lock()
+
+
+def get_shared_cache_store() -> SharedCacheStore:
+    global _store_instance
+    if _store_instance is None:
+        with _registry_lock:
+            if _store_instance is None:
+                _store_instance = SharedCacheStore()
+    return _store_instance
+
+
+def get_tiered_cache(namespace: str, ttl: int, **kwargs) -> TieredCache:
+    """Caché compartida de un espacio de nombres (una instancia por proceso); la configuración vale la de la primera llamada."""
+    cache = _caches.get(namespace)
+    if cache is None:
+        store = get_shared_cache_store()
+        with _registry_lock:
+            cache = _caches.get(namespace)
+            if cache is None:
+                cache = _caches[namespace] = TieredCache(namespace, ttl, store=store, **kwargs)
+    return cache
+
+
+def caches_memory_usage() -> List[Dict[str, Any]]:
+    """Ocupación en memoria de las cachés abiertas en este proceso."""
+    with _registry_lock:
+        caches = list(_caches.values())
+    return [cache.memory_usage() for cache in caches]
@@ -0,0 +1,41 @@
+# security_api/core/infrastructure/http/async_client.py
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from .client import DEFAULT_CONNECT_TIMEOUT, DEFAULT_POOL_MAXSIZE, DEFAULT_READ_TIMEOUT
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Un cliente por bucle de eventos: un AsyncClient no puede compartirse entre bucles distintos.
+_clients: Dict[int, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Cliente httpx compartido (keep-alive y pool de conexiones) para el bucle de eventos actual."""
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(id(loop))
+    if entry is not None and entry[0] is loop:
+        return entry[1]
+    # Bajo WSGI cada petición async se ejecuta en un bucle nuevo; se descartan los de bucles cerrados.
+    for key, (other_loop, _) in list(_clients.items()):
+        if other_loop.is_closed():
+            _clients.pop(key, None)
+    client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=DEFAULT_POOL_MAXSIZE, max_keepalive_connections=DEFAULT_POOL_MAXSIZE),
+        timeout=httpx.Timeout(DEFAULT_READ_TIMEOUT, connect=DEFAULT_CONNECT_TIMEOUT),
+    )
+    _clients[id(loop)] = (loop, client)
+    return client
+
+
+async def async_http_request(method: str, url: str, connect_timeout: Optional[float] = None,
+                             read_timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+    """Equivalente asíncrono de http_request: mismos timeouts separados de conexión y lectura."""
+    timeout = httpx.Timeout(
+        read_timeout if read_timeout is not None else DEFAULT_READ_TIMEOUT,
+        connect=connect_timeout if connect_timeout is not None else DEFAULT_CONNECT_TIMEOUT,
+    )
+    return await get_async_client().request(method, url, timeout=timeout, **kwargs)
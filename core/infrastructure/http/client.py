@@ -0,0 +1,78 @@
+# security_api/core/infrastructure/http/client.py
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Valores por defecto; se pueden ajustar por variables de entorno sin tocar el código.
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+DEFAULT_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+DEFAULT_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '4'))
+DEFAULT_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '20'))
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def get_session(url: str, pool_connections: Optional[int] = None, pool_maxsize: Optional[int] = None) -> requests.Session:
+    """
+    Retorna la sesión compartida (con keep-alive y pool de conexiones) para el host de 'url'.
+    La sesión se crea en la primera llamada; los tamaños de pool solo se aplican en ese momento.
+    """
+    key = _host_key(url)
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections or DEFAULT_POOL_CONNECTIONS,
+                pool_maxsize=pool_maxsize or DEFAULT_POOL_MAXSIZE,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[key] = session
+            logging.info(f"Sesión HTTP creada para {key} (pool_maxsize={pool_maxsize or DEFAULT_POOL_MAXSIZE})")
+    return session
+
+
+def build_timeout(connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None) -> Tuple[float, float]:
+    """Timeout (conexión, lectura) en el formato que espera requests."""
+    return (
+        connect_timeout if connect_timeout is not None else DEFAULT_CONNECT_TIMEOUT,
+        read_timeout if read_timeout is not None else DEFAULT_READ_TIMEOUT,
+    )
+
+
+def http_request(method: str, url: str, connect_timeout: Optional[float] = None,
+                 read_timeout: Optional[float] = None, **kwargs) -> requests.Response:
+    """
+    Ejecuta una petición HTTP usando la sesión compartida del host.
+    Acepta los mismos argumentos que requests (params, json, headers, stream...), salvo 'timeout',
+    que se construye a partir de 'connect_timeout' y 'read_timeout'.
+    """
+    session = get_session(url)
+    return session.request(method, url, timeout=build_timeout(connect_timeout, read_timeout), **kwargs)
+
+
+def close_all_sessions() -> None:
+    """Cierra todas las sesiones y sus conexiones (útil al apagar el proceso o en pruebas)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,214 @@
+# security_api/core/infrastructure/http/resilience.py
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Se lanza cuando el circuito de un servicio externo está abierto y la llamada se rechaza sin intentarla."""
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Circuito '{name}' abierto; reintentar en {retry_after:.0f} s.")
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker para un servicio externo.
+
+    - closed: las llamadas pasan. Cada fallo (excepción o llamada más lenta que 'slow_call_seconds')
+      suma uno; 'failure_threshold' fallos consecutivos abren el circuito.
+    - open: las llamadas fallan al instante con CircuitOpenError durante 'reset_timeout' segundos.
+    - half_open: se deja pasar una llamada de prueba; si va bien se cierra el circuito, si falla se reabre.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 slow_call_seconds: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+        self._last_error: Optional[str] = None
+
+    def _retry_after(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if self._state == STATE_OPEN:
+                if self._retry_after() > 0:
+                    self._stats["rejected"] += 1
+                    raise CircuitOpenError(self.name, self._retry_after())
+                self._state = STATE_HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == STATE_HALF_OPEN:
+                if self._probe_in_flight:
+                    self._stats["rejected"] += 1
+                    raise CircuitOpenError(self.name, self.reset_timeout)
+                self._probe_in_flight = True
+            self._stats["calls"] += 1
+
+    def _open(self) -> None:
+        self._state = STATE_OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._stats["opened"] += 1
+        logging.warning(f"Circuito '{self.name}' abierto tras {self._consecutive_failures} fallos consecutivos. Último error: {self._last_error}")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != STATE_CLOSED:
+                logging.info(f"Circuito '{self.name}' cerrado: el servicio vuelve a responder.")
+            self._state = STATE_CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, error: str) -> None:
+        with self._lock:
+            self._stats["failures"] += 1
+            self._consecutive_failures += 1
+            self._last_error = error
+            if self._state == STATE_HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def _after_call(self, started: float) -> None:
+        elapsed = time.monotonic() - started
+        if self.slow_call_seconds is not None and elapsed > self.slow_call_seconds:
+            with self._lock:
+                self._stats["slow_calls"] += 1
+            self.record_failure(f"Llamada lenta ({elapsed:.1f} s > {self.slow_call_seconds:.1f} s)")
+        else:
+            self.record_success()
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Ejecuta 'func' protegida por el circuito. Las excepciones de 'func' se propagan tras contabilizarse."""
+        self._before_call()
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(f"{type(e).__name__}: {e}")
+            raise
+        self._after_call(started)
+        return result
+
+    async def call_async(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Igual que call, para una función asíncrona."""
+        self._before_call()
+        started = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(f"{type(e).__name__}: {e}")
+            raise
+        except BaseException:
+            # Cancelación de la tarea: no es un fallo del servicio, pero libera la llamada de prueba.
+            with self._lock:
+                self._probe_in_flight = False
+            raise
+        self._after_call(started)
+        return result
+
+    def is_open(self) -> bool:
+        """True si una llamada ahora mismo sería rechazada (no cambia el estado)."""
+        with self._lock:
+            return self._state == STATE_OPEN and self._retry_after() > 0
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return self._retry_after() if self._state == STATE_OPEN else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._state
+            if state == STATE_OPEN and self._retry_after() <= 0:
+                state = STATE_HALF_OPEN  # La próxima llamada será de prueba
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_seconds": self.reset_timeout,
+                "slow_call_seconds": self.slow_call_seconds,
+                "retry_after_seconds": round(self._retry_after(), 1) if self._state == STATE_OPEN else 0,
+                "last_error": self._last_error,
+                **self._stats,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                slow_call_seconds: Optional[float] = None) -> CircuitBreaker:
+    """
+    Circuito compartido para 'name'. En su primera creación los argumentos se pueden sobrescribir desde
+    el entorno: <NAME>_CB_FAILURES, <NAME>_CB_RESET_SECONDS y <NAME>_CB_SLOW_SECONDS (p. ej. DEEPSEEK_CB_FAILURES).
+    """
+    breaker = _breakers.get(name)
+    if breaker is not None:
+        return breaker
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            prefix = name.upper()
+            slow = os.getenv(f"{prefix}_CB_SLOW_SECONDS")
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv(f"{prefix}_CB_FAILURES", str(failure_threshold))),
+                reset_timeout=float(os.getenv(f"{prefix}_CB_RESET_SECONDS", str(reset_timeout))),
+                slow_call_seconds=float(slow) if slow else slow_call_seconds,
+            )
+            _breakers[name] = breaker
+    return breaker
+
+def breakers_snapshot() -> List[Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.snapshot() for breaker in breakers]
+
+
+_hedge_executor = ThreadPoolExecutor(max_workers=int(os.getenv('HEDGE_MAX_WORKERS', '8')), thread_name_prefix="hedge")
+
+def hedged_call(func: Callable[..., Any], *args, hedge_delay: float, max_attempts: int = 2,
+                can_hedge: Optional[Callable[[], bool]] = None, **kwargs) -> Any:
+    """
+    Ejecuta 'func' y, si no ha terminado tras 'hedge_delay' segundos, lanza una copia en paralelo
+    (hasta 'max_attempts' en total). Devuelve el primer resultado correcto; si todas fallan, relanza
+    la última excepción. Solo debe usarse con llamadas idempotentes: la copia perdedora no se cancela.
+    'can_hedge' permite vetar una copia adicional (p. ej. si no queda cuota).
+    """
+    pending = {_hedge_executor.submit(func, *args, **kwargs)}
+    attempts = 1
+    last_error: Optional[BaseException] = None
+    while pending:
+        timeout = hedge_delay if attempts < max_attempts else None
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is None:
+                return future.result()
+            last_error = error
+        if not done and attempts < max_attempts and (can_hedge is None or can_hedge()):
+            logging.info(f"Petición lenta (> {hedge_delay:.1f} s); lanzando petición de cobertura {attempts + 1}/{max_attempts}.")
+            pending.add(_hedge_executor.submit(func, *args, **kwargs))
+            attempts += 1
+        elif not done:
+            # No se puede cubrir más: esperar sin límite a las que siguen en vuelo.
+            attempts = max_attempts
+    raise last_error
@@ -1,5 +1,7 @@
 # security_apy/core/infrastructure/scanner/dns_scan.py
 import dns.resolver # Solo necesitas dns.resolver para esta clase específica
+import dns.asyncresolver
+import asyncio
 import logging
 from typing import List, Dict, Optional
 # No necesitas importar WhoisInfo, NmapHost, NmapPort aquí si esta clase solo maneja DNS.
@@ -9,6 +11,18 @@ from core.domain.entities import DnsRecord # DnsRecord sí es relevante aquí.
 # Configuración de logging (puede estar en un módulo de configuración central si lo prefieres)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Tipos "virtuales": no son tipos de registro, sino TXT consultados en un subdominio reservado.
+PSEUDO_RECORD_TYPES = {"DMARC": ("_dmarc", "TXT")}
+
+
+def query_for(domain: str, record_type: str):
+    """Nombre y tipo reales a consultar para 'record_type' (p. ej. DMARC -> TXT en _dmarc.<dominio>)."""
+    if record_type in PSEUDO_RECORD_TYPES:
+        prefix, real_type = PSEUDO_RECORD_TYPES[record_type]
+        return f"{prefix}.{domain}", real_type
+    return domain, record_type
+
+
 class DNSScanner:
     def __init__(self):
         self.resolver = dns.resolver.Resolver()
@@ -17,6 +31,7 @@ class DNSScanner:
         """
         Resuelve varios tipos de registros DNS para un dominio dado.
         Retorna un diccionario donde las claves son los tipos de registro y los valores son listas de strings de los registros.
+        Admite también los tipos de PSEUDO_RECORD_TYPES (p. ej. "DMARC").
         """
         # Si no se especifican tipos de registro, usa una lista predeterminada.
         record_types = record_types or ["A", "AAAA", "CNAME", "MX", "NS", "SOA", "TXT"]
@@ -24,7 +39,7 @@ class DNSScanner:
 
         for record_type in record_types:
             try:
-                answers = self.resolver.resolve(domain, record_type)
+                answers = self.resolver.resolve(*query_for(domain, record_type))
                 # Convierte cada respuesta a string. DnsRecord podría usarse aquí si quieres objetos más ricos.
                 resolved_records[record_type] = [str(data) for data in answers]
             except dns.resolver.NoAnswer:
@@ -44,6 +59,32 @@ class DNSScanner:
                 resolved_records[record_type] = []
         return resolved_records
 
+
+class AsyncDNSScanner:
+    """Versión asíncrona de DNSScanner: resuelve todos los tipos de registro en paralelo."""
+    def __init__(self):
+        self.resolver = dns.asyncresolver.Resolver()
+
+    async def _resolve_type(self, domain: str, record_type: str) -> List[str]:
+        try:
+            answers = await self.resolver.resolve(*query_for(domain, record_type))
+            return [str(data) for data in answers]
+        except dns.resolver.NoAnswer:
+            logging.info(f"No se encontraron registros {record_type} para {domain}")
+        except dns.resolver.NXDOMAIN:
+            logging.error(f"El dominio no existe (NXDOMAIN): {domain} al consultar {record_type}")
+        except dns.exception.Timeout:
+            logging.warning(f"Timeout al resolver {record_type} para {domain}")
+        except Exception as e:
+            logging.error(f"Error inesperado al resolver {record_type} para {domain}: {e}")
+        return []
+
+    async def resolve_records_raw(self, domain: str, record_types: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """Mismo contrato que DNSScanner.resolve_records_raw."""
+        record_types = record_types or ["A", "AAAA", "CNAME", "MX", "NS", "SOA", "TXT"]
+        answers = await asyncio.gather(*(self._resolve_type(domain, record_type) for record_type in record_types))
+        return dict(zip(record_types, answers))
+
 # ------------------------------------------------------------------------------------
 # NOTA IMPORTANTE:
 # Los siguientes métodos estaban en tu dns_scan.py original dentro de DNSScanner:
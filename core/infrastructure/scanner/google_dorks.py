@@ -1,13 +1,51 @@
 #security_apy/core/infrastructure/scanner/google_dorks.py
+import asyncio
 import requests
+import httpx
 import logging
-from typing import List, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Iterable
 from core.domain.entities import GoogleDorkResult
+from core.domain.links import normalize_link
+from core.infrastructure.cache.google_cse_cache import get_google_cse_cache
+from core.infrastructure.http.async_client import async_http_request
+from core.infrastructure.http.client import http_request
+from core.infrastructure.http.resilience import CircuitOpenError, get_breaker, hedged_call
 from dotenv import load_dotenv
 import os
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Límites de la API Custom Search: 10 ítems por página y como máximo 100 resultados por consulta.
+CSE_PAGE_SIZE = 10
+CSE_MAX_RESULTS = 100
+CSE_BASE_URL = "https://www.googleapis.com/customsearch/v1"
+
+# Paquetes de dorks por categoría. '{domain}' se sustituye por el dominio objetivo.
+DORK_PACKS: Dict[str, List[str]] = {
+    "exposed_files": [
+        'site:{domain} ext:log OR ext:txt OR ext:bak OR ext:old OR ext:backup',
+        'site:{domain} ext:sql OR ext:db OR ext:sqlite OR ext:mdb',
+        'site:{domain} ext:env OR ext:ini OR ext:conf OR ext:cfg OR ext:yml',
+    ],
+    "login_panels": [
+        'site:{domain} inurl:login OR inurl:signin OR inurl:admin',
+        'site:{domain} intitle:"login" OR intitle:"admin panel" OR intitle:"dashboard"',
+    ],
+    "directory_listings": [
+        'site:{domain} intitle:"Index of /"',
+        'site:{domain} intitle:"Index of" "Parent Directory"',
+    ],
+    "error_messages": [
+        'site:{domain} "SQL syntax" OR "Warning: mysql_" OR "Fatal error"',
+        'site:{domain} "Traceback (most recent call last)" OR "stack trace"',
+    ],
+    "sensitive_documents": [
+        'site:{domain} ext:pdf OR ext:doc OR ext:docx OR ext:xls OR ext:xlsx "confidencial" OR "confidential"',
+    ],
+}
+
 def load_env_variables() -> Optional[Dict[str, str]]:
     load_dotenv()
     api_key = os.getenv('API_KEY_SEARCH_GOOGLE')
@@ -22,8 +60,39 @@ def load_env_variables() -> Optional[Dict[str, str]]:
         'search_engine_id': search_engine_id
     }
 
-def perform_google_search_raw(api_key: str, search_engine_id: str, query: str, start: int = 1, lang: str = "lang_es") -> Optional[List[Dict]]:
-    base_url = "https://www.googleapis.com/customsearch/v1"
+def _circuit_open_fallback(stale: Optional[Dict], query: str, start: int) -> Optional[Dict]:
+    """Respuesta con el circuito de Google CSE abierto: la caducada si la hay, o None."""
+    breaker = get_breaker("google_cse")
+    if stale is not None:
+        logging.warning(f"Circuito de Google CSE abierto; se sirve respuesta caducada para: {query} (start={start})")
+        return stale
+    logging.error(f"Google CSE no disponible (circuito abierto, reintentar en {breaker.retry_after():.0f} s): {query}")
+    return None
+
+def fetch_google_page_raw(api_key: str, search_engine_id: str, query: str, start: int = 1, lang: str = "lang_es",
+                          use_cache: bool = True) -> Optional[Dict]:
+    """
+    Obtiene una página de resultados de la API Custom Search.
+    Retorna el JSON completo de la respuesta (incluye 'items' y 'searchInformation'), o None si hay un error.
+    Las respuestas se sirven desde la caché persistente mientras estén frescas; si la cuota diaria está
+    agotada se sirve la última respuesta conocida aunque haya caducado, o None si no la hay.
+    """
+    cache = get_google_cse_cache() if use_cache else None
+    if cache:
+        cached = cache.get(search_engine_id, query, start, lang)
+        if cached is not None:
+            return cached
+        # Con el circuito abierto la petición no saldría: no se gasta cuota en ella
+        if get_breaker("google_cse").is_open():
+            return _circuit_open_fallback(cache.get(search_engine_id, query, start, lang, allow_stale=True), query, start)
+        if not cache.try_consume_quota():
+            stale = cache.get(search_engine_id, query, start, lang, allow_stale=True)
+            if stale is not None:
+                logging.warning(f"Cuota diaria de Google CSE agotada; se sirve respuesta caducada para: {query} (start={start})")
+                return stale
+            logging.error(f"Cuota diaria de Google CSE agotada; se rechaza la búsqueda: {query} (start={start})")
+            return None
+
     params = {
         "key": api_key,
         "cx": search_engine_id,
@@ -31,15 +100,100 @@ def perform_google_search_raw(api_key: str, search_engine_id: str, query: str, s
         "start": start,
         "lr": lang
     }
+    def _get_page() -> requests.Response:
+        response = http_request("GET", CSE_BASE_URL, params=params, read_timeout=float(os.getenv('GOOGLE_CSE_READ_TIMEOUT', '10')))
+        # Solo 429 y 5xx cuentan como fallo del servicio para el circuito; el resto de 4xx son errores de la petición.
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        return response
+
+    # Las búsquedas son idempotentes: si GOOGLE_CSE_HEDGE_DELAY > 0 se lanza una petición de cobertura
+    # cuando la primera tarda más de ese tiempo (cada copia consume cuota).
+    hedge_delay = float(os.getenv('GOOGLE_CSE_HEDGE_DELAY', '0'))
     try:
-        response = requests.get(base_url, params=params, timeout=10)
+        if hedge_delay > 0:
+            response = get_breaker("google_cse").call(
+                hedged_call, _get_page, hedge_delay=hedge_delay,
+                can_hedge=cache.try_consume_quota if cache else None
+            )
+        else:
+            response = get_breaker("google_cse").call(_get_page)
         response.raise_for_status()
         data = response.json()
-        return data.get('items', [])
+        if cache:
+            cache.set(search_engine_id, query, start, lang, data)
+        return data
+    except CircuitOpenError as e:
+        stale = cache.get(search_engine_id, query, start, lang, allow_stale=True) if cache else None
+        if stale is not None:
+            logging.warning(f"{e} Se sirve respuesta caducada para: {query} (start={start})")
+            return stale
+        logging.error(f"Google CSE no disponible: {e}")
+        return None
     except requests.exceptions.RequestException as e:
         logging.error(f"Error al realizar la búsqueda en Google: {e}")
         return None
 
+async def fetch_google_page_raw_async(api_key: str, search_engine_id: str, query: str, start: int = 1,
+                                      lang: str = "lang_es", use_cache: bool = True) -> Optional[Dict]:
+    """
+    Versión asíncrona de fetch_google_page_raw (httpx), con la misma caché, cuota y circuito.
+    Las operaciones sobre la caché SQLite se ejecutan en un hilo. No hace peticiones de cobertura.
+    """
+    cache = get_google_cse_cache() if use_cache else None
+    if cache:
+        cached = await asyncio.to_thread(cache.get, search_engine_id, query, start, lang)
+        if cached is not None:
+            return cached
+        if get_breaker("google_cse").is_open():
+            stale = await asyncio.to_thread(cache.get, search_engine_id, query, start, lang, True)
+            return _circuit_open_fallback(stale, query, start)
+        if not await asyncio.to_thread(cache.try_consume_quota):
+            stale = await asyncio.to_thread(cache.get, search_engine_id, query, start, lang, True)
+            if stale is not None:
+                logging.warning(f"Cuota diaria de Google CSE agotada; se sirve respuesta caducada para: {query} (start={start})")
+                return stale
+            logging.error(f"Cuota diaria de Google CSE agotada; se rechaza la búsqueda: {query} (start={start})")
+            return None
+
+    params = {
+        "key": api_key,
+        "cx": search_engine_id,
+        "q": query,
+        "start": start,
+        "lr": lang
+    }
+    async def _get_page() -> httpx.Response:
+        response = await async_http_request("GET", CSE_BASE_URL, params=params,
+                                            read_timeout=float(os.getenv('GOOGLE_CSE_READ_TIMEOUT', '10')))
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        return response
+
+    try:
+        response = await get_breaker("google_cse").call_async(_get_page)
+        response.raise_for_status()
+        data = response.json()
+        if cache:
+            await asyncio.to_thread(cache.set, search_engine_id, query, start, lang, data)
+        return data
+    except CircuitOpenError as e:
+        stale = await asyncio.to_thread(cache.get, search_engine_id, query, start, lang, True) if cache else None
+        if stale is not None:
+            logging.warning(f"{e} Se sirve respuesta caducada para: {query} (start={start})")
+            return stale
+        logging.error(f"Google CSE no disponible: {e}")
+        return None
+    except (httpx.HTTPError, ValueError) as e:
+        logging.error(f"Error al realizar la búsqueda en Google: {e}")
+        return None
+
+def perform_google_search_raw(api_key: str, search_engine_id: str, query: str, start: int = 1, lang: str = "lang_es") -> Optional[List[Dict]]:
+    data = fetch_google_page_raw(api_key, search_engine_id, query, start, lang)
+    if data is None:
+        return None
+    return data.get('items', [])
+
 def map_google_results(raw_results: Optional[List[Dict]]) -> Optional[List[GoogleDorkResult]]:
     if not raw_results:
         return None
@@ -52,11 +206,139 @@ def map_google_results(raw_results: Optional[List[Dict]]) -> Optional[List[Googl
         ))
     return results
 
+def build_pack_queries(domain: str, packs: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """
+    Construye las consultas de los paquetes de dorks indicados para un dominio.
+    Si no se indican paquetes se usan todos. Lanza ValueError si algún paquete no existe.
+    """
+    selected = list(packs) if packs else list(DORK_PACKS.keys())
+    unknown = [name for name in selected if name not in DORK_PACKS]
+    if unknown:
+        raise ValueError(f"Paquetes de dorks desconocidos: {', '.join(unknown)}. Disponibles: {', '.join(DORK_PACKS.keys())}")
+    return {name: [template.format(domain=domain) for template in DORK_PACKS[name]] for name in selected}
+
+
+class _PageBudget:
+    """Contador de páginas compartido entre hilos para no superar la cuota de un escaneo."""
+    def __init__(self, max_requests: int):
+        self._remaining = max_requests
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            return True
+
+
 class GoogleDorkScanner:
-    def __init__(self, api_key: str, search_engine_id: str):
+    def __init__(self, api_key: str, search_engine_id: str, max_workers: Optional[int] = None,
+                 max_requests_per_scan: Optional[int] = None):
         self.api_key = api_key
         self.search_engine_id = search_engine_id
+        self.max_workers = max_workers or int(os.getenv('GOOGLE_DORK_MAX_WORKERS', '4'))
+        self.max_requests_per_scan = max_requests_per_scan or int(os.getenv('GOOGLE_DORK_MAX_REQUESTS', '20'))
 
     def search(self, query: str, start: int = 1, lang: str = "lang_es") -> Optional[List[GoogleDorkResult]]:
         raw_results = perform_google_search_raw(self.api_key, self.search_engine_id, query, start, lang)
-        return map_google_results(raw_results)
\ No newline at end of file
+        return map_google_results(raw_results)
+
+    async def search_async(self, query: str, start: int = 1, lang: str = "lang_es") -> Optional[List[GoogleDorkResult]]:
+        page = await fetch_google_page_raw_async(self.api_key, self.search_engine_id, query, start, lang)
+        return map_google_results(page.get('items', []) if page is not None else None)
+
+    async def search_pack_async(self, domain: str, packs: Optional[Iterable[str]] = None,
+                                max_results_per_query: int = CSE_PAGE_SIZE, lang: str = "lang_es") -> Dict[str, object]:
+        # La paginación concurrente con presupuesto compartido ya vive en search_queries; se reutiliza en un hilo.
+        return await asyncio.to_thread(self.search_pack, domain, packs, max_results_per_query, lang)
+
+    def _search_paginated_raw(self, query: str, max_results: int, lang: str, budget: _PageBudget,
+                              executor: ThreadPoolExecutor) -> Optional[List[Dict]]:
+        """
+        Pide la primera página y, según 'totalResults', las páginas restantes en paralelo.
+        Así no se gasta cuota en páginas que la API sabe que están vacías.
+        """
+        if not budget.take():
+            logging.warning(f"Presupuesto de consultas agotado; se omite la query de Google: {query}")
+            return []
+        first_page = fetch_google_page_raw(self.api_key, self.search_engine_id, query, 1, lang)
+        if first_page is None:
+            return None
+        items = list(first_page.get('items', []))
+
+        try:
+            total_results = int(first_page.get('searchInformation', {}).get('totalResults', len(items)))
+        except (TypeError, ValueError):
+            total_results = len(items)
+        wanted = min(max_results, total_results, CSE_MAX_RESULTS)
+        if len(items) < CSE_PAGE_SIZE or wanted <= CSE_PAGE_SIZE:
+            return items[:max_results]
+
+        starts = []
+        for start in range(1 + CSE_PAGE_SIZE, wanted + 1, CSE_PAGE_SIZE):
+            if not budget.take():
+                logging.warning(f"Presupuesto de consultas agotado; paginación truncada para la query: {query}")
+                break
+            starts.append(start)
+
+        futures = [executor.submit(perform_google_search_raw, self.api_key, self.search_engine_id, query, start, lang)
+                   for start in starts]
+        for future in futures:
+            page_items = future.result()
+            if page_items:
+                items.extend(page_items)
+        return items[:max_results]
+
+    def search_queries(self, queries: List[str], max_results_per_query: int = CSE_PAGE_SIZE,
+                       lang: str = "lang_es") -> Dict[str, object]:
+        """
+        Ejecuta varias consultas en paralelo (cada una paginada hasta 'max_results_per_query'),
+        y fusiona los resultados de-duplicando por enlace.
+        Retorna un diccionario con 'results' (List[GoogleDorkResult]), 'per_query' (ítems por consulta)
+        y 'failed_queries'.
+        """
+        budget = _PageBudget(self.max_requests_per_scan)
+        max_results_per_query = max(1, min(max_results_per_query, CSE_MAX_RESULTS))
+
+        # Dos pools: uno para las consultas y otro para sus páginas, para que una consulta que espera
+        # sus páginas no bloquee los hilos que deben servirlas.
+        with ThreadPoolExecutor(max_workers=self.max_workers) as query_executor, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as page_executor:
+            futures = {
+                query: query_executor.submit(self._search_paginated_raw, query, max_results_per_query, lang, budget, page_executor)
+                for query in queries
+            }
+            raw_by_query = {query: future.result() for query, future in futures.items()}
+
+        merged: List[GoogleDorkResult] = []
+        seen_links = set()
+        per_query: Dict[str, int] = {}
+        failed_queries: List[str] = []
+        for query in queries:
+            raw_items = raw_by_query.get(query)
+            if raw_items is None:
+                failed_queries.append(query)
+                per_query[query] = 0
+                continue
+            per_query[query] = len(raw_items)
+            for result in map_google_results(raw_items) or []:
+                key = normalize_link(result.link)
+                if key in seen_links:
+                    continue
+                seen_links.add(key)
+                merged.append(result)
+
+        return {"results": merged, "per_query": per_query, "failed_queries": failed_queries}
+
+    def search_pack(self, domain: str, packs: Optional[Iterable[str]] = None,
+                    max_results_per_query: int = CSE_PAGE_SIZE, lang: str = "lang_es") -> Dict[str, object]:
+        """
+        Ejecuta los paquetes de dorks indicados (o todos) contra un dominio.
+        Retorna lo mismo que search_queries más 'packs' con las consultas ejecutadas por paquete.
+        """
+        pack_queries = build_pack_queries(domain, packs)
+        queries = [query for pack in pack_queries.values() for query in pack]
+        outcome = self.search_queries(queries, max_results_per_query, lang)
+        outcome["packs"] = pack_queries
+        return outcome
@@ -1,18 +1,41 @@
 # security_apy/core/infrastructure/scanner/nmap_scan.py
+import asyncio
+import io
 import subprocess
+import uuid
 import xml.etree.ElementTree as ET
 import os
 import logging
 from typing import List, Optional # Optional puede ser útil para el retorno de _parse_nmap_xml si se prefiere
 from core.domain.entities import NmapHost, NmapPort # Asegúrate que tus entidades NmapHost y NmapPort están definidas
+from core.infrastructure.archive.artifact_archive import archive_artifact, get_artifact_archive
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class NmapScanner:
-    def scan_targets_raw(self, targets: List[str]) -> List[NmapHost]:
+    @staticmethod
+    def _nmap_command(target: str, xml_output_path: str, service_detection: bool = True) -> List[str]:
+        # -A (versiones, SO, scripts) es la parte lenta; sin ella solo se detectan los puertos abiertos
+        return ["nmap", target, *(["-A"] if service_detection else []), "-Pn", "-T4", "-oX", xml_output_path]
+
+    @staticmethod
+    def _archive_xml(xml_output_path: str, target: str, service_detection: bool) -> None:
+        # El XML se borra tras parsearlo: se guarda antes en el archivo de artefactos para poder re-parsearlo
+        with open(xml_output_path, "rb") as f:
+            archive_artifact("nmap_xml", target, f.read(), {"service_detection": service_detection})
+
+    def parse_archived_xml(self, artifact_id: str) -> NmapHost:
+        """Vuelve a parsear un XML de Nmap archivado (p. ej. tras mejorar el parser) sin volver a escanear."""
+        archive = get_artifact_archive()
+        entry = archive.describe(artifact_id)
+        if entry is None or entry["kind"] != "nmap_xml":
+            raise KeyError(artifact_id)
+        return self._parse_nmap_xml(io.BytesIO(archive.get(artifact_id)), original_target=entry["key"])
+
+    def scan_targets_raw(self, targets: List[str], service_detection: bool = True) -> List[NmapHost]:
         """
         Escanea una lista de objetivos (IPs o hostnames) con Nmap.
-        Retorna una lista de objetos NmapHost.
+        Retorna una lista de objetos NmapHost. Con service_detection=False se omite -A.
         """
         results: List[NmapHost] = []
         for target in targets:
@@ -24,7 +47,7 @@ class NmapScanner:
             try:
                 # Ejecutar Nmap.
                 process = subprocess.run(
-                    ["nmap", target, "-A", "-Pn", "-T4", "-oX", xml_output_path],
+                    self._nmap_command(target, xml_output_path, service_detection),
                     check=True,        # Lanza CalledProcessError si Nmap devuelve un código de error
                     capture_output=True, # Captura stdout/stderr
                     text=True,           # Decodifica stdout/stderr como texto
@@ -33,6 +56,7 @@ class NmapScanner:
 
                 # Verificar si el archivo XML se creó y no está vacío
                 if os.path.exists(xml_output_path) and os.path.getsize(xml_output_path) > 0:
+                    self._archive_xml(xml_output_path, target, service_detection)
                     nmap_host_data = self._parse_nmap_xml(xml_output_path, original_target=target)
                     # _parse_nmap_xml ahora siempre debería devolver un NmapHost
                     results.append(nmap_host_data)
@@ -62,9 +86,62 @@ class NmapScanner:
                         logging.error(f"Error al eliminar archivo Nmap XML {xml_output_path}: {e_os}")
         return results
 
-    def _parse_nmap_xml(self, xml_path: str, original_target: str) -> NmapHost:
+    async def scan_targets_raw_async(self, targets: List[str], service_detection: bool = True) -> List[NmapHost]:
+        """
+        Versión asíncrona de scan_targets_raw: lanza Nmap como subproceso sin bloquear el bucle de eventos
+        y escanea varios objetivos a la vez (como máximo NMAP_MAX_CONCURRENCY).
+        """
+        semaphore = asyncio.Semaphore(int(os.getenv('NMAP_MAX_CONCURRENCY', '4')))
+
+        async def _scan(target: str) -> NmapHost:
+            async with semaphore:
+                return await self._scan_target_async(target, service_detection)
+
+        return list(await asyncio.gather(*(_scan(target) for target in targets)))
+
+    async def _scan_target_async(self, target: str, service_detection: bool = True) -> NmapHost:
+        logging.info(f"Iniciando escaneo Nmap (async) para el objetivo: {target}")
+        safe_target_filename = "".join(c if c.isalnum() else "_" for c in target)
+        # Sufijo único: varias peticiones concurrentes pueden escanear el mismo objetivo
+        xml_output_path = f"/tmp/nmap_{safe_target_filename}_{uuid.uuid4().hex}.xml"
+        process = None
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self._nmap_command(target, xml_output_path, service_detection),
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=300)
+            if process.returncode != 0:
+                output = (stderr or stdout or b"").decode(errors="replace") or f"código de salida {process.returncode}"
+                logging.error(f"Error de Nmap para {target}: {output}")
+                return NmapHost(ip=target, ports=[], status="error_nmap_execution", error=f"Fallo en ejecución de Nmap: {output}")
+            if os.path.exists(xml_output_path) and os.path.getsize(xml_output_path) > 0:
+                self._archive_xml(xml_output_path, target, service_detection)
+                return self._parse_nmap_xml(xml_output_path, original_target=target)
+            logging.warning(f"Archivo Nmap XML no generado o vacío para {target} en {xml_output_path}")
+            return NmapHost(ip=target, ports=[], status="error_nmap_output", error="Archivo Nmap XML no generado o vacío")
+        except asyncio.TimeoutError:
+            logging.error(f"Timeout durante escaneo Nmap de {target}")
+            if process is not None and process.returncode is None:
+                process.kill()
+                await process.wait()
+            return NmapHost(ip=target, ports=[], status="error_nmap_timeout", error="Timeout en escaneo Nmap")
+        except FileNotFoundError:
+            logging.error("Comando Nmap no encontrado. Asegúrate de que Nmap esté instalado y en el PATH del sistema.")
+            return NmapHost(ip=target, ports=[], status="error_nmap_not_found", error="Comando Nmap no encontrado")
+        except Exception as e:
+            logging.error(f"Error inesperado durante escaneo Nmap de {target}: {e}")
+            return NmapHost(ip=target, ports=[], status="error_unexpected", error=f"Error inesperado: {str(e)}")
+        finally:
+            if os.path.exists(xml_output_path):
+                try:
+                    os.remove(xml_output_path)
+                except OSError as e_os:
+                    logging.error(f"Error al eliminar archivo Nmap XML {xml_output_path}: {e_os}")
+
+    def _parse_nmap_xml(self, xml_path, original_target: str) -> NmapHost:
         """
-        Parsea un archivo XML de salida de Nmap para un solo host.
+        Parsea un archivo XML de salida de Nmap (ruta o fichero abierto) para un solo host.
         Retorna un objeto NmapHost.
         El argumento 'original_target' se usa como fallback si no se puede determinar la IP desde el XML.
         """
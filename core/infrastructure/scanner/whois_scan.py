@@ -1,5 +1,6 @@
 # security_apy/core/infrastructure/scanner/whois_scan.py
 import whois
+import asyncio
 import logging
 from typing import List, Optional # Necesario para la entidad
 from core.domain.entities import WhoisInfo # Asegúrate que la ruta a tu entidad es correcta
@@ -42,4 +43,11 @@ class WhoisScanner:  # <--- ESTA ES LA LÍNEA CRUCIAL
             )
         except Exception as e:
             logging.error(f"Error al obtener WHOIS para {domain}: {e}")
-            return WhoisInfo(domain_name=[domain] if domain else [], error=str(e))
\ No newline at end of file
+            return WhoisInfo(domain_name=[domain] if domain else [], error=str(e))
+
+    async def get_whois_info_raw_async(self, domain: str) -> WhoisInfo:
+        """
+        Versión asíncrona de get_whois_info_raw. python-whois solo ofrece una API bloqueante,
+        así que la consulta se ejecuta en un hilo para no bloquear el bucle de eventos.
+        """
+        return await asyncio.to_thread(self.get_whois_info_raw, domain)
@@ -122,3 +122,11 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# JSON con orjson (si está instalado) en una sola pasada; la API navegable se mantiene para desarrollo
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'chat.services.fast_json.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}